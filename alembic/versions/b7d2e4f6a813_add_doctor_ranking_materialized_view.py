@@ -0,0 +1,78 @@
+"""add doctor ranking materialized view
+
+Revision ID: b7d2e4f6a813
+Revises: a1c3e5f7b901
+Create Date: 2026-10-18 14:05:12.583920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f6a813'
+down_revision: Union[str, None] = 'a1c3e5f7b901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW doctor_ranking AS
+        SELECT
+            doctor.id AS doctor_id,
+            COALESCE(rating.avg_rating, 0.0) AS avg_rating,
+            COALESCE(rating.rating_count, 0) AS rating_count,
+            price.id AS price_id,
+            price.online_price,
+            price.offline_price,
+            price.created_at AS price_created_at,
+            COALESCE(schedule.work_schedules, '[]'::jsonb) AS work_schedules
+        FROM doctor
+        LEFT JOIN (
+            SELECT doctor_id, avg(rating) AS avg_rating, count(id) AS rating_count
+            FROM rating
+            GROUP BY doctor_id
+        ) AS rating ON rating.doctor_id = doctor.id
+        LEFT JOIN (
+            SELECT DISTINCT ON (doctor_id) id, doctor_id, online_price, offline_price, created_at
+            FROM doctor_examination_price
+            ORDER BY doctor_id, created_at DESC
+        ) AS price ON price.doctor_id = doctor.id
+        LEFT JOIN (
+            SELECT
+                doctor_id,
+                jsonb_agg(
+                    jsonb_build_object(
+                        'id', id,
+                        'work_date', work_date,
+                        'start_time', start_time,
+                        'end_time', end_time,
+                        'examination_type', examination_type,
+                        'medical_examination_fee', medical_examination_fee,
+                        'ordered', ordered
+                    )
+                    ORDER BY work_date, start_time
+                ) AS work_schedules
+            FROM work_schedule
+            WHERE ordered = false
+              AND work_date BETWEEN current_date - 1 AND current_date + 8
+            GROUP BY doctor_id
+        ) AS schedule ON schedule.doctor_id = doctor.id
+        """
+    )
+    # required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute(
+        "CREATE UNIQUE INDEX idx_doctor_ranking_doctor_id ON doctor_ranking (doctor_id)"
+    )
+    # the directory is read in this order, a LIMIT query walks the index
+    op.execute(
+        "CREATE INDEX idx_doctor_ranking_rank ON doctor_ranking "
+        "(avg_rating DESC, rating_count DESC, doctor_id) INCLUDE (price_id, online_price, offline_price)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS doctor_ranking")
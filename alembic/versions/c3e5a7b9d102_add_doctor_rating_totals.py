@@ -0,0 +1,116 @@
+"""add doctor rating totals
+
+Revision ID: c3e5a7b9d102
+Revises: b7d2e4f6a813
+Create Date: 2026-10-18 15:20:44.106338
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a7b9d102'
+down_revision: Union[str, None] = 'b7d2e4f6a813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_doctor_ranking(rating_columns: str, rating_join: str) -> None:
+    op.execute(
+        f"""
+        CREATE MATERIALIZED VIEW doctor_ranking AS
+        SELECT
+            doctor.id AS doctor_id,
+            {rating_columns},
+            price.id AS price_id,
+            price.online_price,
+            price.offline_price,
+            price.created_at AS price_created_at,
+            COALESCE(schedule.work_schedules, '[]'::jsonb) AS work_schedules
+        FROM doctor
+        {rating_join}
+        LEFT JOIN (
+            SELECT DISTINCT ON (doctor_id) id, doctor_id, online_price, offline_price, created_at
+            FROM doctor_examination_price
+            ORDER BY doctor_id, created_at DESC
+        ) AS price ON price.doctor_id = doctor.id
+        LEFT JOIN (
+            SELECT
+                doctor_id,
+                jsonb_agg(
+                    jsonb_build_object(
+                        'id', id,
+                        'work_date', work_date,
+                        'start_time', start_time,
+                        'end_time', end_time,
+                        'examination_type', examination_type,
+                        'medical_examination_fee', medical_examination_fee,
+                        'ordered', ordered
+                    )
+                    ORDER BY work_date, start_time
+                ) AS work_schedules
+            FROM work_schedule
+            WHERE ordered = false
+              AND work_date BETWEEN current_date - 1 AND current_date + 8
+            GROUP BY doctor_id
+        ) AS schedule ON schedule.doctor_id = doctor.id
+        """
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX idx_doctor_ranking_doctor_id ON doctor_ranking (doctor_id)"
+    )
+    op.execute(
+        "CREATE INDEX idx_doctor_ranking_rank ON doctor_ranking "
+        "(avg_rating DESC, rating_count DESC, doctor_id) INCLUDE (price_id, online_price, offline_price)"
+    )
+
+
+def upgrade() -> None:
+    op.add_column('doctor', sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False))
+    op.add_column('doctor', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE doctor
+        SET rating_sum = totals.rating_sum, rating_count = totals.rating_count
+        FROM (
+            SELECT doctor_id, sum(rating) AS rating_sum, count(id) AS rating_count
+            FROM rating
+            GROUP BY doctor_id
+        ) AS totals
+        WHERE totals.doctor_id = doctor.id
+        """
+    )
+    op.create_index('ix_rating_doctor_id_id', 'rating', ['doctor_id', 'id'], unique=False)
+    # the ranking view reads the totals instead of aggregating the rating table
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS doctor_ranking")
+    _create_doctor_ranking(
+        rating_columns=(
+            "CASE WHEN doctor.rating_count > 0 "
+            "THEN doctor.rating_sum / doctor.rating_count ELSE 0.0 END AS avg_rating,\n"
+            "            doctor.rating_count"
+        ),
+        rating_join="",
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS doctor_ranking")
+    _create_doctor_ranking(
+        rating_columns=(
+            "COALESCE(rating.avg_rating, 0.0) AS avg_rating,\n"
+            "            COALESCE(rating.rating_count, 0) AS rating_count"
+        ),
+        rating_join=(
+            "LEFT JOIN (\n"
+            "            SELECT doctor_id, avg(rating) AS avg_rating, count(id) AS rating_count\n"
+            "            FROM rating\n"
+            "            GROUP BY doctor_id\n"
+            "        ) AS rating ON rating.doctor_id = doctor.id"
+        ),
+    )
+    op.drop_index('ix_rating_doctor_id_id', table_name='rating')
+    op.drop_column('doctor', 'rating_count')
+    op.drop_column('doctor', 'rating_sum')
@@ -0,0 +1,139 @@
+"""add statistics rollup tables
+
+Revision ID: d4f8a2c6e135
+Revises: c3e5a7b9d102
+Create Date: 2026-10-18 17:02:11.523904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f8a2c6e135'
+down_revision: Union[str, None] = 'c3e5a7b9d102'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _timestamps() -> list:
+    # the columns of Model, the rollup inserts of the ORM write every one of them
+    return [
+        sa.Column('created_at', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.Integer(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=False, server_default=sa.false()),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'work_schedule_daily_stat',
+        sa.Column('work_date', sa.Date(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('examination_type', sa.String(), nullable=False),
+        sa.Column('appointment_status', sa.String(length=50), nullable=False),
+        sa.Column('schedule_count', sa.Integer(), nullable=False),
+        sa.Column('ordered_count', sa.Integer(), nullable=False),
+        sa.Column('fee_total', sa.Float(), nullable=False),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('work_date', 'doctor_id', 'examination_type', 'appointment_status'),
+    )
+    op.create_index(
+        'idx_work_schedule_daily_stat_doctor',
+        'work_schedule_daily_stat',
+        ['doctor_id', 'examination_type'],
+        unique=False,
+    )
+    op.create_table(
+        'appointment_daily_stat',
+        sa.Column('created_date', sa.Date(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('examination_type', sa.String(), nullable=False),
+        sa.Column('appointment_status', sa.String(length=50), nullable=False),
+        sa.Column('appointment_count', sa.Integer(), nullable=False),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('created_date', 'doctor_id', 'examination_type', 'appointment_status'),
+    )
+    op.create_table(
+        'payment_daily_stat',
+        sa.Column('payment_date', sa.Date(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('payment_count', sa.Integer(), nullable=False),
+        sa.Column('amount_total', sa.Float(), nullable=False),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('payment_date', 'doctor_id', 'patient_id'),
+    )
+    op.create_index('idx_payment_daily_stat_patient', 'payment_daily_stat', ['patient_id'], unique=False)
+    op.create_index('idx_payment_daily_stat_doctor', 'payment_daily_stat', ['doctor_id'], unique=False)
+
+    # the rollup job recomputes the appointments and payments of given days
+    op.create_index('idx_appointment_created_at', 'appointment', ['created_at'], unique=False)
+    op.create_index('idx_payment_payment_time', 'payment', ['payment_time'], unique=False)
+
+    # backfill the whole history once, the job only refreshes the days written since
+    op.execute(
+        """
+        INSERT INTO work_schedule_daily_stat (
+            work_date, doctor_id, examination_type, appointment_status,
+            schedule_count, ordered_count, fee_total
+        )
+        SELECT
+            work_schedule.work_date,
+            work_schedule.doctor_id,
+            work_schedule.examination_type,
+            COALESCE(appointment.appointment_status, 'none'),
+            count(*),
+            count(*) FILTER (WHERE work_schedule.ordered),
+            COALESCE(sum(work_schedule.medical_examination_fee), 0)
+        FROM work_schedule
+        LEFT JOIN appointment ON appointment.work_schedule_id = work_schedule.id
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO appointment_daily_stat (
+            created_date, doctor_id, examination_type, appointment_status, appointment_count
+        )
+        SELECT
+            CAST(timezone('UTC', to_timestamp(appointment.created_at)) AS DATE),
+            appointment.doctor_id,
+            work_schedule.examination_type,
+            appointment.appointment_status,
+            count(*)
+        FROM appointment
+        JOIN work_schedule ON work_schedule.id = appointment.work_schedule_id
+        WHERE appointment.created_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO payment_daily_stat (
+            payment_date, doctor_id, patient_id, payment_count, amount_total
+        )
+        SELECT
+            CAST(payment.payment_time AS DATE),
+            appointment.doctor_id,
+            appointment.patient_id,
+            count(*),
+            COALESCE(sum(payment.amount), 0)
+        FROM payment
+        JOIN appointment ON appointment.id = payment.appointment_id
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_payment_payment_time', table_name='payment')
+    op.drop_index('idx_appointment_created_at', table_name='appointment')
+    op.drop_index('idx_payment_daily_stat_doctor', table_name='payment_daily_stat')
+    op.drop_index('idx_payment_daily_stat_patient', table_name='payment_daily_stat')
+    op.drop_table('payment_daily_stat')
+    op.drop_table('appointment_daily_stat')
+    op.drop_index('idx_work_schedule_daily_stat_doctor', table_name='work_schedule_daily_stat')
+    op.drop_table('work_schedule_daily_stat')
@@ -0,0 +1,31 @@
+"""add index appointment doctor status
+
+Revision ID: e6b1d3f5a724
+Revises: d4f8a2c6e135
+Create Date: 2026-10-18 18:10:37.214650
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b1d3f5a724'
+down_revision: Union[str, None] = 'd4f8a2c6e135'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_appointment_doctor_status_work_schedule',
+        'appointment',
+        ['doctor_id', 'appointment_status', 'work_schedule_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_appointment_doctor_status_work_schedule', table_name='appointment')
@@ -0,0 +1,52 @@
+"""unique rating per doctor and patient
+
+Revision ID: f7c9e1a3b246
+Revises: e6b1d3f5a724
+Create Date: 2026-10-18 21:14:37.604182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c9e1a3b246'
+down_revision: Union[str, None] = 'e6b1d3f5a724'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # concurrent first ratings could insert two rows, the latest one is kept
+    op.execute(
+        """
+        DELETE FROM rating
+        USING rating AS newer
+        WHERE newer.doctor_id = rating.doctor_id
+          AND newer.patient_id = rating.patient_id
+          AND newer.id > rating.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE doctor
+        SET rating_sum = COALESCE(totals.rating_sum, 0),
+            rating_count = COALESCE(totals.rating_count, 0)
+        FROM doctor AS d
+        LEFT JOIN (
+            SELECT doctor_id, sum(rating) AS rating_sum, count(id) AS rating_count
+            FROM rating
+            GROUP BY doctor_id
+        ) AS totals ON totals.doctor_id = d.id
+        WHERE d.id = doctor.id
+        """
+    )
+    op.drop_index('ix_rating_doctor_patient', table_name='rating')
+    op.create_index('ux_rating_doctor_patient', 'rating', ['doctor_id', 'patient_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_rating_doctor_patient', table_name='rating')
+    op.create_index('ix_rating_doctor_patient', 'rating', ['doctor_id', 'patient_id'], unique=False)
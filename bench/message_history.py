@@ -0,0 +1,157 @@
+"""Query count and latency of the message history of a long conversation.
+
+Seeds ``--messages`` messages from ``--senders`` existing doctors and patients into an
+existing conversation of a local database, then compares:
+
+- n+1: the former get_messages_from_conversation, one query for the messages and
+  one more per distinct sender;
+- full: MessageRepository.get_messages_from_conversation, one query;
+- window: the same with ``limit`` (the newest page of the infinite scroll) and with
+  ``before_id`` (a page in the middle of the thread).
+
+Everything runs in one transaction on the writer, rolled back at the end, the
+database is left as it was.
+
+usage (from the repository root, with the .env of a local database):
+    python bench/message_history.py --conversation-id <id> --messages 10000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert, select, union  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from src.core.database.postgresql.session import engines  # noqa: E402
+from src.models import DoctorModel, MessageModel, PatientModel, UserModel  # noqa: E402
+from src.repositories.message_repository import MessageRepository  # noqa: E402
+
+
+async def legacy_messages(session: AsyncSession, conversation_id: str) -> list:
+    """the history as it was read before: the messages, then one query per sender"""
+    result = await session.execute(
+        select(MessageModel)
+        .where(MessageModel.conversation_id == conversation_id)
+        .order_by(MessageModel.id)
+    )
+    senders = {}
+    items = []
+    for message in result.scalars().all():
+        if message.sender_id not in senders:
+            user = (
+                await session.execute(
+                    select(UserModel)
+                    .where(UserModel.id == message.sender_id)
+                    .options(joinedload(UserModel.doctor), joinedload(UserModel.patient))
+                )
+            ).scalar_one()
+            profile = user.doctor or user.patient
+            senders[message.sender_id] = {
+                "first_name": profile.first_name if profile else None,
+                "last_name": profile.last_name if profile else None,
+                "avatar": profile.avatar if profile else None,
+            }
+        items.append({"sender": senders[message.sender_id], **message.as_dict})
+    return items
+
+
+class QueryCounter:
+    def __init__(self, engine) -> None:
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+
+async def _measure(name: str, counter: QueryCounter, runs: int, read) -> None:
+    latencies = []
+    for _ in range(runs):
+        counter.count = 0
+        started = time.perf_counter()
+        items = await read()
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"{name:<7} {len(items):>6} messages  {counter.count:>4} queries"
+        f"  median {statistics.median(latencies) * 1000:8.1f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversation-id", required=True)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = engines["writer"]
+    counter = QueryCounter(engine)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, expire_on_commit=False)
+        try:
+            sender_ids = (
+                await session.execute(
+                    union(select(DoctorModel.id), select(PatientModel.id)).limit(args.senders)
+                )
+            ).scalars().all()
+            if not sender_ids:
+                raise SystemExit("no doctor or patient to send the messages")
+            await session.execute(
+                insert(MessageModel),
+                [
+                    {
+                        "conversation_id": args.conversation_id,
+                        "sender_id": sender_ids[index % len(sender_ids)],
+                        "is_read": False,
+                        "message": {"content": f"message {index}", "images": [], "media": None},
+                    }
+                    for index in range(args.messages)
+                ],
+            )
+            middle_id = (
+                await session.execute(
+                    select(MessageModel.id)
+                    .where(MessageModel.conversation_id == args.conversation_id)
+                    .order_by(MessageModel.id)
+                    .offset(args.messages // 2)
+                    .limit(1)
+                )
+            ).scalar_one()
+            repository = MessageRepository(MessageModel, session)
+            print(f"{args.messages} messages from {len(sender_ids)} senders")
+            await _measure(
+                "n+1", counter, args.runs,
+                lambda: legacy_messages(session, args.conversation_id),
+            )
+            await _measure(
+                "full", counter, args.runs,
+                lambda: repository.get_messages_from_conversation(args.conversation_id),
+            )
+            await _measure(
+                "window", counter, args.runs,
+                lambda: repository.get_messages_from_conversation(
+                    args.conversation_id, limit=args.limit
+                ),
+            )
+            await _measure(
+                "before", counter, args.runs,
+                lambda: repository.get_messages_from_conversation(
+                    args.conversation_id, before_id=middle_id, limit=args.limit
+                ),
+            )
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
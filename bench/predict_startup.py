@@ -0,0 +1,94 @@
+"""Startup time and memory of a web worker, with and without the eager model load.
+
+Every measure runs in a fresh interpreter:
+
+- lazy: ``import src.application`` as it is now, TensorFlow is not imported.
+- eager: ``import src.application`` then import TensorFlow and load the model,
+  what every web worker did at import before the inference process.
+- inference worker (with ``--image``): RSS of the spawned inference process
+  after its first prediction, the one process that now holds the model.
+
+usage (from the repository root, with the .env of the app):
+    python bench/predict_startup.py --runs 3 --image path/to/skin.jpg
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = """
+import json, resource, sys, time
+started = time.perf_counter()
+import src.application
+seconds = time.perf_counter() - started
+if {eager}:
+    import tensorflow as tf
+    from src.config import config
+    tf.keras.models.load_model(config.PREDICT_MODEL_PATH, compile=True, safe_mode=True)
+    seconds = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "tensorflow": "tensorflow" in sys.modules,
+}}))
+"""
+
+FIRST_PREDICTION = """
+import asyncio, json, sys
+import psutil
+from src.ai.inference import InferenceService
+from src.config import config
+
+async def main():
+    InferenceService.start(config.PREDICT_MODEL_PATH, workers=1, queue_size=1)
+    with open(sys.argv[1], "rb") as file:
+        await InferenceService.predict(file.read())
+    processes = InferenceService._executor._processes.values()
+    rss = sum(psutil.Process(process.pid).memory_info().rss for process in processes)
+    await InferenceService.close()
+    print(json.dumps({"rss_mb": rss / 1024 / 1024}))
+
+asyncio.run(main())
+"""
+
+
+def _run(code: str, *args: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _measure(name: str, eager: bool, runs: int) -> None:
+    results = [_run(IMPORT_APP.format(eager=eager)) for _ in range(runs)]
+    seconds = statistics.median(result["seconds"] for result in results)
+    rss_mb = statistics.median(result["rss_mb"] for result in results)
+    print(
+        f"{name:<6} import {seconds:7.2f}s  max rss {rss_mb:8.1f} MB"
+        f"  tensorflow imported: {results[0]['tensorflow']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--image", help="image file for the inference worker measure")
+    args = parser.parse_args()
+
+    _measure("lazy", eager=False, runs=args.runs)
+    _measure("eager", eager=True, runs=args.runs)
+    if args.image:
+        result = _run(FIRST_PREDICTION, os.path.abspath(args.image))
+        print(f"inference worker rss after the first prediction {result['rss_mb']:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Micro-benchmark of the where filters: destruct_where against the cached compile_where.
+
+The filters are the ones built by src/apis/auth.py (doctor list of the admin) and
+src/apis/doter_api.py (public doctor list), with their values varied between
+calls like real requests. Only the expression building is timed, no database
+is needed.
+
+usage (from the repository root, with the .env of the app):
+    python bench/where_cache.py --number 20000
+"""
+import argparse
+import itertools
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+
+import src.helper  # noqa: E402,F401  (imported before the repositories, as by the app)
+from src.core.database.postgresql.where_cache import (  # noqa: E402
+    clear_where_cache,
+    where_cache_info,
+)
+from src.models.doctor_model import DoctorModel  # noqa: E402
+from src.repositories.global_func import (  # noqa: E402
+    destruct_where,
+    destruct_where_compiled,
+)
+
+
+def auth_filters():
+    """DoctorOtherVerifyApi of auth.py: all the verify statuses, or one of them"""
+    yield {"verify_status": {"$in": [0, 1, -1]}}
+    for status in (0, 1, -1):
+        yield {"verify_status": status}
+
+
+def doctor_api_filters():
+    """GetAllDoctorApi of doter_api.py: type of disease and local person combinations"""
+    types_of_disease = {
+        None: None,
+        "both": [{"type_of_disease": "online"}, {"type_of_disease": "offline"}, {"type_of_disease": "both"}],
+        "online": [{"type_of_disease": "online"}, {"type_of_disease": "both"}],
+        "offline": [{"type_of_disease": "offline"}, {"type_of_disease": "both"}],
+    }
+    for or_filter, is_local_person in itertools.product(types_of_disease.values(), (None, True, False)):
+        where = {"verify_status": {"$ne": 0}}
+        if or_filter:
+            where["$or"] = or_filter
+        if is_local_person is not None:
+            where["is_local_person"] = is_local_person
+        yield where
+
+
+def _bench(name: str, filters: list, number: int) -> None:
+    cycle = itertools.cycle(filters)
+
+    def uncached():
+        select(DoctorModel).where(destruct_where(DoctorModel, next(cycle)))
+
+    def cached():
+        condition, _ = destruct_where_compiled(DoctorModel, next(cycle))
+        select(DoctorModel).where(condition)
+
+    clear_where_cache()
+    uncached_seconds = min(timeit.repeat(uncached, number=number, repeat=5))
+    cached_seconds = min(timeit.repeat(cached, number=number, repeat=5))
+    print(
+        f"{name:<10} {len(filters):>2} filters"
+        f"  destruct_where {uncached_seconds / number * 1e6:7.1f} us"
+        f"  compile_where {cached_seconds / number * 1e6:7.1f} us"
+        f"  x{uncached_seconds / cached_seconds:4.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    _bench("auth", list(auth_filters()), args.number)
+    _bench("doter_api", list(doctor_api_filters()), args.number)
+    print(where_cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from src.ai.model_worker import predict_images
+from src.core.database.postgresql.pool_metrics import Histogram
+
+BATCH_SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64)
+SECONDS_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (image file bytes, future of its result, monotonic time it was queued)
+QueueItem = Tuple[bytes, asyncio.Future, float]
+
+
+class InferenceStats:
+    def __init__(self) -> None:
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        # time from the request being queued to its batch being sent to the pool
+        self.queue_wait = Histogram(SECONDS_BUCKETS)
+        # one forward pass (decode and resize included) in the worker process
+        self.batch_seconds = Histogram(SECONDS_BUCKETS)
+        self.errors = 0
+
+
+class InferenceService:
+    """
+     Predictions of the skin disease model, served by a process pool next to the web worker.
+
+     The web worker never imports TensorFlow: the pool is spawned on the first prediction
+     and each of its processes loads the model once, on its first job. Requests wait in an
+     asyncio queue (bounded, so a burst waits instead of piling up jobs). Each consumer
+     task takes the queued requests as a micro batch, up to ``max_batch`` images or
+     ``max_wait`` seconds after the first one, and runs one batched forward pass in the
+     pool. The result of every image goes back to the future of its caller.
+
+     how to use:
+         InferenceService.start(model_path, workers=1, queue_size=64, max_batch=8, max_wait=0.01)
+         result = await InferenceService.predict(content)
+         await InferenceService.close()
+    """
+
+    _model_path: str = ""
+    _workers: int = 1
+    _max_batch: int = 8
+    _max_wait: float = 0.01
+    _executor: Optional[ProcessPoolExecutor] = None
+    _queue: Optional[asyncio.Queue] = None
+    _consumers: List[asyncio.Task] = []
+    stats = InferenceStats()
+
+    @classmethod
+    def start(
+        cls,
+        model_path: str,
+        workers: int = 1,
+        queue_size: int = 64,
+        max_batch: int = 8,
+        max_wait: float = 0.01,
+    ) -> None:
+        """
+         Create the queue and its consumers, the processes are only spawned by the first prediction.
+        """
+        if cls._queue is not None:
+            return
+        cls._model_path = model_path
+        cls._workers = workers
+        cls._max_batch = max(1, max_batch)
+        cls._max_wait = max_wait
+        cls._queue = asyncio.Queue(maxsize=queue_size)
+        loop = asyncio.get_running_loop()
+        cls._consumers = [loop.create_task(cls._consume()) for _ in range(workers)]
+
+    @classmethod
+    async def close(cls) -> None:
+        for task in cls._consumers:
+            task.cancel()
+        await asyncio.gather(*cls._consumers, return_exceptions=True)
+        cls._consumers = []
+        cls._queue = None
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    async def predict(cls, content: bytes) -> dict:
+        """
+         Queue the prediction of the image file ``content`` and wait for its result.
+
+         @return {"predict_final": class name, "sorted_probabilities": [(class name, percent)]}
+        """
+        if cls._queue is None:
+            raise RuntimeError("InferenceService is not started")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        await cls._queue.put((content, future, time.monotonic()))
+        return await future
+
+    @classmethod
+    def _get_executor(cls) -> ProcessPoolExecutor:
+        if cls._executor is None:
+            # spawn: the worker starts from a clean interpreter, not a fork of the app
+            cls._executor = ProcessPoolExecutor(
+                max_workers=cls._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return cls._executor
+
+    @classmethod
+    async def _next_batch(cls, queue: asyncio.Queue) -> List[QueueItem]:
+        """wait for one request, then for more until the batch is full or max_wait has passed"""
+        batch = [await queue.get()]
+        deadline = time.monotonic() + cls._max_wait
+        while len(batch) < cls._max_batch:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @classmethod
+    async def _consume(cls) -> None:
+        loop = asyncio.get_running_loop()
+        queue = cls._queue
+        while True:
+            batch = await cls._next_batch(queue)
+            # callers that gave up are not predicted
+            items = [item for item in batch if not item[1].cancelled()]
+            try:
+                if not items:
+                    continue
+                started = time.monotonic()
+                for _, _, queued_at in items:
+                    cls.stats.queue_wait.observe(started - queued_at)
+                cls.stats.batch_size.observe(len(items))
+                results = await loop.run_in_executor(
+                    cls._get_executor(),
+                    predict_images,
+                    cls._model_path,
+                    [content for content, _, _ in items],
+                )
+                cls.stats.batch_seconds.observe(time.monotonic() - started)
+                for (_, future, _), result in zip(items, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        cls.stats.errors += 1
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            except asyncio.CancelledError:
+                for _, future, _ in items:
+                    if not future.done():
+                        future.cancel()
+                raise
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    # a worker died (out of memory...), the next prediction spawns a new pool
+                    logging.error("Inference pool is broken: %s", e)
+                    cls._executor = None
+                cls.stats.errors += len(items)
+                for _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+
+def render_inference_metrics() -> str:
+    """the batch metrics of the inference service in the Prometheus text format"""
+    stats = InferenceService.stats
+    lines: List[str] = [
+        "# TYPE predict_errors_total counter",
+        f"predict_errors_total {stats.errors}",
+    ]
+    histograms = [
+        ("predict_batch_size", stats.batch_size),
+        ("predict_queue_wait_seconds", stats.queue_wait),
+        ("predict_batch_seconds", stats.batch_seconds),
+    ]
+    for metric, histogram in histograms:
+        lines.append(f"# TYPE {metric} histogram")
+        for bound, total in histogram.cumulative():
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {total}')
+        lines.append(f"{metric}_sum {histogram.sum}")
+        lines.append(f"{metric}_count {histogram.count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,111 @@
+"""Skin disease model, run in the inference worker processes only.
+
+Nothing of the app is imported here and TensorFlow is imported on the first
+prediction, so a spawned worker starts fast and the web workers never load
+TensorFlow at all (see ``src.ai.inference.InferenceService``). The images are
+downloaded by the web worker, which hashes them for the prediction cache, and
+sent here as bytes.
+"""
+import logging
+
+# Class names
+CLASS_NAMES = [
+    "Acne and Rosacea Photos",
+    "Actinic Keratosis Basal Cell Carcinoma and other Malignant Lesions",
+    "Atopic Dermatitis Photos",
+    "Bullous Disease Photos",
+    "Cellulitis Impetigo and other Bacterial Infections",
+    "Eczema Photos",
+    "Exanthems and Drug Eruptions",
+    "Hair Loss Photos Alopecia and other Hair Diseases",
+    "Herpes HPV and other STDs Photos",
+    "Light Diseases and Disorders of Pigmentation",
+    "Lupus and other Connective Tissue diseases",
+    "Melanoma Skin Cancer Nevi and Moles",
+    "Nail Fungus and other Nail Disease",
+    "Poison Ivy Photos and other Contact Dermatitis",
+    "Psoriasis pictures Lichen Planus and related diseases",
+    "Scabies Lyme Disease and other Infestations and Bites",
+    "Seborrheic Keratoses and other Benign Tumors",
+    "Systemic Disease",
+    "Tinea Ringworm Candidiasis and other Fungal Infections",
+    "Urticaria Hives",
+    "Vascular Tumors",
+    "Vasculitis Photos",
+    "Warts Molluscum and other Viral Infections",
+]
+
+# the model of this process, loaded by the first prediction
+_model = None
+
+
+def _load_model(model_path: str):
+    global _model
+    if _model is None:
+        import tensorflow as tf
+
+        try:
+            _model = tf.keras.models.load_model(
+                model_path, custom_objects=None, compile=True, safe_mode=True
+            )
+            logging.info("Load model success: %s", model_path)
+        except Exception as e:
+            logging.error("Load model fail: %s", e)
+            raise
+    return _model
+
+
+# Create a function to decode an image and resize it for the model
+def load_and_prep_image(content: bytes, img_shape=224):
+    """
+    Turns the bytes of an image file into a tensor
+    and reshapes it to (img_shape, img_shape, colour_channel).
+    """
+    import tensorflow as tf
+
+    img = tf.image.decode_image(content, channels=3)
+
+    # Resize the image (to the same size our model was trained on)
+    img = tf.image.resize(img, size=[img_shape, img_shape])
+
+    # Rescale the image (get all values between 0 and 1)
+    img = img / 255.0
+    return img
+
+
+def _prediction(pred) -> dict:
+    probabilities = [
+        (CLASS_NAMES[i], float(pred[i]) * 100) for i in range(len(CLASS_NAMES))
+    ]
+    sorted_probabilities = sorted(probabilities, key=lambda x: x[1], reverse=True)
+    return {
+        "predict_final": CLASS_NAMES[int(pred.argmax())],
+        "sorted_probabilities": sorted_probabilities,
+    }
+
+
+def predict_images(model_path: str, contents: list[bytes]) -> list:
+    """predict the class of every image in one forward pass
+
+    The results only hold python types, so they are sent back to the web worker as
+    is. An image that can not be decoded gets an exception in its place, the other
+    images of the batch are still predicted.
+    """
+    import tensorflow as tf
+
+    model = _load_model(model_path)
+    results: list = [None] * len(contents)
+    images = []
+    positions = []
+    for position, content in enumerate(contents):
+        try:
+            images.append(load_and_prep_image(content))
+            positions.append(position)
+        except Exception as e:
+            # the exception of another library may not unpickle in the web worker
+            results[position] = RuntimeError(f"{type(e).__name__}: {e}")
+    if images:
+        preds = model.predict(tf.stack(images), batch_size=len(images), verbose=0)
+        for position, pred in zip(positions, preds):
+            results[position] = _prediction(pred)
+    return results
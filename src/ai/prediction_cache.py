@@ -0,0 +1,233 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.ai.inference import SECONDS_BUCKETS, InferenceService
+from src.config import config
+from src.core.cache.redis_backend import RedisBackend
+from src.core.database.postgresql.pool_metrics import Histogram
+from src.core.http import HttpClientPool
+
+# the cached predictions are only valid for the model that made them
+MODEL_NAME = os.path.basename(config.PREDICT_MODEL_PATH)
+RESULT_KEY_PREFIX = f"predict:{MODEL_NAME}:sha256"
+URL_KEY_PREFIX = "predict:url"
+
+
+class _LRU:
+    """in-process least recently used map, in front of redis"""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+
+class PredictionCacheStats:
+    def __init__(self) -> None:
+        # hits by the layer that answered: memory or redis
+        self.hits: Dict[str, int] = {"memory": 0, "redis": 0}
+        self.misses = 0
+        # time of the prediction when it was computed minus the time of the hit
+        self.saved_seconds = 0.0
+        self.hit_seconds = Histogram(SECONDS_BUCKETS)
+
+
+class PredictionCache:
+    """
+     Predictions of the skin disease model, cached by the SHA-256 of the image file.
+
+     The same photo sent again (another url, or uploaded again) is found by its content
+     hash. An url already seen is mapped to the hash of its content, so it is answered
+     without downloading the image. Both maps live in redis, shared by the workers, with
+     an LRU of this process in front. Only misses are queued to the InferenceService, and
+     concurrent requests for the same image wait for one prediction.
+
+     how to use:
+         result = await PredictionCache.predict_url(image_url)
+         result = await PredictionCache.predict_content(content)
+         await PredictionCache.remember_url(uploaded_url, content)
+    """
+
+    _backend: Optional[RedisBackend] = None
+    _results = _LRU(config.PREDICT_CACHE_SIZE)
+    _urls = _LRU(config.PREDICT_CACHE_SIZE)
+    _inflight: Dict[str, asyncio.Task] = {}
+    stats = PredictionCacheStats()
+
+    @classmethod
+    def backend(cls) -> RedisBackend:
+        if cls._backend is None:
+            cls._backend = RedisBackend()
+        return cls._backend
+
+    @classmethod
+    async def predict_url(cls, image_url: str) -> dict:
+        """
+         Prediction of the image at ``image_url``, downloaded only when the url is not known yet.
+
+         @return {"predict_final": class name, "sorted_probabilities": [(class name, percent)]}
+        """
+        started = time.monotonic()
+        url_key = f"{URL_KEY_PREFIX}:{hashlib.sha256(image_url.encode()).hexdigest()}"
+        digest = cls._urls.get(url_key)
+        if digest is None:
+            digest = await cls._redis_get_url(url_key)
+        if digest is not None:
+            cls._urls.set(url_key, digest)
+            result = await cls._lookup(digest, started)
+            if result is not None:
+                return result
+        response = await HttpClientPool.request("GET", image_url)
+        response.raise_for_status()
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        cls._urls.set(url_key, digest)
+        await cls._redis_set_url(url_key, digest)
+        return await cls._predict(digest, content, started)
+
+    @classmethod
+    async def predict_content(cls, content: bytes) -> dict:
+        """
+         Prediction of the image file ``content``.
+
+         @return {"predict_final": class name, "sorted_probabilities": [(class name, percent)]}
+        """
+        started = time.monotonic()
+        return await cls._predict(hashlib.sha256(content).hexdigest(), content, started)
+
+    @classmethod
+    async def remember_url(cls, image_url: str, content: bytes) -> None:
+        """map ``image_url`` to the image ``content`` it was uploaded with, so a later
+        prediction of the url is answered without downloading it"""
+        url_key = f"{URL_KEY_PREFIX}:{hashlib.sha256(image_url.encode()).hexdigest()}"
+        digest = hashlib.sha256(content).hexdigest()
+        cls._urls.set(url_key, digest)
+        await cls._redis_set_url(url_key, digest)
+
+    @classmethod
+    async def _predict(cls, digest: str, content: bytes, started: float) -> dict:
+        result = await cls._lookup(digest, started)
+        if result is not None:
+            return result
+        task = cls._inflight.get(digest)
+        if task is None:
+            cls.stats.misses += 1
+            # detached from the request: a caller that gives up does not cancel the
+            # prediction the other callers of the same image are waiting for
+            task = asyncio.get_running_loop().create_task(
+                cls._compute(digest, content, started)
+            )
+            cls._inflight[digest] = task
+            task.add_done_callback(functools.partial(cls._on_computed, digest))
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def _compute(cls, digest: str, content: bytes, started: float) -> dict:
+        result = await InferenceService.predict(content)
+        entry = {**result, "seconds": time.monotonic() - started}
+        cls._results.set(digest, entry)
+        await cls._redis_set_result(digest, entry)
+        return result
+
+    @classmethod
+    def _on_computed(cls, digest: str, task: asyncio.Task) -> None:
+        if cls._inflight.get(digest) is task:
+            del cls._inflight[digest]
+        # every caller may have given up, do not log "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    @classmethod
+    async def _lookup(cls, digest: str, started: float) -> Optional[dict]:
+        layer = "memory"
+        entry = cls._results.get(digest)
+        if entry is None:
+            layer = "redis"
+            entry = await cls._redis_get_result(digest)
+            if entry is None:
+                return None
+            cls._results.set(digest, entry)
+        elapsed = time.monotonic() - started
+        cls.stats.hits[layer] += 1
+        cls.stats.hit_seconds.observe(elapsed)
+        cls.stats.saved_seconds += max(entry.get("seconds", 0.0) - elapsed, 0.0)
+        return {
+            "predict_final": entry["predict_final"],
+            "sorted_probabilities": entry["sorted_probabilities"],
+        }
+
+    # redis errors only cost a prediction, they never fail the request
+
+    @classmethod
+    async def _redis_get_url(cls, url_key: str) -> Optional[str]:
+        try:
+            digest = await cls.backend().redis.get(url_key)
+        except Exception as e:
+            logging.error("Prediction cache read failed: %s", e)
+            return None
+        return digest.decode() if digest else None
+
+    @classmethod
+    async def _redis_set_url(cls, url_key: str, digest: str) -> None:
+        try:
+            await cls.backend().redis.set(
+                url_key, digest, ex=config.PREDICT_URL_CACHE_TTL_SECONDS
+            )
+        except Exception as e:
+            logging.error("Prediction cache write failed: %s", e)
+
+    @classmethod
+    async def _redis_get_result(cls, digest: str) -> Optional[dict]:
+        try:
+            return await cls.backend().get(f"{RESULT_KEY_PREFIX}:{digest}")
+        except Exception as e:
+            logging.error("Prediction cache read failed: %s", e)
+            return None
+
+    @classmethod
+    async def _redis_set_result(cls, digest: str, entry: dict) -> None:
+        try:
+            await cls.backend().set(
+                entry, f"{RESULT_KEY_PREFIX}:{digest}", ttl=config.PREDICT_CACHE_TTL_SECONDS
+            )
+        except Exception as e:
+            logging.error("Prediction cache write failed: %s", e)
+
+
+def render_prediction_cache_metrics() -> str:
+    """hits, misses and latency saved by the prediction cache in the Prometheus text format"""
+    stats = PredictionCache.stats
+    lines: List[str] = ["# TYPE predict_cache_hits_total counter"]
+    for layer, total in stats.hits.items():
+        lines.append(f'predict_cache_hits_total{{layer="{layer}"}} {total}')
+    counters: List[Tuple[str, float]] = [
+        ("predict_cache_misses_total", stats.misses),
+        ("predict_cache_saved_seconds_total", stats.saved_seconds),
+    ]
+    for metric, value in counters:
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    histogram = stats.hit_seconds
+    lines.append("# TYPE predict_cache_hit_seconds histogram")
+    for bound, total in histogram.cumulative():
+        lines.append(f'predict_cache_hit_seconds_bucket{{le="{bound}"}} {total}')
+    lines.append(f"predict_cache_hit_seconds_sum {histogram.sum}")
+    lines.append(f"predict_cache_hit_seconds_count {histogram.count}")
+    return "\n".join(lines) + "\n"
@@ -36,6 +36,7 @@ from src.apis.medical_records_api import (
     MedicalRecordsApiPOST,
 )
 from src.apis.message_api import MessageApi
+from src.apis.metrics_api import MetricsApi
 from src.apis.notify_api import (
     NotificationApi,
     NotificationReadApi,
@@ -70,6 +71,9 @@ from src.core.route import RouteSwagger
 
 routes = [
     RouteSwagger("/health-check", HealthCheck, methods=["GET"], tags=["USER"]),
+    RouteSwagger(
+        "/metrics", MetricsApi, methods=["GET"], tags=["USER"], include_in_schema=False
+    ),
     # auth
     RouteSwagger("/auth/admin/register", AdminRegisterApi, tags=["ADMIN"]),
     RouteSwagger(
@@ -1,7 +1,6 @@
-import requests
-
 from src.config import config
 from src.core import HTTPEndpoint
+from src.core.http import HttpClientPool
 from src.core.exception import BadRequest
 from src.enum import ErrorCode
 from src.schema.bot_service_schema import QuestionSchema
@@ -10,8 +9,8 @@ from src.schema.bot_service_schema import QuestionSchema
 class BotServiceApi(HTTPEndpoint):
     async def get(self, query_params: QuestionSchema):
         try:
-            response_data = requests.get(
-                config.BOT_SERVICE_URL, params=query_params.model_dump()
+            response_data = await HttpClientPool.request(
+                "GET", config.BOT_SERVICE_URL, params=query_params.model_dump()
             )
             if response_data.status_code == 200:
                 return response_data.json()
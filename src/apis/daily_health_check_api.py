@@ -118,26 +118,26 @@ class DailyHealthCheckApi(HTTPEndpoint):
     async def _process_images(
         self, img_arr: List[Union[UploadFile, str]]
     ) -> List[ImageDailyHealthCheck]:
+        files = [img for img in img_arr if isinstance(img, UploadFile)]
+        # every file is checked before the first one is uploaded
+        for img in files:
+            if not self._is_valid_image(img):
+                raise BadRequest(
+                    error_code=ErrorCode.INVALID_FILE_TYPE.name,
+                    errors={"message": "Invalid file type or size"},
+                )
+        urls = await S3Service().upload_files_from_form(files)
         images = []
-        s3_service = S3Service()
-        for img in img_arr:
-            if isinstance(img, UploadFile):
-                if not self._is_valid_image(img):
-                    raise BadRequest(
-                        error_code=ErrorCode.INVALID_FILE_TYPE.name,
-                        errors={"message": "Invalid file type or size"},
-                    )
-                await img.seek(0)
-                url = await s3_service.upload_file_from_form(img)
-                if not url:
-                    raise Forbidden(
-                        error_code=ErrorCode.INVALID_FILE_TYPE.name,
-                        errors={"message": "Failed to upload image to S3 bucket"},
-                    )
-                img_schema = ImageDailyHealthCheck(
-                    image_url=url, image_name=img.filename, image_size=img.size
+        for img, url in zip(files, urls):
+            if not url:
+                raise Forbidden(
+                    error_code=ErrorCode.INVALID_FILE_TYPE.name,
+                    errors={"message": "Failed to upload image to S3 bucket"},
                 )
-                images.append(img_schema)
+            img_schema = ImageDailyHealthCheck(
+                image_url=url, image_name=img.filename, image_size=img.size
+            )
+            images.append(img_schema)
         return images
 
     def _is_valid_image(self, img: UploadFile) -> bool:
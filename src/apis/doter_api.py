@@ -8,6 +8,7 @@ from src.factory import Factory
 from src.helper.doctor_helper import DoctorHelper
 from src.models.doctor_model import DoctorModel
 from src.schema.doctor_schema import (
+    RequestDetailDoctorQuerySchema,
     RequestDetailDoctorSchema,
     RequestDoctorPatientByIdSchema,
     RequestDoctorPatientSchema,
@@ -90,6 +91,8 @@ class GetAllDoctorLocalAPi(HTTPEndpoint):
                 filter_data=_filter,
                 order_by=query_params.order_by,
                 is_desc=query_params.is_desc,
+                pagination=query_params.pagination,
+                cursor=query_params.cursor,
             )
             return response_data
         except Exception as e:
@@ -132,6 +135,8 @@ class GetAllDoctorForeignAPi(HTTPEndpoint):
                 filter_data=_filter,
                 order_by=query_params.order_by,
                 is_desc=query_params.is_desc,
+                pagination=query_params.pagination,
+                cursor=query_params.cursor,
             )
             return response_data
         except Exception as e:
@@ -145,10 +150,18 @@ class GetAllDoctorForeignAPi(HTTPEndpoint):
 
 
 class GetDetailDoctorById(HTTPEndpoint):
-    async def get(self, path_params: RequestDetailDoctorSchema):
+    async def get(
+        self,
+        path_params: RequestDetailDoctorSchema,
+        query_params: RequestDetailDoctorQuerySchema,
+    ):
         try:
             doctor_helper: DoctorHelper = await Factory().get_doctor_helper()
-            reponse = await doctor_helper.get_doctor_by_id(path_params.doctor_id)
+            reponse = await doctor_helper.get_doctor_by_id(
+                path_params.doctor_id,
+                comment_page_size=query_params.comment_page_size,
+                comment_cursor=query_params.comment_cursor,
+            )
             return reponse if reponse else {"message": "Doctor not found"}
         except Exception as e:
             log.error(f"Error: {e}")
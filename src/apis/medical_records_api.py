@@ -70,7 +70,12 @@ class MedicalRecordsApiGET(HTTPEndpoint):
 
             medical_records_helper = await Factory().get_medical_records_helper()
             result = await medical_records_helper.get_all_medical_records(
-                current_page, page_size, where=where, order_by=order_by
+                current_page,
+                page_size,
+                where=where,
+                order_by=order_by,
+                cursor=query_params.cursor,
+                pagination=query_params.pagination,
             )
             return result
         except Exception as e:
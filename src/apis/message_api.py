@@ -21,7 +21,9 @@ class MessageApi(HTTPEndpoint):
         try:
             message_helper = await Factory().get_message_helper()
             result = await message_helper.get_messages_from_conversation(
-                query_params.conversation_id
+                query_params.conversation_id,
+                before_id=query_params.before_id,
+                limit=query_params.limit,
             )
             return result
         except Exception as e:
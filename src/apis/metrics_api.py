@@ -0,0 +1,59 @@
+import ipaddress
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from src.ai.inference import render_inference_metrics
+from src.ai.prediction_cache import render_prediction_cache_metrics
+from src.config import config
+from src.core import HTTPEndpoint
+from src.core.database.postgresql import render_pool_metrics
+from src.core.exception import Forbidden
+from src.core.security import JsonWebToken
+from src.enum import ErrorCode, Role
+
+ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network, strict=False)
+    for network in config.METRICS_ALLOWED_NETWORKS
+]
+
+# validate does not keep any state, one instance serves every request
+_auth = JsonWebToken()
+
+
+def is_allowed_client(host: str | None) -> bool:
+    """whether the client address belongs to METRICS_ALLOWED_NETWORKS"""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in ALLOWED_NETWORKS)
+
+
+class MetricsApi(HTTPEndpoint):
+    async def get(self, request: Request):
+        """
+        metrics of the database connection pools (writer, readers), of the
+        prediction batches and of the prediction cache in prometheus text format,
+        served to METRICS_ALLOWED_NETWORKS or to an admin
+
+        Args:
+            request (Request): _description_
+
+        Returns:
+            PlainTextResponse: checked out, overflow, checkout wait histogram, connection age,
+                batch size, queue wait and batch time histograms, cache hits, misses
+                and latency saved
+        """
+        if not is_allowed_client(request.client.host if request.client else None):
+            # the token is only required outside of the scrape networks
+            auth = await _auth.validate(request)
+            if auth.get("role") != Role.ADMIN.value:
+                raise Forbidden(
+                    error_code=ErrorCode.FORBIDDEN.name,
+                    errors={"message": ErrorCode.msg_permission_denied.value},
+                )
+        return PlainTextResponse(
+            render_pool_metrics() + render_inference_metrics() + render_prediction_cache_metrics(),
+            media_type="text/plain; version=0.0.4",
+        )
@@ -21,6 +21,25 @@ from src.schema.post_schema import (
 )
 
 
+async def _upload_images(
+    s3_service: S3Service, images_form: list, allow_links: bool = True
+) -> list:
+    """upload the image files of the form in one batch, the links stay where they are"""
+    files = []
+    for image in images_form:
+        if isinstance(image, UploadFile):
+            files.append(image)
+        elif not (allow_links and isinstance(image, str) and image.startswith("http")):
+            raise BadRequest(
+                error_code=ErrorCode.VALIDATION_ERROR.name,
+                errors={"message": ErrorCode.msg_invalid_medical_record.value},
+            )
+    links = iter(await s3_service.upload_files_from_form(files))
+    return [
+        next(links) if isinstance(image, UploadFile) else image for image in images_form
+    ]
+
+
 class GetPostUserApi(HTTPEndpoint):
     async def get(self, query_params: RequestGetAllPostSchema):
         try:
@@ -75,20 +94,7 @@ class CreatePostApi(HTTPEndpoint):
                         errors={"message": ErrorCode.msg_invalid_medical_record.value},
                     )
             form_request = await request.form()
-            images = []
-            images_form = form_request.getlist("images")
-            for image in images_form:
-                if isinstance(image, UploadFile):
-                    upload_file: UploadFile = image
-                    image = await s3_service.upload_file_from_form(upload_file)
-                    images.append(image)
-                elif isinstance(image, str) and image.startswith("http"):
-                    images.append(image)
-                else:
-                    raise BadRequest(
-                        error_code=ErrorCode.VALIDATION_ERROR.name,
-                        errors={"message": ErrorCode.msg_invalid_medical_record.value},
-                    )
+            images = await _upload_images(s3_service, form_request.getlist("images"))
 
             content_schema = MessageContentSchema(
                 media=media, images=images, content=content
@@ -154,20 +160,7 @@ class CreatePostApi(HTTPEndpoint):
                         errors={"message": ErrorCode.msg_invalid_medical_record.value},
                     )
             form_request = await request.form()
-            images = []
-            images_form = form_request.getlist("images")
-            for image in images_form:
-                if isinstance(image, UploadFile):
-                    upload_file: UploadFile = image
-                    image = await s3_service.upload_file_from_form(upload_file)
-                    images.append(image)
-                if isinstance(image, str) and image.startswith("http"):
-                    images.append(image)
-                else:
-                    raise BadRequest(
-                        error_code=ErrorCode.VALIDATION_ERROR.name,
-                        errors={"message": ErrorCode.msg_invalid_medical_record.value},
-                    )
+            images = await _upload_images(s3_service, form_request.getlist("images"))
 
             content_schema = (
                 MessageContentSchema(media=media, images=images, content=content)
@@ -266,20 +259,7 @@ class CommentApi(HTTPEndpoint):
                         errors={"message": ErrorCode.msg_invalid_medical_record.value},
                     )
             form_request = await request.form()
-            images = []
-            images_form = form_request.getlist("images")
-            for image in images_form:
-                if isinstance(image, UploadFile):
-                    upload_file: UploadFile = image
-                    image = await s3_service.upload_file_from_form(upload_file)
-                    images.append(image)
-                elif isinstance(image, str) and image.startswith("http"):
-                    images.append(image)
-                else:
-                    raise BadRequest(
-                        error_code=ErrorCode.VALIDATION_ERROR.name,
-                        errors={"message": ErrorCode.msg_invalid_medical_record.value},
-                    )
+            images = await _upload_images(s3_service, form_request.getlist("images"))
 
             content_schema = MessageContentSchema(
                 media=media, images=images, content=content
@@ -330,18 +310,9 @@ class CommentApi(HTTPEndpoint):
                         errors={"message": ErrorCode.msg_invalid_medical_record.value},
                     )
             form_request = await request.form()
-            images = []
-            images_form = form_request.getlist("images")
-            for image in images_form:
-                if isinstance(image, UploadFile):
-                    upload_file: UploadFile = image
-                    image = await s3_service.upload_file_from_form(upload_file)
-                    images.append(image)
-                else:
-                    raise BadRequest(
-                        error_code=ErrorCode.VALIDATION_ERROR.name,
-                        errors={"message": ErrorCode.msg_invalid_medical_record.value},
-                    )
+            images = await _upload_images(
+                s3_service, form_request.getlist("images"), allow_links=False
+            )
 
             content_schema = MessageContentSchema(
                 media=media, images=images, content=content
@@ -11,14 +11,19 @@ from starlette.responses import Response
 from starlette.routing import Route
 from starlette.schemas import SchemaGenerator
 
+from src.ai.inference import InferenceService
 from src.apis import routes
 from src.config import config
 from src.core import sentry
 from src.core.cache import Cache, CustomKeyMaker, RedisBackend
+from src.core.database.postgresql import reader_pool
+from src.core.http import HttpClientPool
 from src.core.logger import DefaultFormatter, logger
 from src.core.middlewares.header import HeadersMiddleware
 from src.core.middlewares.sqlalchemy import SQLAlchemyMiddleware
 from src.enum import ErrorCode
+from src.helper.s3_helper import S3Service
+from src.schedule import register_jobs, scheduler
 from src.swagger import SwaggerUI
 
 schemas = SchemaGenerator(
@@ -124,6 +129,24 @@ async def lifespan(app):
     Cache.init(backend=RedisBackend(), key_maker=CustomKeyMaker())
 
     sentry.setup(config.SENTRY_DSN)
+    HttpClientPool.start(
+        max_connections=config.HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_CLIENT_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        timeout=config.HTTP_CLIENT_TIMEOUT,
+        connect_timeout=config.HTTP_CLIENT_CONNECT_TIMEOUT,
+        concurrency=config.HTTP_CLIENT_CONCURRENCY,
+    )
+
+    reader_pool.start(config.POSTGRES_REPLICA_CHECK_INTERVAL_SECONDS)
+    register_jobs().start()
+    InferenceService.start(
+        config.PREDICT_MODEL_PATH,
+        workers=config.PREDICT_WORKERS,
+        queue_size=config.PREDICT_QUEUE_SIZE,
+        max_batch=config.PREDICT_MAX_BATCH,
+        max_wait=config.PREDICT_MAX_WAIT_MS / 1000,
+    )
 
     # create a default admin account
     # admin_helper = await Factory().get_admin_helper()
@@ -131,6 +154,12 @@ async def lifespan(app):
 
     yield {}
 
+    scheduler.shutdown(wait=False)
+    await InferenceService.close()
+    await S3Service.close()
+    await reader_pool.stop()
+    await HttpClientPool.close()
+
 
 def openapi_schema(request):
     return schemas.OpenAPIResponse(request=request)
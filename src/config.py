@@ -29,6 +29,27 @@ class Config(BaseSettings):
 
     POSTGRES_URL_MASTER: str
     POSTGRES_URL_SLAVE: str
+    # extra read replicas and their weights (same order), POSTGRES_URL_SLAVE has weight 1
+    POSTGRES_URL_SLAVES: List[str] = []
+    POSTGRES_SLAVE_WEIGHTS: List[int] = []
+    # connection pools, per engine (the reader settings apply to every replica)
+    POSTGRES_WRITER_POOL_SIZE: int = 10
+    POSTGRES_WRITER_MAX_OVERFLOW: int = 10
+    POSTGRES_WRITER_POOL_TIMEOUT: float = 30.0
+    POSTGRES_WRITER_STATEMENT_TIMEOUT_MS: int = 30000
+    POSTGRES_READER_POOL_SIZE: int = 10
+    POSTGRES_READER_MAX_OVERFLOW: int = 20
+    POSTGRES_READER_POOL_TIMEOUT: float = 30.0
+    POSTGRES_READER_STATEMENT_TIMEOUT_MS: int = 15000
+    POSTGRES_POOL_RECYCLE: int = 3600
+    POSTGRES_POOL_PRE_PING: bool = True
+    # asyncpg prepared statement cache per connection, 0 disables it (needed behind pgbouncer)
+    POSTGRES_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # reads go to the writer for this long after a write in the same session
+    POSTGRES_STICKY_WRITER_MS: int = 2000
+    # replicas lagging more than this are skipped until they catch up
+    POSTGRES_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    POSTGRES_REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0
     POSTGRES_URL_ELAMBIC: str
     PORT: str
     PREFIX_URL: Optional[str] = Field(default="/v1/admin")
@@ -60,6 +81,52 @@ class Config(BaseSettings):
     MAX_TIME_DATA_API:int = 700
     IMG_SIZE_MB:int = 5
     MEDIA_SIZE_MB:int = 10
+    # payos sdk calls (thread pool, retry, circuit breaker)
+    PAYOS_MAX_WORKERS: int = 8
+    PAYOS_TIMEOUT: float = 10.0
+    PAYOS_RETRY_BASE_DELAY: float = 0.5
+    PAYOS_RETRY_MAX_DELAY: float = 4.0
+    PAYOS_LOOKUP_RETRY_DELAY: float = 2.0
+    PAYOS_BREAKER_FAILURES: int = 5
+    PAYOS_BREAKER_RESET_TIMEOUT: float = 30.0
+    # shared outbound http client (chat service, bot service, ...)
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CLIENT_TIMEOUT: float = 10.0
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 5.0
+    HTTP_CLIENT_CONCURRENCY: int = 50
+    # doctor_ranking materialized view: checked every interval, refreshed when a
+    # rating/price/schedule write marked it stale or when it is older than max age
+    DOCTOR_RANKING_REFRESH_INTERVAL_SECONDS: int = 10
+    DOCTOR_RANKING_MAX_AGE_SECONDS: int = 300
+    # revenue dashboard, dropped when the rollup recomputes work schedule days anyway
+    STATISTICAL_PRICE_CACHE_TTL_SECONDS: int = 3600
+    # statistics rollup tables: days marked dirty by the writes are recomputed every interval
+    STATISTICS_ROLLUP_INTERVAL_SECONDS: int = 60
+    AGE_DISTRIBUTION_CACHE_TTL_SECONDS: int = 600
+    # skin disease prediction, served by a process pool spawned on the first /predict
+    PREDICT_MODEL_PATH: str = "src/ai/my_model_vgg16_1.h5"
+    PREDICT_WORKERS: int = 1
+    PREDICT_QUEUE_SIZE: int = 64
+    # micro batches: up to PREDICT_MAX_BATCH images, waiting at most PREDICT_MAX_WAIT_MS
+    # after the first one, share one forward pass
+    PREDICT_MAX_BATCH: int = 8
+    PREDICT_MAX_WAIT_MS: float = 10.0
+    # predictions cached by the sha256 of the image (redis, LRU of PREDICT_CACHE_SIZE in
+    # front), an url is mapped to the hash of its content for PREDICT_URL_CACHE_TTL_SECONDS
+    PREDICT_CACHE_SIZE: int = 1024
+    PREDICT_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    PREDICT_URL_CACHE_TTL_SECONDS: int = 24 * 3600
+    # S3 uploads: threads running the boto3 uploads, files over the threshold are sent
+    # in parts of that size, S3_MULTIPART_CONCURRENCY parts at a time
+    S3_UPLOAD_WORKERS: int = 8
+    S3_MULTIPART_THRESHOLD_MB: int = 5
+    S3_MULTIPART_CONCURRENCY: int = 4
+    # /metrics: served to the scrapers of these networks (the client address seen by the
+    # app, run uvicorn with --forwarded-allow-ips behind a proxy), anyone else needs an
+    # admin token
+    METRICS_ALLOWED_NETWORKS: List[str] = ["127.0.0.1/32", "::1/128"]
 
 config = Config()
 
@@ -7,3 +7,5 @@ class CacheTag(Enum):
     GET_CATEGORIES = "get_categories"
     GET_HISTORY = "get_chat_history"
     GET_QUESTION = "get_question"
+    GET_AGE_DISTRIBUTION = "get_age_distribution"
+    GET_STATISTICAL_PRICE = "get_statistical_price"
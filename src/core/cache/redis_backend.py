@@ -1,5 +1,5 @@
 import pickle
-from typing import Any, List
+from typing import Any, Dict, List
 
 import redis.asyncio as aioredis
 import ujson
@@ -44,8 +44,26 @@ class RedisBackend(BaseBackend):
 
         await self.redis.set(name=key, value=response, ex=ttl)
 
+    async def zadd(self, key: str, mapping: Dict[str, float]) -> None:
+        await self.redis.zadd(key, mapping)
+
+    async def zrangebyscore(
+        self, key: str, min_score: float | str, max_score: float | str
+    ) -> List[str]:
+        members = await self.redis.zrangebyscore(key, min_score, max_score)
+        return [member.decode("utf-8") for member in members]
+
+    async def zrem(self, key: str, *members: str) -> None:
+        await self.redis.zrem(key, *members)
+
+    async def zremrangebyscore(
+        self, key: str, min_score: float | str, max_score: float | str
+    ) -> None:
+        await self.redis.zremrangebyscore(key, min_score, max_score)
+
     async def delete_startswith(self, value: str) -> None:
-        async for key in self.redis.scan_iter(f"{value}::*"):
+        # keys of CustomKeyMaker are "{prefix}:{function}:{identify_key}"
+        async for key in self.redis.scan_iter(f"{value}:*"):
             await self.redis.delete(key)
 
     async def delete(self, key: str) -> None:
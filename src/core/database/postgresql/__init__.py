@@ -1,9 +1,15 @@
 from .session import session_scope
 from .repository import PostgresRepository, Model
 from .session import (
+    reader_pool,
     get_session,
     get_session_context,
     set_session_context,
     reset_session_context,
 )
 from .transaction import Transactional, Propagation
+from .where_cache import compile_where
+from .loader import loader_options
+from .pool_metrics import pool_snapshot, render_pool_metrics
+from .serializer import serializer_for
+from .projection import Projection
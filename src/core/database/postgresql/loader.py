@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Named loader profiles for relationships.
+
+Relationships are declared with ``lazy="raise_on_sql"``, so nothing is joined
+unless the query asks for it. Each model lists the relationships a call site
+usually needs under a profile name:
+
+    class AppointmentModel(Model):
+        __loader_profiles__ = {
+            "list": ("patient", "doctor", "work_schedule"),
+            "detail": ("patient", "doctor", "payment", "work_schedule"),
+        }
+
+    query = select(AppointmentModel).options(*loader_options(AppointmentModel, "list"))
+
+A path can be dotted ("author.patient") to load nested relationships.
+Many-to-one and one-to-one paths use ``joinedload``, collections use
+``selectinload`` so the row count of the main query is not multiplied.
+Anything not listed in the profile raises instead of emitting a lazy query.
+"""
+from functools import lru_cache
+from typing import Any, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+BARE = "bare"
+LIST = "list"
+DETAIL = "detail"
+
+
+@lru_cache(maxsize=None)
+def loader_options(model_class: Any, profile: str = BARE) -> Tuple[Any, ...]:
+    """Return the loader options of ``profile`` for ``model_class``.
+
+    :param model_class: The mapped class queried.
+    :param profile: The profile name, one of ``__loader_profiles__`` keys or "bare".
+    :return: A tuple of loader options, to be used with ``query.options(*...)``.
+    """
+    profiles = getattr(model_class, "__loader_profiles__", {})
+    if profile != BARE and profile not in profiles:
+        raise KeyError(f"{model_class.__name__} has no loader profile {profile!r}")
+    options = [_path_option(model_class, path) for path in profiles.get(profile, ())]
+    # relationships outside of the profile can still be read from the identity map
+    options.append(raiseload("*", sql_only=True))
+    return tuple(options)
+
+
+def _path_option(model_class: Any, path: str) -> Any:
+    option = None
+    current = model_class
+    for name in path.split("."):
+        attribute = getattr(current, name)
+        prop = inspect(current).relationships[name]
+        if option is None:
+            option = selectinload(attribute) if prop.uselist else joinedload(attribute)
+        elif prop.uselist:
+            option = option.selectinload(attribute)
+        else:
+            option = option.joinedload(attribute)
+        current = prop.mapper.class_
+    return option
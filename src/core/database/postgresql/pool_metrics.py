@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Connection pool metrics of the writer/reader engines.
+
+Every engine is created with ``poolclass=InstrumentedAsyncQueuePool`` and
+``pool_logging_name=<engine name>``. The pool times how long a checkout waits
+for a connection, and pool events keep the connect time of the live
+connections. ``render_pool_metrics`` returns everything in the Prometheus text
+format for the /metrics endpoint:
+
+    db_pool_size{engine="writer"} 10
+    db_pool_checked_out{engine="writer"} 3
+    db_pool_overflow{engine="writer"} -7
+    db_pool_checkout_wait_seconds_bucket{engine="writer",le="0.01"} 120
+    db_pool_connection_age_seconds_max{engine="writer"} 812.4
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+WAIT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else str(bound), total))
+        return result
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self.checkout_wait = Histogram(WAIT_BUCKETS)
+        self.checkout_timeouts = 0
+        # id of the dbapi connection -> monotonic time it was opened
+        self.connected_at: Dict[int, float] = {}
+
+
+_pools: Dict[str, AsyncAdaptedQueuePool] = {}
+_stats: Dict[str, PoolStats] = {}
+
+
+def _pool_name(pool) -> str:
+    return pool._orig_logging_name or "default"
+
+
+def _stats_for(pool) -> PoolStats:
+    return _stats.setdefault(_pool_name(pool), PoolStats())
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` timing the wait of every checkout."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        _pools[_pool_name(self)] = self
+        # a recreated pool (after dispose) inherits the listeners through _dispatch
+        if kwargs.get("_dispatch") is None:
+            _register_events(self)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            _stats_for(self).checkout_timeouts += 1
+            raise
+        finally:
+            _stats_for(self).checkout_wait.observe(time.perf_counter() - start)
+
+
+def _register_events(pool: InstrumentedAsyncQueuePool) -> None:
+    stats = _stats_for(pool)
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.connected_at[id(dbapi_connection)] = time.monotonic()
+
+    @event.listens_for(pool, "close")
+    def _on_close(dbapi_connection, connection_record):
+        stats.connected_at.pop(id(dbapi_connection), None)
+
+    @event.listens_for(pool, "close_detached")
+    def _on_close_detached(dbapi_connection):
+        stats.connected_at.pop(id(dbapi_connection), None)
+
+
+def pool_snapshot() -> Dict[str, Dict[str, float]]:
+    """current numbers of every pool, keyed by engine name"""
+    now = time.monotonic()
+    snapshot = {}
+    for name, pool in _pools.items():
+        stats = _stats_for(pool)
+        ages = [now - connected_at for connected_at in stats.connected_at.values()]
+        snapshot[name] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "connections": len(ages),
+            "connection_age_seconds_max": max(ages, default=0.0),
+            "connection_age_seconds_avg": sum(ages) / len(ages) if ages else 0.0,
+            "checkout_timeouts": stats.checkout_timeouts,
+        }
+    return snapshot
+
+
+def render_pool_metrics() -> str:
+    lines: List[str] = []
+    snapshot = pool_snapshot()
+    gauges = [
+        ("db_pool_size", "size", "gauge"),
+        ("db_pool_checked_in", "checked_in", "gauge"),
+        ("db_pool_checked_out", "checked_out", "gauge"),
+        ("db_pool_overflow", "overflow", "gauge"),
+        ("db_pool_connections", "connections", "gauge"),
+        ("db_pool_connection_age_seconds_max", "connection_age_seconds_max", "gauge"),
+        ("db_pool_connection_age_seconds_avg", "connection_age_seconds_avg", "gauge"),
+        ("db_pool_checkout_timeouts_total", "checkout_timeouts", "counter"),
+    ]
+    for metric, key, metric_type in gauges:
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for name, values in snapshot.items():
+            lines.append(f'{metric}{{engine="{name}"}} {values[key]}')
+
+    lines.append("# TYPE db_pool_checkout_wait_seconds histogram")
+    for name in snapshot:
+        histogram = _stats[name].checkout_wait
+        for bound, total in histogram.cumulative():
+            lines.append(
+                f'db_pool_checkout_wait_seconds_bucket{{engine="{name}",le="{bound}"}} {total}'
+            )
+        lines.append(f'db_pool_checkout_wait_seconds_sum{{engine="{name}"}} {histogram.sum}')
+        lines.append(f'db_pool_checkout_wait_seconds_count{{engine="{name}"}} {histogram.count}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Column projections for list endpoints.
+
+A list usually needs a handful of fields of each related object. Loading full
+entities (and the identity map behind them) for that is wasted work. A
+``Projection`` declares what is needed and builds a narrow ``select()`` of
+columns with explicit joins:
+
+    APPOINTMENT_LIST = Projection(
+        AppointmentModel,
+        related={
+            "work_schedule": None,                     # all columns
+            "doctor": ("first_name", "last_name", "avatar"),
+        },
+        extra={"is_payment": PaymentModel.id.isnot(None)},
+    )
+    query = APPOINTMENT_LIST.select().where(...)
+    items = APPOINTMENT_LIST.nest_many((await session.execute(query)).all())
+    # [{"id": 1, ..., "is_payment": True, "work_schedule": {...}, "doctor": {...}}]
+
+Related paths can be dotted ("author.patient") and are nested the same way in
+the result. Every relationship is joined through its own alias, so the same
+table can be projected twice (doctor_create / doctor_read); use ``entity(path)``
+to filter on it. A related object missing from an outer join comes back as None.
+Dates and times are returned in isoformat, like ``Model.as_dict``.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, inspect, select
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.interfaces import MANYTOONE
+
+from .serializer import Converter, converter_for
+
+Fields = Optional[Sequence[str]]
+
+
+class _Node:
+    __slots__ = ("path", "entity", "inner", "slots")
+
+    def __init__(self, path: Tuple[str, ...], entity: Any, inner: bool) -> None:
+        self.path = path
+        self.entity = entity
+        # inner join, only when every join up to this node can not drop a row
+        self.inner = inner
+        # (key, position in the row, converter)
+        self.slots: List[Tuple[str, int, Converter]] = []
+
+
+class Projection:
+    """Narrow select of some columns of a model and of its relationships."""
+
+    def __init__(
+        self,
+        model_class: Any,
+        fields: Fields = None,
+        related: Optional[Dict[str, Fields]] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        :param model_class: The mapped class listed.
+        :param fields: Columns of the model, None for all of them.
+        :param related: Relationship path -> columns of the related model (None for all).
+        :param extra: Name -> SQL expression added to the top level of each item.
+        """
+        self.model_class = model_class
+        self._columns: List[Any] = []
+        self._root = _Node((), model_class, True)
+        self._nodes: Dict[Tuple[str, ...], _Node] = {}
+        self._add_fields(self._root, fields, label=True)
+        for path in sorted(related or {}, key=lambda item: item.count(".")):
+            self._add_fields(self._node(tuple(path.split("."))), related[path])
+        self._extra: List[Tuple[str, int]] = []
+        for name, expression in (extra or {}).items():
+            self._extra.append((name, len(self._columns)))
+            self._columns.append(expression.label(name))
+
+    def _node(self, path: Tuple[str, ...]) -> _Node:
+        node = self._nodes.get(path)
+        if node is not None:
+            return node
+        parent = self._node(path[:-1]) if len(path) > 1 else self._root
+        mapper = inspect(parent.entity).mapper
+        prop = mapper.relationships[path[-1]]
+        inner = (
+            parent.inner
+            and prop.direction is MANYTOONE
+            and all(not column.nullable for column in prop.local_columns)
+        )
+        node = _Node(path, aliased(prop.mapper.class_, name="_".join(path)), inner)
+        self._nodes[path] = node
+        return node
+
+    def _add_fields(self, node: _Node, fields: Fields, label: bool = False) -> None:
+        mapper = inspect(node.entity).mapper
+        names = fields if fields is not None else [column.key for column in mapper.columns]
+        for name in names:
+            column = mapper.columns[name]
+            attribute = getattr(node.entity, name)
+            # top level columns keep their name so keyset pagination can read them back
+            self._columns.append(attribute.label(name) if label else attribute)
+            node.slots.append((name, len(self._columns) - 1, converter_for(column)))
+
+    def entity(self, path: str) -> Any:
+        """the alias a related path is joined with, to filter or order on it"""
+        return self._nodes[tuple(path.split("."))].entity
+
+    def select(self) -> Select:
+        query = select(*self._columns).select_from(self.model_class)
+        for path, node in self._nodes.items():
+            parent = self._nodes[path[:-1]].entity if len(path) > 1 else self.model_class
+            query = query.join(
+                getattr(parent, path[-1]).of_type(node.entity), isouter=not node.inner
+            )
+        return query
+
+    @staticmethod
+    def _values(node: _Node, row: Sequence[Any]) -> Dict[str, Any]:
+        return {
+            key: row[index] if convert is None else convert(row[index])
+            for key, index, convert in node.slots
+        }
+
+    def nest(self, row: Sequence[Any]) -> Dict[str, Any]:
+        item = self._values(self._root, row)
+        for name, index in self._extra:
+            item[name] = row[index]
+        for path, node in self._nodes.items():
+            parent = item
+            for name in path[:-1]:
+                parent = parent.get(name)
+                if parent is None:
+                    break
+            else:
+                values = self._values(node, row)
+                missing = node.slots and all(value is None for value in values.values())
+                parent[path[-1]] = None if missing else values
+        return item
+
+    def nest_many(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        return [self.nest(row) for row in rows]
@@ -1,17 +1,27 @@
 # -*- coding: utf-8 -*-
+import base64
 import json
 import time
 from datetime import date, datetime, time, timedelta, timezone
 from functools import reduce
 from operator import and_
-from typing import Any, Dict, Generic, List, Type, TypeVar, Union
+from typing import Any, Dict, Generic, Iterable, List, Sequence, Type, TypeVar, Union
 
 from sqlalchemy import (Boolean, Integer, Select, String, and_, asc, between,
-                        desc, event, or_, select)
+                        desc, event, literal, not_, or_, select, text, tuple_)
+from sqlalchemy.dialects.postgresql import array
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column
 from sqlalchemy.sql import func
 
+from src.core.exception import BadRequest
+from src.enum import ErrorCode
+
+from .loader import loader_options
+from .projection import Projection
+from .serializer import serializer_for
+from .where_cache import compile_where
+
 Base = declarative_base()
 ModelType = TypeVar("ModelType", bound=Base)
 
@@ -43,6 +53,7 @@ class PostgresRepository(Generic[ModelType]):
         join_: set[str] | None = None,
         where: dict = None,
         order_by: tuple[str, str] | None = None,
+        profile: str | None = None,
     ) -> list[ModelType]:
         """
         Returns a list of model instances.
@@ -51,9 +62,10 @@ class PostgresRepository(Generic[ModelType]):
         :param limit: The number of record to return.
         :param join_: The joins to make.
         :param where: The conditions for the WHERE clause.
+        :param profile: The loader profile of the relationships (see ``loader_options``).
         :return: A list of model instances.
         """
-        query = self._query(join_)
+        query = self._query(join_, profile=profile)
         query = query.offset(skip).limit(limit)
 
         # if where is not None:
@@ -88,7 +100,13 @@ class PostgresRepository(Generic[ModelType]):
         #             conditions.append(or_(*or_conditions))
 
         #     # Kết hợp các điều kiện bằng `and_`
-        query = query.where(destruct_where(self.model_class, where))
+        params: dict[str, Any] = {}
+        compiled = compile_where(self.model_class, where)
+        if compiled is None:
+            query = query.where(destruct_where(self.model_class, where))
+        elif compiled.clause is not None:
+            query = query.where(compiled.clause)
+            params = compiled.params
 
         if order_by is not None:
             column, direction = order_by
@@ -98,8 +116,8 @@ class PostgresRepository(Generic[ModelType]):
                 query = query.order_by(asc(getattr(self.model_class, column)))
 
         if join_ is not None:
-            return await self.all_unique(query)
-        return await self._all(query)
+            return await self.all_unique(query, params)
+        return await self._all(query, params)
 
     async def get_by(
         self,
@@ -107,6 +125,7 @@ class PostgresRepository(Generic[ModelType]):
         value: Any,
         join_: set[str] | None = None,
         unique: bool = False,
+        profile: str | None = None,
     ) -> ModelType:
         """
         Returns the model instance matching the field and value.
@@ -114,9 +133,10 @@ class PostgresRepository(Generic[ModelType]):
         :param field: The field to match.
         :param value: The value to match.
         :param join_: The joins to make.
+        :param profile: The loader profile of the relationships (see ``loader_options``).
         :return: The model instance.
         """
-        query = self._query(join_)
+        query = self._query(join_, profile=profile)
         query = await self._get_by(query, field, value)
 
         if join_ is not None:
@@ -156,32 +176,37 @@ class PostgresRepository(Generic[ModelType]):
         self,
         join_: set[str] | None = None,
         order_: dict | None = None,
+        profile: str | None = None,
     ) -> Select:
         """
         Returns a callable that can be used to query the model.
 
         :param join_: The joins to make.
         :param order_: The order of the results. (e.g desc, asc)
+        :param profile: The loader profile of the relationships, e.g "list", "detail", "bare".
         :return: A callable that can be used to query the model.
         """
         query = select(self.model_class)
+        if profile is not None:
+            query = query.options(*loader_options(self.model_class, profile))
         query = self._maybe_join(query, join_)
         query = self._maybe_ordered(query, order_)
 
         return query
 
-    async def _all(self, query: Select) -> list[ModelType]:
+    async def _all(self, query: Select, params: dict[str, Any] | None = None) -> list[ModelType]:
         """
         Returns all results from the query.
 
         :param query: The query to execute.
+        :param params: The bind parameters of the query (see ``compile_where``).
         :return: A list of model instances.
         """
-        query = await self.session.scalars(query)
+        query = await self.session.scalars(query, params or None)
         return query.all()
 
-    async def all_unique(self, query: Select) -> list[ModelType]:
-        result = await self.session.execute(query)
+    async def all_unique(self, query: Select, params: dict[str, Any] | None = None) -> list[ModelType]:
+        result = await self.session.execute(query, params or None)
         return result.unique().scalars().all()
 
     async def _first(self, query: Select) -> ModelType | None:
@@ -209,16 +234,175 @@ class PostgresRepository(Generic[ModelType]):
         query = await self.session.scalars(query)
         return query.one()
 
-    async def _count(self, query: Select) -> int:
+    async def _count(self, query: Select, params: dict[str, Any] | None = None) -> int:
         """
         Returns the count of the records.
 
         :param query: The query to execute.
+        :param params: The bind parameters of the query (see ``compile_where``).
         """
         query = query.subquery()
-        query = await self.session.scalars(select(func.count()).select_from(query))
+        query = await self.session.scalars(select(func.count()).select_from(query), params or None)
         return query.one()
 
+    async def _histogram(
+        self, expression: Any, thresholds: Sequence[Any], *where: Any
+    ) -> List[int]:
+        """
+        Counts the rows of each bucket of ``expression`` in one aggregate query.
+
+        ``width_bucket(expression, thresholds)`` numbers the buckets: 0 below the first
+        threshold, i for ``thresholds[i-1] <= value < thresholds[i]``, and
+        ``len(thresholds)`` from the last one up. Rows where the expression is null are
+        not counted. Only one row per non empty bucket is sent back.
+
+        :param expression: The column (or SQL expression) bucketed.
+        :param thresholds: The increasing lower bounds of the buckets after the first one.
+        :param where: Filters of the rows counted.
+        :return: The count of every bucket, ``len(thresholds) + 1`` numbers.
+        """
+        buckets = (
+            select(func.width_bucket(expression, array(thresholds)).label("bucket"))
+            .where(expression.isnot(None), *where)
+            .subquery()
+        )
+        result = await self.session.execute(
+            select(buckets.c.bucket, func.count()).group_by(buckets.c.bucket)
+        )
+        counts = [0] * (len(thresholds) + 1)
+        for bucket, count in result.all():
+            counts[bucket] = count
+        return counts
+
+    async def _paginate_keyset(
+        self,
+        query: Select,
+        sort_column: Any,
+        page_size: int,
+        cursor: str | None = None,
+        descending: bool = True,
+        params: dict[str, Any] | None = None,
+        scalars: bool = True,
+    ) -> tuple[list[ModelType], str | None]:
+        """
+        Returns one page of the query using a seek predicate instead of OFFSET.
+
+        The page is ordered by ``(sort_column, id)`` so the cursor is stable even
+        when the sort column has duplicated values. The NULLs of a nullable sort
+        column come last, in both directions, and are paged by id.
+
+        :param query: The query to paginate, must not be ordered yet.
+        :param sort_column: The model column to sort by (see ``_keyset_sort_column``).
+        :param page_size: The number of records to return.
+        :param cursor: The ``next_cursor`` returned with the previous page.
+        :param descending: Whether to sort descending.
+        :param params: The bind parameters of the query (see ``compile_where``).
+        :param scalars: False for a ``Projection`` select, the rows are returned as they are.
+        :return: The records of the page and the cursor of the next page (None on the last page).
+        """
+        id_column = self.model_class.id
+        nullable = sort_column is not id_column and bool(
+            getattr(sort_column.expression, "nullable", False)
+        )
+        if cursor:
+            sort_value, last_id = self._decode_cursor(cursor, sort_column)
+            id_seek = id_column < last_id if descending else id_column > last_id
+            if sort_column is id_column:
+                seek = id_seek
+            elif sort_value is None:
+                # the previous page ended in the NULLs, only NULLs are left
+                seek = and_(sort_column.is_(None), id_seek)
+            else:
+                key = tuple_(sort_column, id_column)
+                value = tuple_(literal(sort_value, sort_column.type), literal(last_id, id_column.type))
+                seek = key < value if descending else key > value
+                if nullable:
+                    seek = or_(seek, sort_column.is_(None))
+            query = query.where(seek)
+        order = sort_column.desc() if descending else sort_column.asc()
+        if nullable:
+            # postgres puts the NULLs first in a descending order, the seek expects them last
+            order = order.nulls_last()
+        query = query.order_by(order, id_column.desc() if descending else id_column.asc())
+        query = query.limit(page_size + 1)
+
+        result = await self.session.execute(query, params or None)
+        rows = result.unique().scalars().all() if scalars else result.all()
+        if len(rows) <= page_size:
+            return list(rows), None
+        rows = rows[:page_size]
+        last = rows[-1]
+        return list(rows), self._encode_cursor(getattr(last, sort_column.key), last.id)
+
+    async def _fetch_projection(
+        self,
+        projection: Projection,
+        query: Select,
+        params: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Runs a query built from ``projection.select()`` and nests its rows.
+
+        :param projection: The projection the query was built from.
+        :param query: The query, with its filters, order and limit.
+        :param params: The bind parameters of the query (see ``compile_where``).
+        :return: One dict per row, related fields nested under their path.
+        """
+        result = await self.session.execute(query, params or None)
+        return projection.nest_many(result.all())
+
+    async def _estimate_count(self) -> int:
+        """
+        Returns the planner estimate of the number of rows of the table.
+
+        It reads ``pg_class.reltuples`` (kept up to date by autovacuum/ANALYZE),
+        so it is only meaningful for unfiltered lists.
+        """
+        result = await self.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table_name AS regclass)"),
+            {"table_name": self.model_class.__tablename__},
+        )
+        return max(result.scalar_one_or_none() or 0, 0)
+
+    def _keyset_sort_column(self, sort_key: str | None, allowed: Iterable[str]) -> Any:
+        """
+        Returns the column to page by from a sort key of the request.
+
+        :param sort_key: The requested column name, None for the id.
+        :param allowed: The names of the columns the cursor can hold (scalar values,
+            no JSONB or Decimal, they can not be written in the cursor).
+        :return: The model column.
+        """
+        if sort_key is None:
+            return self.model_class.id
+        if sort_key not in allowed:
+            raise BadRequest(
+                error_code=ErrorCode.INVALID_PARAMETER.name,
+                errors={"order_by": ErrorCode.msg_invalid_order_by.value},
+            )
+        return getattr(self.model_class, sort_key)
+
+    @staticmethod
+    def _encode_cursor(sort_value: Any, last_id: int) -> str:
+        if isinstance(sort_value, (date, datetime, time)):
+            sort_value = sort_value.isoformat()
+        raw = json.dumps([sort_value, last_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort_column: Any) -> tuple[Any, int]:
+        try:
+            sort_value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            python_type = sort_column.type.python_type
+            if python_type in (date, datetime, time) and sort_value is not None:
+                sort_value = python_type.fromisoformat(sort_value)
+            return sort_value, int(last_id)
+        except Exception as e:
+            raise BadRequest(
+                error_code=ErrorCode.INVALID_PARAMETER.name,
+                errors={"cursor": ErrorCode.msg_invalid_cursor.value},
+            ) from e
+
     async def _sort_by(
         self,
         query: Select,
@@ -313,6 +497,8 @@ class PostgresRepository(Generic[ModelType]):
 class Model(Base):
     __abstract__ = True
     __table_args__ = {"extend_existing": True}
+    # loader profiles, name -> relationship paths (see loader.loader_options)
+    __loader_profiles__: Dict[str, tuple[str, ...]] = {}
 
     created_at = mapped_column(
         name="created_at",
@@ -333,16 +519,42 @@ class Model(Base):
 
     @property
     def as_dict(self):
-        def json_serializable(obj):
-            if isinstance(obj, (date, datetime, time)):
-                return obj.isoformat()
-            return obj
+        return serializer_for(type(self)).one(self)
+
+    def to_dict(
+        self,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+    ) -> Dict[str, Any]:
+        """as_dict restricted to some columns
+
+        Args:
+            include (Iterable[str] | None): only these columns
+            exclude (Iterable[str] | None): all columns but these
 
-        result = {}
-        for c in self.__table__.columns:
-            value = getattr(self, c.name)
-            result[c.name] = json_serializable(value)
-        return result
+        Returns:
+            Dict[str, Any]: column name -> json ready value
+        """
+        return serializer_for(type(self), *_projection(include, exclude)).one(self)
+
+    @classmethod
+    def serialize_many(
+        cls,
+        rows: Iterable[Any],
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """serialize a list of instances, or of Row from select(columns), in one pass
+
+        Args:
+            rows (Iterable[Any]): instances of the model or rows having the column names
+            include (Iterable[str] | None): only these columns
+            exclude (Iterable[str] | None): all columns but these
+
+        Returns:
+            List[Dict[str, Any]]: one dict per row
+        """
+        return serializer_for(cls, *_projection(include, exclude)).many(rows)
 
     @staticmethod
     def set_before_insert(mapper, connection, target):
@@ -358,6 +570,14 @@ class Model(Base):
         target.updated_at = int(utc_plus_7.timestamp())
 
 
+def _projection(include, exclude):
+    # tuples so the projection can be a cache key of serializer_for
+    return (
+        tuple(include) if include is not None else None,
+        tuple(exclude) if exclude is not None else None,
+    )
+
+
 # Attach event listeners
 event.listen(Model, "before_insert", Model.set_before_insert)
 event.listen(Model, "before_update", Model.update_timestamps)
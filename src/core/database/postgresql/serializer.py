@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Compiled column serializers behind ``Model.as_dict``.
+
+A serializer is built once per (model, include, exclude): the column names,
+one ``operator.attrgetter`` reading all of them at once and a converter per
+column picked from the column type (date/datetime/time -> isoformat). Rows
+are then turned into dicts without looking at the table again:
+
+    PostModel.serialize_many(posts)
+    UserModel.serialize_many(rows, include=("id", "email"))   # select(columns) rows
+    patient.to_dict(include=("id", "first_name", "last_name"))
+
+``Row`` objects from ``select(Model.a, Model.b)`` are read the same way as
+ORM instances, by attribute name, so no instance has to be built.
+"""
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, Time
+
+Converter = Optional[Callable[[Any], Any]]
+
+
+def _isoformat(value: Any) -> Any:
+    return value.isoformat() if value is not None else None
+
+
+def converter_for(column: Any) -> Converter:
+    column_type = getattr(column.type, "impl", column.type)
+    if isinstance(column_type, (Date, DateTime, Time)):
+        return _isoformat
+    return None
+
+
+class ModelSerializer:
+    """Turn instances (or rows) of one model into dicts of column values."""
+
+    __slots__ = ("keys", "_getter", "_converters")
+
+    def __init__(
+        self,
+        model_class: Any,
+        include: Optional[Tuple[str, ...]] = None,
+        exclude: Optional[Tuple[str, ...]] = None,
+    ) -> None:
+        columns = [
+            column
+            for column in model_class.__table__.columns
+            if (include is None or column.name in include)
+            and (exclude is None or column.name not in exclude)
+        ]
+        self.keys: Tuple[str, ...] = tuple(column.name for column in columns)
+        getter = attrgetter(*self.keys) if self.keys else (lambda obj: ())
+        # attrgetter with one name returns the value itself, not a tuple
+        self._getter = (lambda obj: (getter(obj),)) if len(self.keys) == 1 else getter
+        converters = tuple(converter_for(column) for column in columns)
+        self._converters: Optional[Tuple[Converter, ...]] = (
+            converters if any(converters) else None
+        )
+
+    def one(self, obj: Any) -> Dict[str, Any]:
+        values = self._getter(obj)
+        if self._converters is None:
+            return dict(zip(self.keys, values))
+        return {
+            key: value if convert is None else convert(value)
+            for key, value, convert in zip(self.keys, values, self._converters)
+        }
+
+    def many(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        keys = self.keys
+        getter = self._getter
+        if self._converters is None:
+            return [dict(zip(keys, getter(obj))) for obj in objs]
+        converters = self._converters
+        return [
+            {
+                key: value if convert is None else convert(value)
+                for key, value, convert in zip(keys, getter(obj), converters)
+            }
+            for obj in objs
+        ]
+
+
+@lru_cache(maxsize=None)
+def serializer_for(
+    model_class: Any,
+    include: Optional[Tuple[str, ...]] = None,
+    exclude: Optional[Tuple[str, ...]] = None,
+) -> ModelSerializer:
+    """Return the cached serializer of ``model_class``.
+
+    :param model_class: The mapped class.
+    :param include: Only these columns, unknown names are ignored.
+    :param exclude: All columns but these.
+    :return: The ``ModelSerializer``.
+    """
+    return ModelSerializer(model_class, include, exclude)
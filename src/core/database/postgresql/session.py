@@ -1,14 +1,21 @@
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager, suppress
 from contextvars import ContextVar, Token
-from typing import Union
+from typing import Any, Dict, List, Tuple, Union
 
-from sqlalchemy.ext.asyncio import (AsyncSession, async_scoped_session,
-                                    create_async_engine)
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    async_scoped_session, create_async_engine)
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from sqlalchemy.sql.expression import Delete, Insert, Update
 
 from src.config import config
 
+from .pool_metrics import InstrumentedAsyncQueuePool
+
 session_context: ContextVar[str] = ContextVar("session_context")
 
 
@@ -44,10 +51,128 @@ def reset_session_context(context: Token) -> None:
     session_context.reset(context)
 
 
+def engine_options(name: str, role: str) -> Dict[str, Any]:
+    """
+     Keyword arguments of ``create_async_engine`` for the engine ``name``.
+
+     @param name - The engine name, used as pool name in the /metrics output.
+     @param role - "writer" or "reader", selects the POSTGRES_<ROLE>_* pool settings.
+
+     @return The pool and connection settings of the engine.
+    """
+    prefix = f"POSTGRES_{role.upper()}_"
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_logging_name": name,
+        "pool_size": getattr(config, prefix + "POOL_SIZE"),
+        "max_overflow": getattr(config, prefix + "MAX_OVERFLOW"),
+        "pool_timeout": getattr(config, prefix + "POOL_TIMEOUT"),
+        "pool_recycle": config.POSTGRES_POOL_RECYCLE,
+        "pool_pre_ping": config.POSTGRES_POOL_PRE_PING,
+        "connect_args": {
+            "prepared_statement_cache_size": config.POSTGRES_PREPARED_STATEMENT_CACHE_SIZE,
+            "server_settings": {
+                "statement_timeout": str(getattr(config, prefix + "STATEMENT_TIMEOUT_MS")),
+                "application_name": f"health-care-{name}",
+            },
+        },
+    }
+
+
 engines = {
-    "writer": create_async_engine(config.POSTGRES_URL_MASTER, pool_recycle=3600),
-    "reader": create_async_engine(config.POSTGRES_URL_SLAVE, pool_recycle=3600),
+    "writer": create_async_engine(
+        config.POSTGRES_URL_MASTER, **engine_options("writer", "writer")
+    ),
+    "reader": create_async_engine(
+        config.POSTGRES_URL_SLAVE, **engine_options("reader", "reader")
+    ),
 }
+# (engine, weight) of every replica, missing weights default to 1
+readers: List[Tuple[AsyncEngine, int]] = [(engines["reader"], 1)]
+for _index, _url in enumerate(config.POSTGRES_URL_SLAVES, start=1):
+    engines[f"reader_{_index}"] = create_async_engine(
+        _url, **engine_options(f"reader_{_index}", "reader")
+    )
+    _weight = (
+        config.POSTGRES_SLAVE_WEIGHTS[_index - 1]
+        if _index <= len(config.POSTGRES_SLAVE_WEIGHTS)
+        else 1
+    )
+    readers.append((engines[f"reader_{_index}"], _weight))
+
+# seconds of replication lag, 0 on the primary or when the replica has replayed all it received
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class ReaderPool:
+    """
+     Weighted read replicas. A background task measures the lag of each replica with
+     ``pg_last_xact_replay_timestamp``; replicas that are down or lag more than
+     ``max_lag`` seconds are not chosen until they recover. When no replica is usable the
+     writer serves the reads.
+    """
+
+    def __init__(self, readers: List[Tuple[AsyncEngine, int]], max_lag: float) -> None:
+        self.readers = readers
+        self.max_lag = max_lag
+        self.usable: Dict[AsyncEngine, bool] = {engine: True for engine, _ in readers}
+        self.lags: Dict[AsyncEngine, float | None] = {engine: None for engine, _ in readers}
+        self._task: asyncio.Task | None = None
+
+    def choose(self) -> AsyncEngine:
+        candidates = [(engine, weight) for engine, weight in self.readers if self.usable[engine]]
+        if not candidates:
+            return engines["writer"]
+        if len(candidates) == 1:
+            return candidates[0][0]
+        return random.choices(
+            [engine for engine, _ in candidates],
+            weights=[weight for _, weight in candidates],
+        )[0]
+
+    async def check(self) -> None:
+        for engine, _ in self.readers:
+            try:
+                async with engine.connect() as connection:
+                    lag = float((await connection.execute(REPLICA_LAG_QUERY)).scalar_one())
+                self.lags[engine] = lag
+                self.usable[engine] = lag <= self.max_lag
+            except Exception as e:
+                logging.error("Read replica %s is unavailable: %s", engine.url.host, e)
+                self.lags[engine] = None
+                self.usable[engine] = False
+
+    def start(self, interval: float) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+
+reader_pool = ReaderPool(readers, max_lag=config.POSTGRES_REPLICA_MAX_LAG_SECONDS)
+
+# session.info keys
+LAST_WRITE_AT = "last_write_at"
+WRITE_PENDING = "write_pending"
+USE_WRITER = "use_writer"
 
 
 class RoutingSession(Session):
@@ -55,15 +180,49 @@ class RoutingSession(Session):
         """
          Return the : class : `. SyncEngine ` to use for this query. This is a no - op if flushing is enabled.
 
+         Reads go to the writer when ``session.info["use_writer"]`` is set or when this session
+         wrote less than ``POSTGRES_STICKY_WRITER_MS`` ago (read your writes), otherwise to a
+         healthy replica. ``SELECT ... FOR UPDATE`` locks rows, it always goes to the writer and
+         keeps the rest of the transaction there.
+
          @param mapper - The : class : `. Mapper ` that is executing the query.
          @param clause - The clause that is executing. It can be a SQLAlchemy clause or an instance of : class : `. ClauseElement `.
 
          @return A : class : `. SyncEngine ` that is used to write to and read from the database
         """
         # Returns the engine for flushing the current statement.
-        if self._flushing or isinstance(clause, (Update, Delete, Insert)):
+        if (
+            self._flushing
+            or isinstance(clause, (Update, Delete, Insert))
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self.info[LAST_WRITE_AT] = time.monotonic()
+            self.info[WRITE_PENDING] = True
+            return engines["writer"].sync_engine
+        if self.info.get(USE_WRITER) or self._is_sticky():
             return engines["writer"].sync_engine
-        return engines["reader"].sync_engine
+        return reader_pool.choose().sync_engine
+
+    def _is_sticky(self) -> bool:
+        # uncommitted writes are only visible on the writer connection
+        if self.info.get(WRITE_PENDING):
+            return True
+        last_write_at = self.info.get(LAST_WRITE_AT)
+        if last_write_at is None:
+            return False
+        return (time.monotonic() - last_write_at) * 1000 < config.POSTGRES_STICKY_WRITER_MS
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _refresh_last_write(session: RoutingSession):
+    # replicas start replaying at commit, the sticky window counts from there
+    if session.info.pop(WRITE_PENDING, False):
+        session.info[LAST_WRITE_AT] = time.monotonic()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _clear_pending_write(session: RoutingSession):
+    session.info.pop(WRITE_PENDING, None)
 
 
 async_session_factory = sessionmaker(
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Compiled, cached version of the mongo-style ``where`` filters.
+
+``destruct_where`` rebuilds the whole expression tree on every call. Most
+requests only differ by their values, so the tree is built once per filter
+*shape* (keys + operators) with ``bindparam`` placeholders, and the values are
+sent as execution parameters. Statements built from the same shape are
+identical, so SQLAlchemy's compiled cache is hit as well.
+
+how to use:
+    compiled = compile_where(DoctorModel, {"verify_status": {"$ne": 0}})
+    if compiled is not None:
+        query = select(DoctorModel).where(compiled.clause)
+        result = await session.execute(query, compiled.params)
+"""
+from functools import lru_cache
+from itertools import count
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, between, bindparam, func, not_, or_, true
+
+BIND_PREFIX = "where_"
+CACHE_SIZE = 512
+
+# operators whose values can be sent as bind parameters
+_SCALAR_OPERATORS = {
+    "$eq",
+    "$ne",
+    "$gt",
+    "$gte",
+    "$lt",
+    "$lte",
+    "$like",
+    "$ilike",
+    "$regex",
+    "$iregex",
+    "$size",
+}
+
+
+class CompiledWhere(NamedTuple):
+    clause: Any
+    params: Dict[str, Any]
+
+
+class _Uncacheable(Exception):
+    """The filter uses an operator that can not be parameterized."""
+
+
+def compile_where(model_class: Any, where: Optional[Dict[str, Any]]) -> Optional[CompiledWhere]:
+    """Return the cached clause and its parameters for ``where``.
+
+    :param model_class: The model the filter applies to.
+    :param where: The mongo-style filter (see ``destruct_where``).
+    :return: ``CompiledWhere`` (clause is None for an empty filter), or None
+        when the filter uses an operator that is not supported here
+        ($exists, $type, $elemMatch, $expr, ...); callers then fall back to
+        ``destruct_where``.
+    """
+    if not where:
+        return CompiledWhere(None, {})
+    values: List[Any] = []
+    try:
+        shape = _condition_shape(where, values)
+    except _Uncacheable:
+        return None
+    clause = _build_clause(model_class, shape)
+    params = {f"{BIND_PREFIX}{index}": value for index, value in enumerate(values)}
+    return CompiledWhere(clause, params)
+
+
+def where_cache_info():
+    return _build_clause.cache_info()
+
+
+def clear_where_cache() -> None:
+    _build_clause.cache_clear()
+
+
+def _condition_shape(condition: Any, values: List[Any]) -> Hashable:
+    if not isinstance(condition, dict):
+        raise _Uncacheable()
+    shape = []
+    for key, value in condition.items():
+        if key in ("$or", "$and"):
+            shape.append((key, tuple(_condition_shape(cond, values) for cond in value)))
+        elif key.startswith("$"):
+            raise _Uncacheable()
+        elif isinstance(value, dict):
+            shape.append((key, _column_shape(value, values)))
+        elif value is None:
+            shape.append((key, (("$eq", None),)))
+        else:
+            values.append(value)
+            shape.append((key, (("$eq", 1),)))
+    return tuple(shape)
+
+
+def _column_shape(operators: Dict[str, Any], values: List[Any]) -> Tuple:
+    shape = []
+    for op, value in operators.items():
+        if op in ("$eq", "$ne") and value is None:
+            shape.append((op, None))
+        elif op in _SCALAR_OPERATORS:
+            values.append(value)
+            shape.append((op, 1))
+        elif op in ("$in", "$nin"):
+            values.append(list(value))
+            shape.append((op, 1))
+        elif op == "$between":
+            low, high = value
+            values.extend((low, high))
+            shape.append((op, 2))
+        elif op == "$all":
+            values.extend(value)
+            shape.append((op, len(value)))
+        elif op == "$not":
+            shape.append((op, _column_shape(value, values)))
+        else:
+            raise _Uncacheable()
+    return tuple(shape)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _build_clause(model_class: Any, shape: Tuple) -> Any:
+    counter = count()
+
+    def next_param(**kwargs: Any):
+        return bindparam(f"{BIND_PREFIX}{next(counter)}", **kwargs)
+
+    return _build_condition(model_class, shape, next_param)
+
+
+def _build_condition(model_class: Any, shape: Tuple, next_param) -> Any:
+    conditions = []
+    for key, value in shape:
+        if key == "$or":
+            conditions.append(or_(*[_build_condition(model_class, s, next_param) for s in value]))
+        elif key == "$and":
+            conditions.append(and_(*[_build_condition(model_class, s, next_param) for s in value]))
+        else:
+            column = getattr(model_class, key)
+            conditions.append(_build_column(column, value, next_param))
+    return and_(*conditions) if len(conditions) > 1 else conditions[0] if conditions else true()
+
+
+def _build_column(column: Any, shape: Tuple, next_param) -> Any:
+    conditions = []
+    for op, arity in shape:
+        if op == "$eq":
+            conditions.append(column.is_(None) if arity is None else column == next_param())
+        elif op == "$ne":
+            conditions.append(column.is_not(None) if arity is None else column != next_param())
+        elif op == "$gt":
+            conditions.append(column > next_param())
+        elif op == "$gte":
+            conditions.append(column >= next_param())
+        elif op == "$lt":
+            conditions.append(column < next_param())
+        elif op == "$lte":
+            conditions.append(column <= next_param())
+        elif op == "$in":
+            conditions.append(column.in_(next_param(expanding=True)))
+        elif op == "$nin":
+            conditions.append(~column.in_(next_param(expanding=True)))
+        elif op == "$between":
+            conditions.append(between(column, next_param(), next_param()))
+        elif op == "$like":
+            conditions.append(column.like(next_param()))
+        elif op == "$ilike":
+            conditions.append(column.ilike(next_param()))
+        elif op == "$regex":
+            conditions.append(column.op("~")(next_param()))
+        elif op == "$iregex":
+            conditions.append(column.op("~*")(next_param()))
+        elif op == "$size":
+            conditions.append(func.array_length(column, 1) == next_param())
+        elif op == "$all":
+            for _ in range(arity):
+                conditions.append(column.contains(next_param()))
+        elif op == "$not":
+            conditions.append(not_(_build_column(column, arity, next_param)))
+    return and_(*conditions) if len(conditions) > 1 else conditions[0] if conditions else true()
@@ -1,10 +1,11 @@
 from __future__ import annotations
 from starlette.endpoints import HTTPEndpoint as StarletteHTTPEndpoint
 from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.responses import Response
 from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from src.core.exception import BadRequest, BaseException
+from src.core.response import ORJSONResponse, envelope_response
 from src.core import logger
 from src.core.security import Authorization
 from pydash import get
@@ -26,62 +27,185 @@ def is_async_callable(obj: typing.Any) -> bool:
     )
 
 
+Extractor = typing.Callable[[Request], typing.Awaitable[typing.Any]]
+
+
+class HandlerPlan:
+    """Everything dispatch needs to call one handler, computed once per endpoint
+    class and method instead of inspecting the handler on every request.
+
+    params:
+        extractors: (name, extractor) pairs, an extractor builds the value of the
+            parameter from the request
+        is_async: call the handler directly or in the threadpool
+        response_model: pydantic model the result is validated against, or None
+    """
+
+    __slots__ = ("extractors", "is_async", "response_model")
+
+    def __init__(
+        self,
+        extractors: typing.List[typing.Tuple[str, Extractor]],
+        is_async: bool,
+        response_model: typing.Optional[typing.Type[BaseModel]],
+    ) -> None:
+        self.extractors = extractors
+        self.is_async = is_async
+        self.response_model = response_model
+
+    async def build_kwargs(self, request: Request) -> typing.Dict[str, typing.Any]:
+        return {name: await extractor(request) for name, extractor in self.extractors}
+
+    def render(self, response: typing.Any) -> Response:
+        """wrap the result of the handler in the success envelope"""
+        if self.response_model is None:
+            return ORJSONResponse(
+                content={"data": response, "errors": None, "error_code": None},
+                status_code=200,
+            )
+        # model_dump_json writes the JSON directly, no intermediate dict is built
+        return envelope_response(
+            self.response_model.model_validate(response).model_dump_json().encode()
+        )
+
+
+def _validate_model(ptype: typing.Type[BaseModel], data: typing.Any) -> BaseModel:
+    try:
+        return ptype(**data)
+    except Exception as e:
+        _invalid_fields = ujson.loads(e.json())
+        raise BadRequest(
+            errors=[
+                {
+                    "field": get(item, "loc")[0],
+                    "msg": get(item, "msg"),
+                }
+                for item in _invalid_fields
+            ]
+        )
+
+
+def _model_extractor(name: str, ptype: typing.Type[BaseModel]) -> Extractor:
+    """
+    Build the extractor of a pydantic parameter, the source of the data depends on the
+    parameter name: query_params, path_params or form_data.
+    """
+    source = name.lower()
+    if source == "query_params":
+
+        async def _extract(request: Request) -> typing.Any:
+            return _validate_model(ptype, request.query_params._dict)
+
+    elif source == "path_params":
+
+        async def _extract(request: Request) -> typing.Any:
+            return _validate_model(ptype, request.path_params)
+
+    elif source == "form_data":
+
+        async def _extract(request: Request) -> typing.Any:
+            _data = await request.form()
+            if not _data:
+                _data = await request.json()
+            return _validate_model(ptype, _data)
+
+    else:
+
+        async def _extract(request: Request) -> typing.Any:
+            raise BadRequest(
+                msg="Backend Error: Invalid parameter type, must be query_params, path_params or form_data."
+            )
+
+    return _extract
+
+
+def _auth_extractor(ptype: typing.Type[Authorization]) -> Extractor:
+    # validate does not keep any state, one instance is shared by every request
+    auth = ptype()
+
+    async def _extract(request: Request) -> typing.Any:
+        return await auth.validate(request)
+
+    return _extract
+
+
+async def _request_extractor(request: Request) -> Request:
+    return request
+
+
+def build_handler_plan(handler: typing.Callable[..., typing.Any]) -> HandlerPlan:
+    """
+    Inspect a handler (get, post, put, delete, etc.) once and return its plan.
+
+    params:
+        handler: The handler function, bound or not (self is skipped)
+    """
+    signature = inspect.signature(handler)
+    extractors: typing.List[typing.Tuple[str, Extractor]] = []
+    for param in signature.parameters.values():
+        name = param.name
+        ptype = param.annotation
+        if name == "self":
+            continue
+        # if the parameter is a pydantic model, the request data is parsed into it
+        if isinstance(ptype, type) and issubclass(ptype, BaseModel):
+            extractors.append((name, _model_extractor(name, ptype)))
+        elif isinstance(ptype, type) and issubclass(ptype, Authorization):
+            extractors.append((name, _auth_extractor(ptype)))
+        elif name == "request":
+            extractors.append((name, _request_extractor))
+
+    _response_type = signature.return_annotation
+    response_model = (
+        _response_type
+        if isinstance(_response_type, type) and issubclass(_response_type, BaseModel)
+        else None
+    )
+    return HandlerPlan(extractors, is_async_callable(handler), response_model)
+
+
 class HTTPEndpoint(StarletteHTTPEndpoint):
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
 
+    @classmethod
+    def compile_handler_plans(cls) -> typing.Dict[str, HandlerPlan]:
+        """
+        Build the plan of every handler of the class, called by RouteSwagger when the
+        route is registered. Plans are stored on the class itself so subclasses get their own.
+        """
+        plans = cls.__dict__.get("_handler_plans")
+        if plans is None:
+            plans = {}
+            setattr(cls, "_handler_plans", plans)
+        for name in ["get", "head", "post", "put", "patch", "delete", "options"]:
+            handler = getattr(cls, name, None)
+            if handler is not None and name not in plans:
+                plans[name] = build_handler_plan(handler)
+        return plans
+
+    @classmethod
+    def get_handler_plan(cls, handler_name: str) -> HandlerPlan:
+        plans = cls.__dict__.get("_handler_plans")
+        if plans is None:
+            plans = cls.compile_handler_plans()
+        plan = plans.get(handler_name)
+        if plan is None:
+            # method_not_allowed, or an endpoint used outside of RouteSwagger
+            plan = plans[handler_name] = build_handler_plan(getattr(cls, handler_name))
+        return plan
+
     async def get_input_handler(
-        self, signature: inspect.Signature, request: Request
+        self, plan: HandlerPlan, request: Request
     ) -> typing.Dict[str, typing.Any]:
         """
         This function will parse the request data and return the kwargs for the handler
 
         params:
-            handler: The handler function (get, post, put, delete, etc.)
+            plan: The plan of the handler (get, post, put, delete, etc.)
             request: Request -> The request object
         """
-
-        _kwargs = {}
-        # inspect function to get the parameter names and types
-
-        for param in signature.parameters.values():
-            name = param.name
-            ptype = param.annotation
-            # if the parameter is a pydantic model, we will try to parse the request data
-            if isinstance(ptype, type) and issubclass(ptype, BaseModel):
-                _data = {}
-                if name.lower() == "query_params":
-                    _data = request.query_params._dict
-                elif name.lower() == "path_params":
-                    _data = request.path_params
-                elif name.lower() == "form_data":
-                    _data = await request.form()
-                    if not _data:
-                        _data = await request.json()
-                else:
-                    raise BadRequest(
-                        msg="Backend Error: Invalid parameter type, must be query_params, path_params or form_data."
-                    )
-                try:
-                    _prams = ptype(**_data)
-                    _kwargs[name] = _prams
-                except Exception as e:
-                    _invalid_fields = ujson.loads(e.json())
-                    raise BadRequest(
-                        errors=[
-                            {
-                                "field": get(item, "loc")[0],
-                                "msg": get(item, "msg"),
-                            }
-                            for item in _invalid_fields
-                        ]
-                    )
-            elif isinstance(ptype, type) and issubclass(ptype, Authorization):
-                _kwargs[name] = await ptype().validate(request)
-
-            elif name == "request":
-                _kwargs[name] = request
-        return _kwargs
+        return await plan.build_kwargs(request)
 
     async def dispatch(self) -> None:
         request = Request(self.scope, receive=self.receive)
@@ -90,31 +214,20 @@ class HTTPEndpoint(StarletteHTTPEndpoint):
             if request.method == "HEAD" and not hasattr(self, "head")
             else request.method.lower()
         )
-        handler: typing.Callable[[Request], typing.Any] = getattr(
-            self, handler_name, self.method_not_allowed
-        )
+        if not hasattr(self, handler_name):
+            handler_name = "method_not_allowed"
+        handler: typing.Callable[..., typing.Any] = getattr(self, handler_name)
         try:
-            is_async = is_async_callable(handler)
-            signature = inspect.signature(handler)
-            _response_type = signature.return_annotation
+            plan = self.get_handler_plan(handler_name)
 
-            _kwargs = await self.get_input_handler(signature, request)
+            _kwargs = await self.get_input_handler(plan, request)
 
-            if is_async:
+            if plan.is_async:
                 response = await handler(**_kwargs)
             else:
                 response = await run_in_threadpool(handler, **_kwargs)
             if not isinstance(response, Response):
-                if isinstance(_response_type, type) and issubclass(
-                    _response_type, BaseModel
-                ):
-                    response = _response_type.model_validate(response).model_dump(
-                        mode="json"
-                    )
-                response = JSONResponse(
-                    content={"data": response, "errors": None, "error_code": None},
-                    status_code=200,
-                )
+                response = plan.render(response)
 
         except Exception as e:
             _res = {"data": ""}
@@ -129,5 +242,5 @@ class HTTPEndpoint(StarletteHTTPEndpoint):
             if _status == 500:
                 sentry_sdk.capture_exception()
                 sentry_sdk.flush()
-            response = JSONResponse(content=_res, status_code=_status)
+            response = ORJSONResponse(content=_res, status_code=_status)
         await response(self.scope, self.receive, self.send)
@@ -1,4 +1,8 @@
+import asyncio
+import logging
 from functools import wraps
+from typing import Any, Coroutine, Optional, Set
+
 import httpx
 import aiohttp
 
@@ -162,3 +166,92 @@ class AsyncHttpClient:
             )
 
         return _response
+
+
+class HttpClientPool:
+    """
+     Process wide ``httpx.AsyncClient`` shared by the outbound calls (chat service, bot service...).
+     It is opened and closed by the application lifespan, keeps connections alive between requests
+     and bounds the number of requests in flight with a semaphore.
+
+     how to use:
+         response = await HttpClientPool.request("GET", url, params=params)
+         HttpClientPool.fire_and_forget(HttpClientPool.request("POST", url, json=data))
+    """
+
+    _client: Optional[httpx.AsyncClient] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def start(
+        cls,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        concurrency: int = 50,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        """
+         Create the shared client. Calling it again replaces the settings only if the client is closed.
+
+         @param transport - Send the requests through this transport instead of the network (tests)
+        """
+        if cls._client is not None and not cls._client.is_closed:
+            return
+        cls._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+        cls._semaphore = asyncio.Semaphore(concurrency)
+
+    @classmethod
+    async def close(cls, timeout: float = 5.0) -> None:
+        """
+         Wait (at most ``timeout`` seconds) for the background requests then close the client.
+        """
+        if cls._tasks:
+            _, pending = await asyncio.wait(set(cls._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+        if cls._client is not None:
+            await cls._client.aclose()
+        cls._client = None
+        cls._semaphore = None
+
+    @classmethod
+    def client(cls) -> httpx.AsyncClient:
+        # processes without the app lifespan (worker, scripts) get a client with the defaults
+        if cls._client is None or cls._client.is_closed:
+            cls.start()
+        return cls._client
+
+    @classmethod
+    async def request(cls, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        client = cls.client()
+        async with cls._semaphore:
+            return await client.request(method, url, **kwargs)
+
+    @classmethod
+    def fire_and_forget(cls, coroutine: Coroutine) -> asyncio.Task:
+        """
+         Run ``coroutine`` in the background, off the request path. A reference is kept until it
+         finishes so the task is not garbage collected, and its error is logged.
+        """
+        task = asyncio.get_running_loop().create_task(coroutine)
+        cls._tasks.add(task)
+        task.add_done_callback(cls._on_task_done)
+        return task
+
+    @classmethod
+    def _on_task_done(cls, task: asyncio.Task) -> None:
+        cls._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error("Background http request failed: %s", task.exception())
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""JSON responses serialized with orjson.
+
+``ORJSONResponse`` is a drop-in replacement of starlette ``JSONResponse``:
+datetime, date, time, UUID and enums are written natively by orjson, Decimal
+and pydantic models go through ``_default``.
+
+``envelope_response`` wraps JSON that is already serialized (for example the
+bytes of ``model_dump_json``) in the ``{"data", "errors", "error_code"}``
+envelope without parsing it again.
+"""
+import typing
+from decimal import Decimal
+
+import orjson
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, Response
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+_ENVELOPE_PREFIX = b'{"data":'
+_ENVELOPE_SUFFIX = b',"errors":null,"error_code":null}'
+
+
+def _default(obj: typing.Any) -> typing.Any:
+    if isinstance(obj, Decimal):
+        # same as pydantic model_dump(mode="json"), no precision is lost
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def orjson_dumps(content: typing.Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: typing.Any) -> bytes:
+        return orjson_dumps(content)
+
+
+def envelope_response(
+    data_json: bytes,
+    status_code: int = 200,
+    headers: typing.Optional[typing.Mapping[str, str]] = None,
+    background: typing.Optional[BackgroundTask] = None,
+) -> Response:
+    """
+    Build the success response from the already serialized ``data``.
+
+    params:
+        data_json: JSON bytes of the data, e.g. ``model.model_dump_json().encode()``
+    """
+    return Response(
+        content=_ENVELOPE_PREFIX + data_json + _ENVELOPE_SUFFIX,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+        background=background,
+    )
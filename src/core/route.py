@@ -1,6 +1,7 @@
 from typing import Callable, Any, List, _UnionGenericAlias
 from starlette.routing import Route
 from src.core import logger
+from src.core.endpoint import HTTPEndpoint
 from pydantic import BaseModel
 from src.core.security import Authorization, JsonWebToken
 
@@ -36,6 +37,9 @@ class RouteSwagger(Route):
                 _signature = inspect.signature(func)
                 _summary = func.__doc__
                 func.__doc__ = self.swagger_generate(_signature, _summary)
+        # Inspect the handlers once here instead of on every request.
+        if inspect.isclass(endpoint) and issubclass(endpoint, HTTPEndpoint):
+            endpoint.compile_handler_plans()
 
     def swagger_generate(
         self, signature: inspect.Signature, summary: str = "Document API"
@@ -92,7 +96,7 @@ class RouteSwagger(Route):
                                 },
                             }
                         )
-                    _docs["parameters"] = _parameters
+                    _docs.setdefault("parameters", []).extend(_parameters)
 
                 # path_params is the key of the path_params key.
                 if key == "path_params":
@@ -115,7 +119,7 @@ class RouteSwagger(Route):
                                 },
                             }
                         )
-                    _docs["parameters"] = _parameters
+                    _docs.setdefault("parameters", []).extend(_parameters)
 
         # Response type to be sent to the server
         if isinstance(_response_type, type) and issubclass(_response_type, BaseModel):
@@ -7,7 +7,7 @@ from src.core.exception import BadRequest
 _data_img=["image/jpeg", "image/png","image/jpg","image/JPG","image/PNG","image/gif","image/GIF"]
 
 
-def is_valid_image(file: UploadFile):
+def _check_image_type(file: UploadFile):
     if file.content_type not in _data_img:
         raise BadRequest(
             error_code=ErrorCode.BAD_REQUEST.name,
@@ -15,18 +15,44 @@ def is_valid_image(file: UploadFile):
                 "message": "chỉ chấp nhận file ảnh có định dạng jpg, jpeg, png, gif"
             },
         )
+
+
+def _check_image_size(size: int):
     _expected_size_mb = config.IMG_SIZE_MB * 1024 * 1024
-    _current_file_size = file.size if file.size else 0
-    if _current_file_size > _expected_size_mb:
+    if size > _expected_size_mb:
         raise BadRequest(
             error_code=ErrorCode.BAD_REQUEST.name,
             errors={
                 "message": f"file ảnh không được vượt quá {_expected_size_mb}MB"
             },
         )
+
+
+def is_valid_image(file: UploadFile):
+    _check_image_type(file)
+    _check_image_size(file.size if file.size else 0)
     return True
 
 
+async def read_valid_image(file: UploadFile, chunk_size: int = 64 * 1024) -> bytes:
+    """check the type of the image and read it once, chunk by chunk
+
+    The size limit is checked on every chunk, a file over the limit is rejected
+    as soon as its first bytes over the limit are read, not after the whole read.
+    """
+    _check_image_type(file)
+    if file.size:
+        _check_image_size(file.size)
+    await file.seek(0)
+    chunks = []
+    _current_file_size = 0
+    while chunk := await file.read(chunk_size):
+        _current_file_size += len(chunk)
+        _check_image_size(_current_file_size)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
 def is_valid_size_media(file: UploadFile):
     _expected_size_mb = config.MEDIA_SIZE_MB * 1024 * 1024
     _current_file_size = file.size if file.size else 0
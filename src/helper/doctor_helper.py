@@ -95,9 +95,11 @@ class DoctorHelper:
         filter_data: dict[str, Any]={},
         order_by:str | None = None,
         is_desc:bool = False,
+        pagination: str = "offset",
+        cursor: str | None = None,
     ):
         result = await self.doctor_repository.get_all_doctor_repository(
-            current_page=current_page,page_size=page_size,text_search=text_search,filter_data=filter_data,order_by=order_by,is_desc=is_desc
+            current_page=current_page,page_size=page_size,text_search=text_search,filter_data=filter_data,order_by=order_by,is_desc=is_desc,pagination=pagination,cursor=cursor
         )
         return result
 
@@ -128,9 +130,16 @@ class DoctorHelper:
             raise e
 
     @catch_error_helper(message=None)
-    async def get_doctor_by_id(self, doctor_id: int):
+    async def get_doctor_by_id(
+        self,
+        doctor_id: int,
+        comment_page_size: int = 10,
+        comment_cursor: str | None = None,
+    ):
         doctor = await self.doctor_repository.get_doctor_with_ratings(
-            doctor_id=doctor_id
+            doctor_id=doctor_id,
+            comment_page_size=comment_page_size,
+            comment_cursor=comment_cursor,
         )
         return doctor
 
@@ -19,11 +19,13 @@ class MedicalRecordsHelper:
         join_: set[str] | None = None,
         where: dict[str, Any] = {},
         order_by: dict[str, str] = {"created_at": "desc"},
+        cursor: str | None = None,
+        pagination: str = "offset",
     ):
         skip = (current_page - 1) * page_size
         limit = page_size
         _medical_records = await self.medical_records_repository.get_all(
-            skip, limit, join_, where, order_by
+            skip, limit, join_, where, order_by, cursor=cursor, pagination=pagination
         )
         return _medical_records
 
@@ -7,9 +7,11 @@ class MessageHelper:
     def __init__(self, message_repository: MessageRepository):
         self.message_repository = message_repository
 
-    async def get_messages_from_conversation(self, conversation_id: int):
+    async def get_messages_from_conversation(
+        self, conversation_id: int, before_id: int | None = None, limit: int | None = None
+    ):
         return await self.message_repository.get_messages_from_conversation(
-            conversation_id
+            conversation_id, before_id=before_id, limit=limit
         )
 
     @catch_error_helper(message=None)
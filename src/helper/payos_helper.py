@@ -1,20 +1,132 @@
+import asyncio
 import logging
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Final
+from typing import Any, Callable, Final
 
+import payos.index
 import pytz
+import requests
 from payos import PaymentData
+from payos.constants import ERROR_CODE
+from payos.custom_error import PayOSError
 from payos.type import PaymentLinkInformation
 
-from src.config import payOsIns
+from src.config import config, payOsIns
+
+# the PayOS SDK is blocking, its calls run in this pool so the event loop is never blocked
+_payos_executor = ThreadPoolExecutor(
+    max_workers=config.PAYOS_MAX_WORKERS, thread_name_prefix="payos"
+)
+
+
+class _TimeoutRequests:
+    """``requests`` as seen by the PayOS SDK, which sends its calls without a timeout
+
+    A call stuck on the network would hold its worker of ``_payos_executor`` forever.
+    """
+
+    @staticmethod
+    def post(*args, **kwargs):
+        kwargs.setdefault("timeout", config.PAYOS_TIMEOUT)
+        return requests.post(*args, **kwargs)
+
+    @staticmethod
+    def get(*args, **kwargs):
+        kwargs.setdefault("timeout", config.PAYOS_TIMEOUT)
+        return requests.get(*args, **kwargs)
+
+
+payos.index.requests = _TimeoutRequests()
+
+
+class CircuitBreaker:
+    """Stop calling PayOS for a while after too many consecutive failures.
+
+    closed: calls go through, failures are counted.
+    open: calls are rejected until ``reset_timeout`` seconds have passed.
+    half open: one call is let through, its result closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_count = 0
+        self.opened_at: float | None = None
+        self._half_open_call = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_timeout or self._half_open_call:
+            return False
+        self._half_open_call = True
+        return True
+
+    def record_success(self) -> None:
+        self.failure_count = 0
+        self.opened_at = None
+        self._half_open_call = False
+
+    def record_failure(self) -> None:
+        self.failure_count += 1
+        if self._half_open_call or self.failure_count >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._half_open_call = False
+
+    def release(self) -> None:
+        """the call ended without a result (cancelled), the next one can probe the circuit"""
+        self._half_open_call = False
+
+
+# one circuit per endpoint, lookups failing does not stop payment creation
+payos_create_breaker = CircuitBreaker(
+    failure_threshold=config.PAYOS_BREAKER_FAILURES,
+    reset_timeout=config.PAYOS_BREAKER_RESET_TIMEOUT,
+)
+payos_lookup_breaker = CircuitBreaker(
+    failure_threshold=config.PAYOS_BREAKER_FAILURES,
+    reset_timeout=config.PAYOS_BREAKER_RESET_TIMEOUT,
+)
+
+
+def is_transport_error(error: Exception) -> bool:
+    """timeouts, connection errors and non 200 answers of PayOS
+
+    A business error (order not found yet, invalid data...) means PayOS is up, it
+    does not count against the circuit.
+    """
+    if isinstance(error, PayOSError):
+        # the SDK raises this code when the http status is not 200
+        return error.code == ERROR_CODE["INTERNAL_SERVER_ERROR"]
+    return isinstance(error, requests.RequestException)
+
+
+def backoff_delay(
+    attempt: int, base_delay: float | None = None, min_delay: float = 0.0
+) -> float:
+    """exponential backoff with equal jitter, attempt starts at 0
+
+    Half of the delay is kept so the retries stay spread over the expected time,
+    the other half is random so the workers do not retry together.
+    """
+    if base_delay is None:
+        base_delay = config.PAYOS_RETRY_BASE_DELAY
+    ceiling = min(config.PAYOS_RETRY_MAX_DELAY, base_delay * (2**attempt))
+    return max(min_delay, ceiling / 2 + random.uniform(0, ceiling / 2))
 
 
 class PaymentHelper:
     def __init__(self):
         pass
 
-    def create_payment(
+    async def create_payment(
         self,
         amount: int,
         description: str,
@@ -23,45 +135,123 @@ class PaymentHelper:
         time_session:int = 300
     ):
         MAX_RETRY:Final[int]=5
-        retry_count=0
         if not isinstance(cancelUrl, str):
             cancelUrl = ""
-        while retry_count < MAX_RETRY:
-            try:
-                utc_plus_7 = pytz.timezone("Asia/Ho_Chi_Minh")
-                current_time_utc = datetime.now(pytz.utc)
-                current_time_utc_plus_7 = current_time_utc.astimezone(utc_plus_7)
-                time_expired = current_time_utc_plus_7 + timedelta(seconds=time_session)
-                expired_at = int(time_expired.timestamp())
-                random_number= random.randint(1000, 99999)
-                logging.info(f"CHECK:::: random_number: {random_number}")
-                logging.info(f"CHECK:::: returnUrl: {returnUrl}")
-                logging.info(f"CHECK:::: cancelUrl: {cancelUrl}")
-
-                payment_data = PaymentData(
-                    orderCode=random_number,
-                    amount=amount,
-                    description=description,
-                    cancelUrl=cancelUrl,
-                    returnUrl=returnUrl,
-                    expiredAt=expired_at,
-                )
-                payos_create_payment = payOsIns.createPaymentLink(payment_data)
-                return payos_create_payment.to_json()
-            except Exception as e:
-                retry_count += 1
-                print(f"Error occurred: {e}. Retry {retry_count}/{MAX_RETRY}")
-                if retry_count == MAX_RETRY:
-                    print("Max retry reached")
-                    return None
-    def get_payment_info(
+        # one order code for every attempt, PayOS refuses a second link for it
+        random_number= random.randint(1000, 99999)
+
+        def _create_payment():
+            utc_plus_7 = pytz.timezone("Asia/Ho_Chi_Minh")
+            current_time_utc = datetime.now(pytz.utc)
+            current_time_utc_plus_7 = current_time_utc.astimezone(utc_plus_7)
+            time_expired = current_time_utc_plus_7 + timedelta(seconds=time_session)
+            expired_at = int(time_expired.timestamp())
+            logging.info(f"CHECK:::: random_number: {random_number}")
+            logging.info(f"CHECK:::: returnUrl: {returnUrl}")
+            logging.info(f"CHECK:::: cancelUrl: {cancelUrl}")
+
+            payment_data = PaymentData(
+                orderCode=random_number,
+                amount=amount,
+                description=description,
+                cancelUrl=cancelUrl,
+                returnUrl=returnUrl,
+                expiredAt=expired_at,
+            )
+            payos_create_payment = payOsIns.createPaymentLink(payment_data)
+            return payos_create_payment.to_json()
+
+        # a link may have been created when the answer timed out, it is not sent again
+        return await self._call_with_retry(
+            _create_payment, MAX_RETRY, payos_create_breaker, retry_read_timeout=False
+        )
+
+    async def get_payment_info(
         self,
-        orderId: str
+        orderId: str,
+        max_retry: int = 4,
     ):
-        try:
+        """get the payment link information, retried because the webhook can arrive
+        before PayOS exposes the transaction"""
+
+        def _get_payment_info():
             payment_link_info: PaymentLinkInformation = payOsIns.getPaymentLinkInformation(orderId = orderId)
             logging.info(f"payment_link_info: {payment_link_info}")
             return payment_link_info.to_json()
-        except Exception as e:
-            logging.error(f"Error occurred: {e}")
+
+        # the lookups wait at least PAYOS_LOOKUP_RETRY_DELAY between them, the
+        # transaction can take a few seconds to show up
+        return await self._call_with_retry(
+            _get_payment_info,
+            max_retry,
+            payos_lookup_breaker,
+            base_delay=config.PAYOS_LOOKUP_RETRY_DELAY,
+            min_delay=config.PAYOS_LOOKUP_RETRY_DELAY,
+        )
+
+    async def _call_with_retry(
+        self,
+        func: Callable[[], Any],
+        max_retry: int,
+        breaker: CircuitBreaker,
+        retry_read_timeout: bool = True,
+        base_delay: float | None = None,
+        min_delay: float = 0.0,
+    ):
+        """run ``func`` in the PayOS thread pool, retry with backoff, None when it keeps failing
+
+        The circuit is checked once and records one result per call: a failure only when
+        the retries are used up and the last error was a transport error.
+        """
+        if not breaker.allow():
+            logging.error("PayOS circuit is open, call skipped")
             return None
+        try:
+            return await self._retry(
+                func, max_retry, breaker, retry_read_timeout, base_delay, min_delay
+            )
+        except asyncio.CancelledError:
+            # the caller gave up, a half open call must not keep the circuit open forever
+            breaker.release()
+            raise
+
+    async def _retry(
+        self,
+        func: Callable[[], Any],
+        max_retry: int,
+        breaker: CircuitBreaker,
+        retry_read_timeout: bool,
+        base_delay: float | None,
+        min_delay: float,
+    ):
+        loop = asyncio.get_running_loop()
+        last_error: Exception | None = None
+        for attempt in range(max_retry):
+            try:
+                # the SDK calls are bounded by the http timeout of _TimeoutRequests
+                result = await loop.run_in_executor(_payos_executor, func)
+                breaker.record_success()
+                return result
+            except (ValueError, TypeError) as e:
+                # invalid parameters, another attempt would fail the same way
+                last_error = e
+                logging.error(f"Error occurred: {e}")
+                break
+            except requests.ReadTimeout as e:
+                last_error = e
+                logging.error(f"Error occurred: {e}. Retry {attempt + 1}/{max_retry}")
+                if not retry_read_timeout:
+                    # PayOS may have done it, the answer is what timed out
+                    break
+            except Exception as e:
+                last_error = e
+                logging.error(f"Error occurred: {e}. Retry {attempt + 1}/{max_retry}")
+            if attempt + 1 < max_retry:
+                await asyncio.sleep(backoff_delay(attempt, base_delay, min_delay))
+        logging.error("Max retry reached")
+        if last_error is not None and is_transport_error(last_error):
+            breaker.record_failure()
+        else:
+            # PayOS answered, the circuit of an half open call is closed again
+            breaker.record_success()
+        return None
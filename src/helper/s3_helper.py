@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from io import BytesIO
+from typing import Any, BinaryIO, List, Optional, Sequence
 from uuid import uuid4
 
 import boto3
 import boto3.session
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from starlette.datastructures import UploadFile
 
@@ -14,70 +18,146 @@ from src.config import config
 
 
 class S3Service(object):
+    """
+     Uploads to the S3 bucket (MinIO compatible, path addressing).
+
+     The boto3 client is created once per process and shared by every instance (boto3
+     clients are thread safe), ``S3Service()`` is only a handle. boto3 blocks, so the
+     uploads run in a thread pool of ``S3_UPLOAD_WORKERS`` threads, off the event loop.
+     Form files are streamed from their spooled temporary file, a file over
+     ``S3_MULTIPART_THRESHOLD_MB`` is sent as a multipart upload whose parts are read
+     and sent concurrently.
+
+     how to use:
+         link = await S3Service().upload_file_from_form(upload_file)
+         links = await S3Service().upload_files_from_form([upload_file, ...])
+    """
+
+    _client: Optional[Any] = None
+    _executor: Optional[ThreadPoolExecutor] = None
+    _transfer_config: Optional[TransferConfig] = None
+
     def __init__(self) -> None:
-        self.s3 = boto3.client(
-            "s3",
-            aws_access_key_id=config.S3_KEY,
-            aws_secret_access_key=config.S3_SECRET,
-            endpoint_url=config.S3_ENDPOINT,
-            region_name=config.REGION,
-            config=boto3.session.Config(
-                signature_version="s3v4", s3={"addressing_style": "path"}
+        self.s3 = self.client()
+
+    @classmethod
+    def client(cls):
+        if cls._client is None:
+            cls._client = boto3.client(
+                "s3",
+                aws_access_key_id=config.S3_KEY,
+                aws_secret_access_key=config.S3_SECRET,
+                endpoint_url=config.S3_ENDPOINT,
+                region_name=config.REGION,
+                config=boto3.session.Config(
+                    signature_version="s3v4",
+                    s3={"addressing_style": "path"},
+                    # every upload thread may send all the parts of its file at once
+                    max_pool_connections=config.S3_UPLOAD_WORKERS
+                    * config.S3_MULTIPART_CONCURRENCY,
+                ),
+            )
+        return cls._client
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=config.S3_UPLOAD_WORKERS, thread_name_prefix="s3-upload"
+            )
+        return cls._executor
+
+    @classmethod
+    def _get_transfer_config(cls) -> TransferConfig:
+        if cls._transfer_config is None:
+            part_size = config.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024
+            cls._transfer_config = TransferConfig(
+                multipart_threshold=part_size,
+                multipart_chunksize=part_size,
+                max_concurrency=config.S3_MULTIPART_CONCURRENCY,
+            )
+        return cls._transfer_config
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+         Wait for the uploads in flight and stop the upload threads, called by the application lifespan.
+        """
+        if cls._executor is not None:
+            executor, cls._executor = cls._executor, None
+            # the uploads end in their own threads, the loop keeps serving meanwhile
+            await asyncio.to_thread(executor.shutdown, wait=True)
+
+    @staticmethod
+    def _new_key(filename: str) -> str:
+        month = "{:02d}".format(datetime.now(timezone.utc).month)
+        day = "{:02d}".format(datetime.now(timezone.utc).day)
+        year = datetime.now(timezone.utc).year
+        return f"user_upload/{year}/{month}/{day}/{str(uuid4())}{filename}"
+
+    async def _upload(
+        self, fileobj: BinaryIO, bucket_name: str, filename: str, content_type: str
+    ) -> str:
+        key = self._new_key(filename)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self._get_executor(),
+            lambda: self.s3.upload_fileobj(
+                fileobj,
+                Bucket=bucket_name,
+                Key=key,
+                ExtraArgs={"ACL": "public-read", "ContentType": content_type},
+                Config=self._get_transfer_config(),
             ),
         )
+        return f"{config.S3_ENDPOINT}/{bucket_name}/{key}"
 
     async def upload_file_from_form(
         self, file: UploadFile, bucket_name=config.S3_BUCKET
     ):
-        month = "{:02d}".format(datetime.now(timezone.utc).month)
-        day = "{:02d}".format(datetime.now(timezone.utc).day)
-        year = datetime.now(timezone.utc).year
-        key = f"user_upload/{year}/{month}/{day}/{str(uuid4())}{file.filename}"
         # Guess the MIME type
         content_type, _ = mimetypes.guess_type(file.filename)
         if not content_type:
             content_type = "application/octet-stream"
+        # read by boto3 from the spooled file, chunk by chunk, never copied in memory
         await file.seek(0)
-        content = await file.read()
-        buffer = BytesIO()
-        _ = buffer.write(content)
-        _ = buffer.seek(0)
         try:
-            self.s3.upload_fileobj(
-                buffer,
-                Bucket=bucket_name,
-                Key=key,
-                ExtraArgs={"ACL": "public-read", "ContentType": content_type},
-            )
+            return await self._upload(file.file, bucket_name, file.filename, content_type)
         except ClientError as e:
             logging.error(f"Error uploading file to s3: {e}")
             raise e
 
-        link = f"{config.S3_ENDPOINT}/{bucket_name}/{key}"
-        return link
+    async def upload_files_from_form(
+        self, files: Sequence[UploadFile], bucket_name=config.S3_BUCKET
+    ) -> List[str]:
+        """
+         Upload ``files`` concurrently (bounded by the upload threads).
+
+         @return the links, in the order of ``files``
+        """
+        return list(
+            await asyncio.gather(
+                *(self.upload_file_from_form(file, bucket_name) for file in files)
+            )
+        )
 
     # upload_file_from_form data type is bytes
     async def upload_file_from_bytes(
-        self, file: bytes, filename: str, bucket_name=config.S3_BUCKET
+        self,
+        file: bytes,
+        filename: str,
+        bucket_name=config.S3_BUCKET,
+        content_type: str = "application/octet-stream",
     ):
-        month = "{:02d}".format(datetime.now(timezone.utc).month)
-        day = "{:02d}".format(datetime.now(timezone.utc).day)
-        year = datetime.now(timezone.utc).year
-        key = f"user_upload/{year}/{month}/{day}/{str(uuid4())}{filename}"
-
-        content_type = "application/octet-stream"
+        """
+         Upload ``file`` without blocking the event loop, so it can run concurrently
+         with other work on the same bytes.
 
-        buffer = BytesIO(file)
-        buffer.seek(0)
+         @return the public link, None when the upload failed
+        """
         try:
-            self.s3.upload_fileobj(
-                buffer,
-                Bucket=bucket_name,
-                Key=key,
-                ExtraArgs={"ACL": "public-read", "ContentType": content_type},
-            )
+            # BytesIO shares the buffer of the bytes, it is not copied
+            return await self._upload(BytesIO(file), bucket_name, filename, content_type)
         except ClientError as e:
             logging.error(f"Error uploading file: {e}")
             return None
-        link = f"{config.S3_ENDPOINT}/{bucket_name}/{key}"
-        return link
@@ -2,10 +2,9 @@
 
 from datetime import datetime, timezone
 
-import requests
-
 from src.config import config
 from src.core import logger
+from src.core.http import HttpClientPool
 from src.models.notification_model import NotificationModel
 
 
@@ -25,10 +24,24 @@ class SocketServiceHelper:
                     "totalUnread":total_unread,
                     "createdAt":_create_date.isoformat()
                 }
-            _data_response = requests.post(url_socket, json=_data_json)
-            if _data_response.status_code == 200:
-                logger.info("Send notify success")
-            else:
-                logger.info("Send notify fail")
+            # sent in background, the caller does not wait for the chat service
+            HttpClientPool.fire_and_forget(self._post(url_socket, _data_json))
         except Exception as e:
             logger.error(f"Error: {e}")
+
+    async def _post(self, url: str, data: dict):
+        _data_response = await HttpClientPool.request("POST", url, json=data)
+        if _data_response.status_code == 200:
+            logger.info("Send notify success")
+        else:
+            logger.info("Send notify fail")
+
+    def send_payment_status_helper(self, user_id: int, is_success: bool):
+        url_socket = f"{self.base_url}/api/payment"
+        HttpClientPool.fire_and_forget(
+            self._post(url_socket, {"userId": user_id, "isSuccess": is_success})
+        )
+
+    def send_new_appointment_helper(self, doctor_id: int):
+        url_socket = f"{self.base_url}/api/notify/appointment/new"
+        HttpClientPool.fire_and_forget(self._post(url_socket, {"doctor_id": doctor_id}))
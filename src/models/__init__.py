@@ -10,6 +10,11 @@ from src.models.payment_model import PaymentModel
 from src.models.post_model import CommentModel, PostModel
 from src.models.rating_model import RatingModel
 from src.models.staff_model import StaffModel
+from src.models.statistics_rollup_model import (
+    AppointmentDailyStatModel,
+    PaymentDailyStatModel,
+    WorkScheduleDailyStatModel,
+)
 from src.models.user_model import UserModel
 from src.models.work_schedule_model import WorkScheduleModel
 
@@ -29,4 +34,7 @@ __all__ = [
     "PostModel",
     "CommentModel",
     "StaffModel",
+    "WorkScheduleDailyStatModel",
+    "AppointmentDailyStatModel",
+    "PaymentDailyStatModel",
 ]
@@ -39,7 +39,20 @@ class AppointmentModel(Model):
     __table_args__ = (
         Index("idx_appoint_name", "name"),
         Index("idx_appointment_status", "appointment_status"),
+        # the statistics rollup reads the appointments created on given days
+        Index("idx_appointment_created_at", "created_at"),
+        # patients of a doctor, filtered by status (get_patient_by_doctor_id)
+        Index(
+            "idx_appointment_doctor_status_work_schedule",
+            "doctor_id",
+            "appointment_status",
+            "work_schedule_id",
+        ),
     )
+    __loader_profiles__ = {
+        "list": ("patient", "doctor", "payment", "work_schedule"),
+        "detail": ("patient", "doctor", "payment", "work_schedule", "medical_record"),
+    }
 
     id: Mapped[int] = mapped_column(Integer, Sequence('appointment_id_seq', start=1000000, increment=1),primary_key=True, autoincrement=True,)
 
@@ -60,23 +73,23 @@ class AppointmentModel(Model):
     pre_examination_notes: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     patient: Mapped["PatientModel"] = relationship(
-        "PatientModel", back_populates="appointments", lazy="joined"
+        "PatientModel", back_populates="appointments", lazy="raise_on_sql"
     )
 
     doctor: Mapped["DoctorModel"] = relationship(
-        "DoctorModel", back_populates="appointments", lazy="joined"
+        "DoctorModel", back_populates="appointments", lazy="raise_on_sql"
     )
 
     payment: Mapped["PaymentModel"] = relationship(
-        "PaymentModel", back_populates="appointment", lazy="joined"
+        "PaymentModel", back_populates="appointment", lazy="raise_on_sql"
     )
 
     medical_record: Mapped["MedicalRecordModel"] = relationship(
-        back_populates="appointment", uselist=False, lazy="joined"
+        back_populates="appointment", uselist=False, lazy="raise_on_sql"
     )
 
     work_schedule: Mapped["WorkScheduleModel"] = relationship(
-        "WorkScheduleModel", back_populates="appointment", lazy="joined"
+        "WorkScheduleModel", back_populates="appointment", lazy="raise_on_sql"
     )
     daily_health_checks: Mapped[list["DailyHealCheckModel"]] = relationship(
         "DailyHealCheckModel",
@@ -19,6 +19,10 @@ class DailyHealCheckModel(Model):
         Index("idx_daily_health_check_patient", "patient_id"),
         Index("idx_daily_health_check_appointment", "appointment_id"),
     )
+    __loader_profiles__ = {
+        "list": (),
+        "detail": ("patient", "appointment"),
+    }
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     patient_id: Mapped[int] = mapped_column(
@@ -34,8 +38,8 @@ class DailyHealCheckModel(Model):
     date_create: Mapped[date] = mapped_column(Date, nullable=True, default=date.today())
 
     patient: Mapped["PatientModel"] = relationship(
-        "PatientModel", back_populates="daily_health_checks", lazy="joined"
+        "PatientModel", back_populates="daily_health_checks", lazy="raise_on_sql"
     )
     appointment: Mapped["AppointmentModel"] = relationship(
-        "AppointmentModel", back_populates="daily_health_checks", lazy="joined"
+        "AppointmentModel", back_populates="daily_health_checks", lazy="raise_on_sql"
     )
@@ -99,6 +99,15 @@ class DoctorModel(Model):
         "RatingModel", back_populates="doctor"
     )
 
+    # running totals of the ratings, kept in the same transaction as every rating write
+    rating_sum: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0.0, server_default="0"
+    )
+
+    rating_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
     user: Mapped["UserModel"] = relationship("UserModel", back_populates="doctor")
 
     license_number: Mapped[str] = mapped_column(String, nullable=False, unique=True)
@@ -113,6 +122,10 @@ class DoctorModel(Model):
 
     branch_name: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    @property
+    def avg_rating(self) -> float:
+        return self.rating_sum / self.rating_count if self.rating_count else 0.0
+
     #  one to many
     working_schedules: Mapped[list["WorkScheduleModel"]] = relationship(
         "WorkScheduleModel", back_populates="doctor"
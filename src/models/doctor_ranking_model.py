@@ -0,0 +1,20 @@
+from sqlalchemy import Float, Integer, column, table
+from sqlalchemy.dialects.postgresql import JSONB
+
+# Read model of the doctor directory, a materialized view (see the
+# "add doctor ranking materialized view" migration) refreshed by the
+# refresh_doctor_ranking job. It is a plain table clause, not a Model, so
+# alembic autogenerate never tries to create it as a table.
+doctor_ranking = table(
+    "doctor_ranking",
+    column("doctor_id", Integer),
+    column("avg_rating", Float),
+    column("rating_count", Integer),
+    column("price_id", Integer),
+    column("online_price", Float),
+    column("offline_price", Float),
+    column("price_created_at", Integer),
+    # free work schedules from the day before the refresh to 8 days after,
+    # narrowed to the current week when read
+    column("work_schedules", JSONB),
+)
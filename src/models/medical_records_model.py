@@ -61,6 +61,10 @@ class MedicalRecordModel(Model):
         Index("idx_medical_record_doctor_read", "doctor_read_id"),
         Index("idx_medical_record_appointment", "appointment_id"),
     )
+    __loader_profiles__ = {
+        "list": ("doctor_create", "doctor_read"),
+        "detail": ("patient", "doctor_create", "doctor_read", "appointment"),
+    }
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -114,25 +118,25 @@ class MedicalRecordModel(Model):
 
     # One to One
     appointment: Mapped["AppointmentModel"] = relationship(
-        "AppointmentModel", back_populates="medical_record", lazy="joined"
+        "AppointmentModel", back_populates="medical_record", lazy="raise_on_sql"
     )
 
     # Many to one
     patient: Mapped["PatientModel"] = relationship(
-        "PatientModel", back_populates="medical_records", lazy="joined"
+        "PatientModel", back_populates="medical_records", lazy="raise_on_sql"
     )
 
     # Many to one
     doctor_create: Mapped["DoctorModel"] = relationship(
         "DoctorModel",
         back_populates="medical_records_create",
-        lazy="joined",
+        lazy="raise_on_sql",
         foreign_keys=[doctor_create_id],
     )
 
     doctor_read: Mapped["DoctorModel"] = relationship(
         "DoctorModel",
         back_populates="medical_records_read",
-        lazy="joined",
+        lazy="raise_on_sql",
         foreign_keys=[doctor_read_id],
     )
@@ -16,10 +16,14 @@ class MessageModel(Model):
     __tablename__ = "message"
     __table_args__ = (
         Index("idx_message_sender_conversation", "sender_id", "conversation_id"),
-        Index("idx_message_conversation", "conversation_id"),
+        Index("idx_message_conversation_id", "conversation_id", "id"),
         Index("idx_message_reply", "reply_id"),
         Index("idx_message_sender", "sender_id"),
     )
+    __loader_profiles__ = {
+        "list": (),
+        "detail": ("sender",),
+    }
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
     sender_id: Mapped[int] = mapped_column(
@@ -43,5 +47,5 @@ class MessageModel(Model):
     )
 
     sender: Mapped["UserModel"] = relationship(
-        "UserModel", back_populates="messages", lazy="joined"
+        "UserModel", back_populates="messages", lazy="raise_on_sql"
     )
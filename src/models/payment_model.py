@@ -2,7 +2,7 @@ import enum
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database.postgresql import Model
@@ -25,6 +25,10 @@ class PaymentMethod(enum.Enum):
 
 class PaymentModel(Model):
     __tablename__ = "payment"
+    __table_args__ = (
+        # the statistics rollup reads the payments of given days
+        Index("idx_payment_payment_time", "payment_time"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -17,6 +17,10 @@ class PostModel(Model):
         Index("idx_post_author_title", "author_id", "title"),
         Index("idx_post_author", "author_id"),
     )
+    __loader_profiles__ = {
+        "list": ("author.patient", "author.doctor", "author.staff", "comments"),
+        "detail": ("author.patient", "author.doctor", "author.staff"),
+    }
 
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, index=True, autoincrement=True
@@ -31,14 +35,14 @@ class PostModel(Model):
     author: Mapped["UserModel"] = relationship(
         "UserModel",
         back_populates="posts",
-        lazy="joined",
+        lazy="raise_on_sql",
         passive_deletes=True,
     )
     comments: Mapped[List["CommentModel"]] = relationship(
         "CommentModel",
         back_populates="post",
         cascade="all, delete-orphan",
-        lazy="joined",
+        lazy="raise_on_sql",
     )
     viewed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
@@ -53,6 +57,10 @@ class CommentModel(Model):
         Index("ix_comment_user_post", "user_id", "post_id"),
         Index("ix_comment_post_id", "post_id"),
     )
+    __loader_profiles__ = {
+        "list": ("user.patient", "user.doctor", "user.staff"),
+        "detail": ("post", "user.patient", "user.doctor", "user.staff"),
+    }
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, index=True, autoincrement=True
     )
@@ -72,9 +80,9 @@ class CommentModel(Model):
     post: Mapped["PostModel"] = relationship(
         "PostModel",
         back_populates="comments",
-        lazy="joined",
+        lazy="raise_on_sql",
         passive_deletes=True,
     )
     user: Mapped["UserModel"] = relationship(
-        "UserModel", back_populates="comment_posts", lazy="joined", passive_deletes=True
+        "UserModel", back_populates="comment_posts", lazy="raise_on_sql", passive_deletes=True
     )
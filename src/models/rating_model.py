@@ -13,8 +13,11 @@ if TYPE_CHECKING:
 class RatingModel(Model):
     __tablename__ = "rating"
     __table_args__ = (
-        Index("ix_rating_doctor_patient", "doctor_id", "patient_id"),
+        # one rating per patient and doctor, a second one updates the first
+        Index("ux_rating_doctor_patient", "doctor_id", "patient_id", unique=True),
         Index("ix_rating_doctor", "doctor_id"),
+        # comments of a doctor are paged newest first
+        Index("ix_rating_doctor_id_id", "doctor_id", "id"),
     )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
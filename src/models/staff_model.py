@@ -26,6 +26,9 @@ class StaffModel(Model):
         Index("idx_staff_phone_number", "phone_number"),
         Index("idx_staff_email", "email"),
     )
+    __loader_profiles__ = {
+        "detail": ("user",),
+    }
     id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), primary_key=True)
 
     first_name: Mapped[str] = mapped_column(String, nullable=False)
@@ -47,7 +50,7 @@ class StaffModel(Model):
     user: Mapped["UserModel"] = relationship(
         "UserModel",
         back_populates="staff",
-        lazy="joined",
+        lazy="raise_on_sql",
     )
 
     account_number: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -0,0 +1,58 @@
+from datetime import date
+
+from sqlalchemy import Date, Float, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.database.postgresql import Model
+
+# appointment_status of the work schedule rows without an appointment
+NO_APPOINTMENT = "none"
+
+
+class WorkScheduleDailyStatModel(Model):
+    """work schedules of a day, keyed by the status of their appointment
+
+    Read by the price and conversation statistics, kept up to date by the
+    refresh_statistics_rollup job (see statistics_rollup_repository).
+    """
+
+    __tablename__ = "work_schedule_daily_stat"
+    __table_args__ = (
+        Index("idx_work_schedule_daily_stat_doctor", "doctor_id", "examination_type"),
+    )
+
+    work_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    doctor_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    examination_type: Mapped[str] = mapped_column(String, primary_key=True)
+    appointment_status: Mapped[str] = mapped_column(String(50), primary_key=True)
+    schedule_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ordered_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    fee_total: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+
+
+class AppointmentDailyStatModel(Model):
+    """appointments by the day they were created (created_at, in UTC+7 like the app writes it)"""
+
+    __tablename__ = "appointment_daily_stat"
+
+    created_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    doctor_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    examination_type: Mapped[str] = mapped_column(String, primary_key=True)
+    appointment_status: Mapped[str] = mapped_column(String(50), primary_key=True)
+    appointment_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class PaymentDailyStatModel(Model):
+    """payments of a day per doctor and patient"""
+
+    __tablename__ = "payment_daily_stat"
+    __table_args__ = (
+        Index("idx_payment_daily_stat_patient", "patient_id"),
+        Index("idx_payment_daily_stat_doctor", "doctor_id"),
+    )
+
+    payment_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    doctor_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    patient_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    payment_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    amount_total: Mapped[float] = mapped_column(Float, nullable=False, default=0)
@@ -27,6 +27,9 @@ class UserModel(Model):
         Index("idx_user_phone_number_password_hash", "phone_number", "password_hash"),
         Index("idx_user_phone_number", "phone_number"),
     )
+    __loader_profiles__ = {
+        "detail": ("doctor", "patient", "staff"),
+    }
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -42,21 +45,21 @@ class UserModel(Model):
         "DoctorModel",
         uselist=False,
         back_populates="user",
-        lazy="joined",
+        lazy="raise_on_sql",
         foreign_keys="[DoctorModel.id]",
     )
     patient: Mapped["PatientModel"] = relationship(
         "PatientModel",
         uselist=False,
         back_populates="user",
-        lazy="joined",
+        lazy="raise_on_sql",
         foreign_keys="[PatientModel.id]",
     )
     staff: Mapped["StaffModel"] = relationship(
         "StaffModel",
         uselist=False,
         back_populates="user",
-        lazy="joined",
+        lazy="raise_on_sql",
         foreign_keys="[StaffModel.id]",
     )
     notifications: Mapped[List["NotificationModel"]] = relationship(
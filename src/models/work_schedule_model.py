@@ -29,6 +29,10 @@ class WorkScheduleModel(Model):
         Index("idx_work_schedule_date", "work_date"),
         Index("idx_work_schedule_examination_type", "examination_type"),
     )
+    __loader_profiles__ = {
+        "list": ("doctor",),
+        "detail": ("doctor", "appointment"),
+    }
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -50,11 +54,11 @@ class WorkScheduleModel(Model):
 
     # relationship
     doctor: Mapped["DoctorModel"] = relationship(
-        "DoctorModel", back_populates="working_schedules", lazy="joined"
+        "DoctorModel", back_populates="working_schedules", lazy="raise_on_sql"
     )
 
     appointment: Mapped["AppointmentModel"] = relationship(
-        "AppointmentModel", back_populates="work_schedule", lazy="joined", uselist=False
+        "AppointmentModel", back_populates="work_schedule", lazy="raise_on_sql", uselist=False
     )
 
     @staticmethod
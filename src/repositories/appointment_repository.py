@@ -1,16 +1,15 @@
 import logging as log
 import re
-import time
 from collections import defaultdict
-from datetime import date, datetime, timedelta
-from typing import Final, List, Literal, Optional
+from datetime import date, datetime, timedelta, timezone
+from typing import Final, List, Literal, NamedTuple, Optional
 
-import requests
-from sqlalchemy import and_, case, extract, func, insert, or_, select, update
+from sqlalchemy import and_, exists, extract, func, insert, or_, select, update
 from sqlalchemy.orm import joinedload
 
 from src.config import config
-from src.core.database.postgresql import PostgresRepository
+from src.core.cache import Cache, CacheTag
+from src.core.database.postgresql import PostgresRepository, Projection
 from src.core.decorator.exception_decorator import catch_error_repository
 from src.core.exception import BadRequest, BaseException, InternalServer
 from src.enum import AppointmentModelStatus, ErrorCode
@@ -22,12 +21,92 @@ from src.models.medical_records_model import MedicalRecordModel
 from src.models.patient_model import PatientModel
 from src.models.payment_model import PaymentModel
 from src.models.staff_model import StaffModel
+from src.models.statistics_rollup_model import (
+    NO_APPOINTMENT,
+    AppointmentDailyStatModel,
+    PaymentDailyStatModel,
+    WorkScheduleDailyStatModel,
+)
 from src.models.work_schedule_model import WorkScheduleModel
-from src.repositories.global_helper_repository import redis_working
+from src.repositories.global_helper_repository import (
+    mark_doctor_ranking_stale,
+    mark_statistics_dirty,
+    redis_working,
+    release_work_schedule,
+    reserve_work_schedule,
+)
 from src.repositories.notification_repository import NotificationRepository
 
 payment_helper=PaymentHelper()
 
+
+def _next_month(month_first: date) -> date:
+    return (month_first + timedelta(days=32)).replace(day=1)
+
+
+class StatisticalPricePeriod(NamedTuple):
+    """the statistics of ``year`` seen on ``day``, identifies their cache entry"""
+
+    year: int
+    day: date
+
+PATIENT_LIST_FIELDS = ("first_name", "last_name", "avatar", "phone_number")
+DOCTOR_LIST_FIELDS = (
+    "first_name",
+    "last_name",
+    "certification",
+    "specialization",
+    "avatar",
+    "phone_number",
+)
+APPOINTMENT_LIST_PROJECTION = Projection(
+    AppointmentModel,
+    related={
+        "work_schedule": None,
+        "patient": PATIENT_LIST_FIELDS,
+        "doctor": DOCTOR_LIST_FIELDS,
+    },
+    extra={
+        "is_payment": exists().where(PaymentModel.appointment_id == AppointmentModel.id)
+    },
+)
+
+DOCTOR_PRICE_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "certification",
+    "specialization",
+    "phone_number",
+    "date_of_birth",
+    "gender",
+    "type_of_disease",
+    "is_local_person",
+)
+PATIENT_PRICE_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "date_of_birth",
+    "gender",
+    "email",
+    "address",
+    "emergancy_contact_number",
+)
+
+BILL_PERSON_FIELDS = ("id", "first_name", "last_name", "phone_number", "date_of_birth", "email")
+APPOINTMENT_BILL_PROJECTION = Projection(
+    AppointmentModel,
+    fields=("id", "pre_examination_notes", "name"),
+    related={
+        "doctor": BILL_PERSON_FIELDS,
+        "patient": BILL_PERSON_FIELDS,
+        "work_schedule": ("id", "work_date", "start_time", "end_time", "examination_type"),
+        "payment": None,
+    },
+)
+
 class AppointmentRepository(PostgresRepository[AppointmentModel]):
     # start::create_appointment[]
     @catch_error_repository(message=None)
@@ -147,18 +226,15 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
             )
             return data
         await self.session.commit()
+        await mark_doctor_ranking_stale()
+        await mark_statistics_dirty(work_dates=[work_schedule_model.work_date])
         return {"message":ErrorCode.msg_create_appointment_successfully.value}
 
     @catch_error_repository(message=None)
     async def create_appointment_with_payment(self, payment_id: str,status_code:str):
-        MAX_RETRY:Final[int]=3
         log.info(f"CHECK:::: GET PAYMENT INFO: {payment_id}")
-        obj_payment=payment_helper.get_payment_info(payment_id)
-        while obj_payment is None and MAX_RETRY > 0:
-            print(f"RETRY :{MAX_RETRY}")
-            time.sleep(2)
-            obj_payment=payment_helper.get_payment_info(payment_id)
-            MAX_RETRY-=1
+        # retried with a non blocking backoff inside the helper
+        obj_payment = await payment_helper.get_payment_info(payment_id)
         if not obj_payment:
             raise BadRequest(
                 error_code=ErrorCode.BAD_REQUEST.name,
@@ -250,20 +326,13 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
         ).replace(tzinfo=None)
         self.session.add(payment_model)
         await redis_working.delete(work_schedule_id)
+        await release_work_schedule(work_schedule_id)
 
         # send socket to patient
-        url_chat_service = f"{config.BASE_URL_CHAT_SERVICE}/api/payment"
-        json_data = {
-            "userId": patient_id,
-            "isSuccess": True if status_code == "00" else False,
-        }
-        data = requests.post(url_chat_service, json=json_data)
-        if data.status_code != 200:
-            log.error("Service chat current not working")
-            raise InternalServer(
-                error_code=ErrorCode.SERVER_ERROR.name,
-                errors={"message": ErrorCode.msg_server_error.value},
-            )
+        socket_service_helper = SocketServiceHelper()
+        socket_service_helper.send_payment_status_helper(
+            patient_id, True if status_code == "00" else False
+        )
         if status_code != "00":
             raise BadRequest(
                 error_code=ErrorCode.BAD_REQUEST.name,
@@ -271,7 +340,6 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
             )
 
         # send socket to doctor
-        url_socket = f"{config.BASE_URL_CHAT_SERVICE}/api/notify/appointment/new"
         _select_work = select(WorkScheduleModel).where(WorkScheduleModel.id == int(work_schedule_id))
         _result_select_work = await self.session.execute(_select_work)
         _work_schedule = _result_select_work.scalar_one()
@@ -280,9 +348,7 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
             "fromTime": _work_schedule.start_time.isoformat(),
             "toTime": _work_schedule.end_time.isoformat(),
         }
-        result_response= requests.post(url_socket, json={"doctor_id": appointment_data.get("doctor_id")})
-        if result_response.status_code != 200:
-            log.error("Service chat current not working,")
+        socket_service_helper.send_new_appointment_helper(appointment_data.get("doctor_id"))
         # FIXME: optimize code here for future
         # send logic notify to doctor
         try:
@@ -302,6 +368,8 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
             log.error(e)
         # not commit for data test
         await self.session.commit()
+        await mark_doctor_ranking_stale()
+        await mark_statistics_dirty(work_dates=[_work_schedule.work_date])
         return {"message": ErrorCode.msg_create_appointment_successfully.value}
 
     async def _get_doctor_model_by_id(self, doctor_id: int):
@@ -347,7 +415,7 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
             # if not cancel_url:
             #     cancel_url=""
             cancel_url="https://www.google.com/"
-            data = payos_helper.create_payment(
+            data = await payos_helper.create_payment(
                 amount=int(medical_examination_fee),
                 description = f"Ma giao dich {work_schedule_id}.",
                 returnUrl=call_back_url,
@@ -374,6 +442,7 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
             await redis_working.set(
                 json_data, str(work_schedule_id), config.MAX_TIME_WORKING_TIME
             )
+            await reserve_work_schedule(work_schedule_id, config.MAX_TIME_WORKING_TIME)
             if not data:
                 raise BadRequest(
                     error_code=ErrorCode.BAD_REQUEST.name,
@@ -459,7 +528,6 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
     # end::create_appointment[]
     @catch_error_repository(message=None)
     async def find(self, **kwargs):  # type: ignore
-        query = select(self.model_class)
         appointment_status: str = kwargs.get("appointment_status", None)
         from_date: date = kwargs.get("from_date", None)
         to_date: date = kwargs.get("to_date", None)
@@ -470,117 +538,74 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
         page_size: int = kwargs.get("page_size", 10)
         doctor_id: int = kwargs.get("doctor_id", None)
         patient_id: int = kwargs.get("patient_id", None)
-        is_join_work_schedule_model = True
+        pagination: str = kwargs.get("pagination", "offset")
+        cursor: str | None = kwargs.get("cursor", None)
+        projection = APPOINTMENT_LIST_PROJECTION
+        work_schedule = projection.entity("work_schedule")
+        doctor = projection.entity("doctor")
+        patient = projection.entity("patient")
+        query = projection.select()
         if appointment_status:
-            query = query.filter(
+            query = query.where(
                 self.model_class.appointment_status == appointment_status
             )
-        if from_date and to_date is None:
-            query = query.join(WorkScheduleModel).filter(
-                WorkScheduleModel.work_date >= from_date
-            )
-        elif to_date and from_date is None:
-            query = query.join(WorkScheduleModel).filter(
-                WorkScheduleModel.work_date <= to_date
-            )
-        elif from_date and to_date:
-            query = query.join(WorkScheduleModel).filter(
-                and_(
-                    WorkScheduleModel.work_date >= from_date,
-                    WorkScheduleModel.work_date <= to_date,
-                )
-            )
-        else:
-            is_join_work_schedule_model = False
+        if from_date:
+            query = query.where(work_schedule.work_date >= from_date)
+        if to_date:
+            query = query.where(work_schedule.work_date <= to_date)
         if examination_type:
-            if is_join_work_schedule_model:
-                query = query.filter(
-                    WorkScheduleModel.examination_type == examination_type
-                )
-            else:
-                query = query.join(WorkScheduleModel).filter(
-                    WorkScheduleModel.examination_type == examination_type
-                )
+            query = query.where(work_schedule.examination_type == examination_type)
         if doctor_id:
-            query = query.filter(self.model_class.doctor_id == doctor_id)
+            query = query.where(self.model_class.doctor_id == doctor_id)
         if patient_id:
-            query = query.filter(self.model_class.patient_id == patient_id)
+            query = query.where(self.model_class.patient_id == patient_id)
         if doctor_name:
             _doctor_name = doctor_name.strip().lower()
-            query = query.join(AppointmentModel.doctor).where(
-                func.lower(DoctorModel.last_name + " " + DoctorModel.first_name).ilike(
+            query = query.where(
+                func.lower(doctor.last_name + " " + doctor.first_name).ilike(
                     f"%{_doctor_name}%"
                 )
             )
         if patient_name:
             patient_name = patient_name.strip().lower()
-            query = query.join(AppointmentModel.patient).where(
-                func.lower(
-                    PatientModel.last_name + " " + PatientModel.first_name
-                ).ilike(f"%{patient_name}%")
+            query = query.where(
+                func.lower(patient.last_name + " " + patient.first_name).ilike(
+                    f"%{patient_name}%"
+                )
             )
-        total_count = await self.session.execute(
-            select(func.count()).select_from(query)
-        )
-        query = query.offset((current_page - 1) * page_size).limit(page_size)
-
-        result = await self.session.execute(query)
-        data = result.scalars().all()
+        total_count = None
+        next_cursor = None
+        if pagination == "cursor":
+            rows, next_cursor = await self._paginate_keyset(
+                query, AppointmentModel.id, page_size, cursor, scalars=False
+            )
+            data = projection.nest_many(rows)
+        else:
+            total_count = await self.session.execute(
+                select(func.count()).select_from(query.subquery())
+            )
+            query = query.offset((current_page - 1) * page_size).limit(page_size)
+            data = await self._fetch_projection(projection, query)
         items = []
 
-        for item in data:
-            dict_item = item.as_dict
-            dict_item["is_payment"] = True if item.payment else False
-            dict_item["work_schedule"] = item.work_schedule.as_dict
+        for dict_item in data:
+            _patient = dict_item.pop("patient")
+            _doctor = dict_item.pop("doctor")
             if doctor_id:
-                dict_item["work_schedule"].update(
-                    {
-                        "patient": {
-                            "first_name": item.patient.first_name,
-                            "last_name": item.patient.last_name,
-                            "avatar": item.patient.avatar,
-                            "phone_number": item.patient.phone_number,
-                        }
-                    }
-                )
+                dict_item["work_schedule"]["patient"] = _patient
             elif patient_id:
-                dict_item["work_schedule"].update(
-                    {
-                        "doctor": {
-                            "first_name": item.doctor.first_name,
-                            "last_name": item.doctor.last_name,
-                            "certification": item.doctor.certification,
-                            "specialization": item.doctor.specialization,
-                            "avatar": item.doctor.avatar,
-                            "phone_number": item.doctor.phone_number,
-                        }
-                    }
-                )
+                dict_item["work_schedule"]["doctor"] = _doctor
             else:
-                dict_item["work_schedule"].update(
-                    {
-                        "patient": {
-                            "first_name": item.patient.first_name,
-                            "last_name": item.patient.last_name,
-                            "avatar": item.patient.avatar,
-                            "phone_number": item.patient.phone_number,
-                        }
-                    }
-                )
-                dict_item["work_schedule"].update(
-                    {
-                        "doctor": {
-                            "first_name": item.doctor.first_name,
-                            "last_name": item.doctor.last_name,
-                            "certification": item.doctor.certification,
-                            "specialization": item.doctor.specialization,
-                            "avatar": item.doctor.avatar,
-                            "phone_number": item.doctor.phone_number,
-                        }
-                    }
-                )
+                dict_item["work_schedule"]["patient"] = _patient
+                dict_item["work_schedule"]["doctor"] = _doctor
             items.append(dict_item)
 
+        if total_count is None:
+            return {
+                "data": items,
+                "next_cursor": next_cursor,
+                "page_size": page_size,
+            }
         total_pages = (total_count.scalar_one() + page_size - 1) // page_size
         return {
             "data": items,
@@ -595,7 +620,10 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
             AppointmentModel.patient_id == patient_id,
             AppointmentModel.id == appointment_id,
         ).options(
-            joinedload(AppointmentModel.work_schedule)
+            joinedload(AppointmentModel.work_schedule),
+            # deleting the appointment unlinks them in the same flush
+            joinedload(AppointmentModel.payment),
+            joinedload(AppointmentModel.medical_record),
         )
         result_appointment = await self.session.execute(statment_appointment)
         appointment = result_appointment.scalar_one_or_none()
@@ -624,35 +652,35 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
                 },
             )
         appointment.work_schedule.ordered = False
+        created_date = datetime.fromtimestamp(appointment.created_at, timezone.utc).date()
+        payment_time = appointment.payment.payment_time if appointment.payment else None
         await self.session.delete(appointment)
         await self.session.commit()
+        await mark_doctor_ranking_stale()
+        await mark_statistics_dirty(
+            work_dates=[working_date],
+            created_dates=[created_date],
+            payment_dates=[payment_time.date()] if payment_time else [],
+        )
         return {"message": ErrorCode.msg_delete_appointment_successfully.value}
 
     @catch_error_repository(message=None)
     async def statistical_appointment(self, year: int):
-        current_month = datetime.now().month +1
-        current_year = datetime.now().year
-        # months = (
-        #     list(range(1, current_month))
-        #     if year == current_year
-        #     else list(range(1, 13))
-        # )
         months = list(range(1, 13))
-
+        stat = AppointmentDailyStatModel
+        month = extract("month", stat.created_date).label("month")
         query = (
             select(
-                func.count(AppointmentModel.appointment_status),
-                AppointmentModel.appointment_status,
-                extract("month", func.to_timestamp(AppointmentModel.created_at)).label(
-                    "month"
-                ),
-                extract("year", func.to_timestamp(AppointmentModel.created_at)).label(
-                    "year"
-                ),
+                func.sum(stat.appointment_count),
+                stat.appointment_status,
+                month,
             )
-            .where(extract("year", func.to_timestamp(AppointmentModel.created_at)) == year)
-            .group_by(AppointmentModel.appointment_status, "month", "year")
-            .order_by("year", "month", AppointmentModel.appointment_status)
+            .where(
+                stat.created_date >= date(year, 1, 1),
+                stat.created_date < date(year + 1, 1, 1),
+            )
+            .group_by(stat.appointment_status, month)
+            .order_by(month, stat.appointment_status)
         )
 
         result = await self.session.execute(query)
@@ -666,270 +694,166 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
             for status in AppointmentModelStatus.all_statuses():
                 appointment_status_by_year[str(year)][str(month)][status] = 0
 
-        for count, status, month, year in data:
+        for count, status, month in data:
             status_enum = AppointmentModelStatus(status).value
-            year_str = str(year).split(".")[0]
             month_str = str(month).split(".")[0]
-            appointment_status_by_year[year_str][month_str][status_enum] = count
+            appointment_status_by_year[str(year)][month_str][status_enum] = count
 
         return appointment_status_by_year
 
     @catch_error_repository(message=None)
     async def statistical_price(self, year: Optional[int]):
-        data_response = {
-            "today_price": {
-                "total_price": 0,
-                "online_price": 0,
-                "offline_price": 0,
-            },
-            "previous_price": {
-                "total_price": 0,
-                "online_price": 0,
-                "offline_price": 0,
-            },
-            "monthly_price": {
-                "total_price": 0,
-                "online_price": 0,
-                "offline_price": 0,
-            },
-            "yearly_price": {
-                "total_price": 0,
-                "online_price": 0,
-                "offline_price": 0,
-            },
-            "monthly_details": {month: {
-                "total_price": 0,
-                "online_price": 0,
-                "offline_price": 0,
-            } for month in range(1, 13)},
-        }
+        today = date.today()
+        return await self._statistical_price(
+            period=StatisticalPricePeriod(year=year or today.year, day=today)
+        )
 
-        today = datetime.now()
+    # dropped by invalidate_statistical_price when the rollup job recomputed work schedule days
+    @Cache.cached(
+        tag=CacheTag.GET_STATISTICAL_PRICE,
+        ttl=config.STATISTICAL_PRICE_CACHE_TTL_SECONDS,
+        identify={"period": ["year", "day"]},
+    )
+    @catch_error_repository(message=None)
+    async def _statistical_price(self, period: StatisticalPricePeriod):
+        year, today = period
         yesterday = today - timedelta(days=1)
-
-        def build_price_query(day=None, month=None, year=None):
-            """Helper function to build query based on given day, month, and year."""
-            filters = [AppointmentModel.appointment_status == AppointmentModelStatus.COMPLETED.value]
-            if year:
-                filters.append(extract("year", WorkScheduleModel.work_date) == year)
-            if month:
-                filters.append(extract("month", WorkScheduleModel.work_date) == month)
-            if day:
-                filters.append(extract("day", WorkScheduleModel.work_date) == day)
-
-            total_price = func.sum(WorkScheduleModel.medical_examination_fee).label("total_price")
-
-            online_price = func.sum(
-                    case(
-                        (
-                            WorkScheduleModel.examination_type == AppointmentModelTypeStatus.ONLINE.value,
-                            WorkScheduleModel.medical_examination_fee,
-                        ),
-                        else_=0,
-                    )
-                ).label("online_price")
-
-            offline_price = func.sum(
-                case(
-                    (
-                        WorkScheduleModel.examination_type
-                        == AppointmentModelTypeStatus.OFFLINE.value,
-                        WorkScheduleModel.medical_examination_fee,
-                    ),
-                    else_=0,
-                )
-            ).label("offline_price")
-
-            return (
-                select(total_price, online_price, offline_price)
-                .join(AppointmentModel)
-                .where(*filters)
-            )
-
-        # Doanh thu hôm nay
-        result_today_price = await self.session.execute(build_price_query(day=today.day, month=today.month, year=today.year))
-        today_price_data = result_today_price.fetchone()
-        if today_price_data:
-            data_response["today_price"]["total_price"] = today_price_data.total_price or 0
-            data_response["today_price"]["online_price"] = today_price_data.online_price or 0
-            data_response["today_price"]["offline_price"] = today_price_data.offline_price or 0
-
-        # Doanh thu hôm trước
-        result_previous_price = await self.session.execute(build_price_query(day=yesterday.day, month=yesterday.month, year=yesterday.year))
-        previous_price_data = result_previous_price.fetchone()
-        if previous_price_data:
-            data_response["previous_price"]["total_price"] = previous_price_data.total_price or 0
-            data_response["previous_price"]["online_price"] = previous_price_data.online_price or 0
-            data_response["previous_price"]["offline_price"] = previous_price_data.offline_price or 0
-
-        # Doanh thu tháng hiện tại
-        result_monthly_price = await self.session.execute(build_price_query(month=today.month, year=today.year))
-        monthly_price_data = result_monthly_price.fetchone()
-        if monthly_price_data:
-            data_response["monthly_price"]["total_price"] = monthly_price_data.total_price or 0
-            data_response["monthly_price"]["online_price"] = monthly_price_data.online_price or 0
-            data_response["monthly_price"]["offline_price"] = monthly_price_data.offline_price or 0
-
-        # Doanh thu từng tháng trong năm
+        month_start = today.replace(day=1)
+        stat = WorkScheduleDailyStatModel
+        work_date = stat.work_date
+        # every bucket is a [from, to) range of work_date
+        buckets = {
+            "today_price": (today, today + timedelta(days=1)),
+            "previous_price": (yesterday, today),
+            "monthly_price": (month_start, _next_month(month_start)),
+            "yearly_price": (date(year, 1, 1), date(year + 1, 1, 1)),
+        }
         for month in range(1, 13):
-            if not year:
-                year = today.year
-            result_month_detail = await self.session.execute(build_price_query(month=month, year=year))
-            month_detail_data = result_month_detail.fetchone()
-            if month_detail_data:
-                data_response["monthly_details"][month]["total_price"] = month_detail_data.total_price or 0
-                data_response["monthly_details"][month]["online_price"] = month_detail_data.online_price or 0
-                data_response["monthly_details"][month]["offline_price"] = month_detail_data.offline_price or 0
-
-        # Tổng doanh thu năm
-        data_response["yearly_price"]["total_price"] = sum(
-            data_response["monthly_details"][month]["total_price"] for month in range(1, 13)
-        )
-        data_response["yearly_price"]["online_price"] = sum(
-            data_response["monthly_details"][month]["online_price"] for month in range(1, 13)
-        )
-        data_response["yearly_price"]["offline_price"] = sum(
-            data_response["monthly_details"][month]["offline_price"] for month in range(1, 13)
+            month_first = date(year, month, 1)
+            buckets[str(month)] = (month_first, _next_month(month_first))
+
+        fee = stat.fee_total
+        is_online = stat.examination_type == AppointmentModelTypeStatus.ONLINE.value
+        is_offline = stat.examination_type == AppointmentModelTypeStatus.OFFLINE.value
+        columns = []
+        for name, (date_from, date_to) in buckets.items():
+            in_bucket = and_(work_date >= date_from, work_date < date_to)
+            columns += [
+                func.sum(fee).filter(in_bucket).label(f"{name}_total"),
+                func.sum(fee).filter(in_bucket, is_online).label(f"{name}_online"),
+                func.sum(fee).filter(in_bucket, is_offline).label(f"{name}_offline"),
+            ]
+        # the daily rollup of the selected year and of the days around today
+        recent_from = min(yesterday, month_start)
+        _select_price = select(*columns).where(
+            stat.appointment_status == AppointmentModelStatus.COMPLETED.value,
+            or_(
+                and_(work_date >= buckets["yearly_price"][0], work_date < buckets["yearly_price"][1]),
+                and_(work_date >= recent_from, work_date < buckets["monthly_price"][1]),
+            ),
         )
+        row = (await self.session.execute(_select_price)).one()._mapping
 
+        def _prices(name: str) -> dict:
+            return {
+                "total_price": row[f"{name}_total"] or 0,
+                "online_price": row[f"{name}_online"] or 0,
+                "offline_price": row[f"{name}_offline"] or 0,
+            }
+
+        data_response = {
+            name: _prices(name)
+            for name in ("today_price", "previous_price", "monthly_price", "yearly_price")
+        }
+        # the keys are strings so the cached copy reads back the same
+        data_response["monthly_details"] = {
+            str(month): _prices(str(month)) for month in range(1, 13)
+        }
         return data_response
 
     @catch_error_repository(message=None)
     async def statistical_price_person(self,from_date:date, to_date:date , user_id, *args,**kwargs):
-        # convert date to datetime
-        from_date = datetime.combine(from_date, datetime.min.time())
-        to_date = datetime.combine(to_date, datetime.max.time())
-        _select_payment = (
-            select(func.sum(PaymentModel.amount).label("total_price"))
-            .join(AppointmentModel)
-            .where(
-                or_(
-                    AppointmentModel.doctor_id == user_id,
-                    AppointmentModel.patient_id == user_id
-                ),
-                PaymentModel.payment_time >= from_date,
-                PaymentModel.payment_time <= to_date
-            )
+        stat = PaymentDailyStatModel
+        _select_payment = select(func.sum(stat.amount_total).label("total_price")).where(
+            or_(stat.doctor_id == user_id, stat.patient_id == user_id),
+            stat.payment_date.between(from_date, to_date),
         )
         _result_payment = await self.session.execute(_select_payment)
         _total_payment = _result_payment.scalar_one()
         if not _total_payment:
             _total_payment = 0
+        # convert date to datetime
+        from_date = datetime.combine(from_date, datetime.min.time())
+        to_date = datetime.combine(to_date, datetime.max.time())
         return {"total_price": _total_payment,"from_date":from_date.isoformat(),"to_date":to_date.isoformat()}
 
+    async def _statistical_price_group_by(
+        self, model_class, fields: tuple, payment_column, from_date: date, to_date: date
+    ) -> list[dict]:
+        """every row of ``model_class`` with the total of its payments in the date range"""
+        stat = PaymentDailyStatModel
+        totals = (
+            select(payment_column.label("id"), func.sum(stat.amount_total).label("total_price"))
+            .where(stat.payment_date.between(from_date, to_date))
+            .group_by(payment_column)
+            .subquery()
+        )
+        columns = [column for column in model_class.__table__.columns if column.name in fields]
+        _query = select(
+            *columns, func.coalesce(totals.c.total_price, 0).label("total_price")
+        ).outerjoin(totals, totals.c.id == model_class.id)
+        rows = (await self.session.execute(_query)).all()
+        data = model_class.serialize_many(rows, include=fields)
+        for item, row in zip(data, rows):
+            item["total_price"] = row.total_price
+        return data
+
     @catch_error_repository(message=None)
     async def statistical_price_all_doctor(self,from_date:date, to_date:date):
-        # convert date to datetime
-        from_date = datetime.combine(from_date, datetime.min.time())
-        to_date=datetime.combine(to_date, datetime.max.time())
-        _query = (
-            select(
-                DoctorModel,
-                func.coalesce(func.sum(PaymentModel.amount), 0).label("total_price"),
-            )
-            .select_from(DoctorModel)  # Xác định bảng chính
-            .outerjoin(AppointmentModel, AppointmentModel.doctor_id == DoctorModel.id)
-            .outerjoin(PaymentModel, PaymentModel.appointment_id == AppointmentModel.id)
-            .where(
-                (PaymentModel.payment_time.is_(None)) |
-                ((PaymentModel.payment_time >= from_date) & (PaymentModel.payment_time <= to_date))
-            )
-            .group_by(DoctorModel)
+        return await self._statistical_price_group_by(
+            DoctorModel,
+            DOCTOR_PRICE_FIELDS,
+            PaymentDailyStatModel.doctor_id,
+            from_date,
+            to_date,
         )
 
-
-        _result_statment = await self.session.execute(_query)
-        _data_result = _result_statment.all()
-        _include_field_doctor=["id","first_name","last_name","certification","specialization","phone_number","date_of_birth","gender","type_of_disease","is_local_person"]
-        data = []
-
-        for item in _data_result:
-            doctor_model = item[0]
-            _total_price = item[1]
-            _doctor_data = doctor_model.as_dict
-            # remove field
-            for key in list(_doctor_data.keys()):
-                if key not in _include_field_doctor:
-                    del _doctor_data[key]
-            _doctor_data["total_price"] = _total_price
-            data.append(_doctor_data)
-        return data
-
     @catch_error_repository(message=None)
     async def statistical_price_all_patients(self,from_date:date, to_date:date):
-        # convert date to datetime
-        from_date = datetime.combine(from_date, datetime.min.time())
-        to_date=datetime.combine(to_date, datetime.max.time())
-        _query = (
-            select(
-                PatientModel,
-                func.coalesce(func.sum(PaymentModel.amount), 0).label("total_price"),
-            )
-            .select_from(PatientModel)  # Xác định bảng chính
-            .outerjoin(AppointmentModel, AppointmentModel.patient_id == PatientModel.id)
-            .outerjoin(PaymentModel, PaymentModel.appointment_id == AppointmentModel.id)
-            .where(
-                (PaymentModel.payment_time.is_(None)) |
-                ((PaymentModel.payment_time >= from_date) & (PaymentModel.payment_time <= to_date))
-            )
-            .group_by(PatientModel)
+        return await self._statistical_price_group_by(
+            PatientModel,
+            PATIENT_PRICE_FIELDS,
+            PaymentDailyStatModel.patient_id,
+            from_date,
+            to_date,
         )
 
-
-        _result_statment = await self.session.execute(_query)
-        _data_result = _result_statment.all()
-        _include_field_patients=["id","first_name","last_name","phone_number","date_of_birth","gender","email","address","emergancy_contact_number"]
-        data = []
-
-        for item in _data_result:
-            patient_model = item[0]
-            _total_price = item[1]
-            _patient_data = patient_model.as_dict
-            # remove patient_model
-            for key in list(_patient_data.keys()):
-                if key not in _include_field_patients:
-                    del _patient_data[key]
-            _patient_data["total_price"] = _total_price
-            data.append(_patient_data)
-        return data
-
     @catch_error_repository(message=None)
     async def statistical_appointment_sum_with_group_by_patient(self, doctor_id: int, examination_type: Literal["online", "offline"]):
-        _select_appointment = select(AppointmentModel).join(WorkScheduleModel).where(
-            and_(
-                AppointmentModel.doctor_id == doctor_id,
-                WorkScheduleModel.examination_type == examination_type
+        stat = WorkScheduleDailyStatModel
+        _select_appointment = (
+            select(stat.appointment_status, func.sum(stat.schedule_count))
+            .where(
+                stat.doctor_id == doctor_id,
+                stat.examination_type == examination_type,
+                stat.appointment_status != NO_APPOINTMENT,
             )
+            .group_by(stat.appointment_status)
         )
         _execute_query = await self.session.execute(_select_appointment)
-        _result_data = _execute_query.scalars().all()
-        _data = {
-            "total_appointment": len(_result_data),
-            "approved": 0,
-            "processing": 0,
-            "completed": 0,
+        _counts = dict(_execute_query.all())
+        return {
+            "total_appointment": sum(_counts.values()),
+            "approved": _counts.get(AppointmentModelStatus.APPROVED.value, 0),
+            "processing": _counts.get(AppointmentModelStatus.PROCESSING.value, 0),
+            "completed": _counts.get(AppointmentModelStatus.COMPLETED.value, 0),
         }
-        for appointment in _result_data:
-            if appointment.appointment_status == AppointmentModelStatus.APPROVED.value:
-                _data["approved"] += 1
-            elif appointment.appointment_status == AppointmentModelStatus.PROCESSING.value:
-                _data["processing"] += 1
-            elif appointment.appointment_status == AppointmentModelStatus.COMPLETED.value:
-                _data["completed"] += 1
-        return _data
 
 
     @catch_error_repository(message=None)
     async def get_appointment_bill(self, appointment_id: int, user_id:int | None):
-        _select_appointment = (
-            select(AppointmentModel)
-            .where(AppointmentModel.id == appointment_id)
-            .options(
-                joinedload(AppointmentModel.patient),
-                joinedload(AppointmentModel.doctor),
-                joinedload(AppointmentModel.work_schedule),
-                joinedload(AppointmentModel.payment),
-            )
+        _select_appointment = APPOINTMENT_BILL_PROJECTION.select().where(
+            AppointmentModel.id == appointment_id
         )
         if user_id:
             _select_appointment = _select_appointment.where(
@@ -938,18 +862,17 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
                     AppointmentModel.patient_id == user_id,
                 )
             )
-        _result_appointment = await self.session.execute(_select_appointment)
-        _data_appointment = _result_appointment.scalar_one_or_none()
+        _data_appointment = await self._fetch_projection(
+            APPOINTMENT_BILL_PROJECTION, _select_appointment
+        )
         if not _data_appointment:
             raise BadRequest(
                 error_code=ErrorCode.NOT_FOUND.name,
                 errors={"message": ErrorCode.msg_not_found_appointment.value},
             )
 
-        _staff_create = select(StaffModel)
-        _result_staff = await self.session.execute(_staff_create)
-        _staff = _result_staff.scalar_one()
-        _appointment = self._refactor_data_bill(_data_appointment,_staff)
+        _staff = await self._get_staff_create()
+        _appointment = self._refactor_data_bill(_data_appointment[0], _staff)
         return _appointment
 
     @catch_error_repository(message=None)
@@ -964,12 +887,11 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
         user_id: int | None,
         **kwargs,
     ):
-        _select_appointment = select(AppointmentModel).options(
-            joinedload(AppointmentModel.patient),
-            joinedload(AppointmentModel.doctor),
-            joinedload(AppointmentModel.work_schedule),
-            joinedload(AppointmentModel.payment),
-        )
+        projection = APPOINTMENT_BILL_PROJECTION
+        work_schedule = projection.entity("work_schedule")
+        doctor = projection.entity("doctor")
+        patient = projection.entity("patient")
+        _select_appointment = projection.select()
 
         if user_id:
             _select_appointment = _select_appointment.where(
@@ -978,58 +900,45 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
                     AppointmentModel.patient_id == user_id,
                 )
             )
-        if from_date and to_date:
-            _select_appointment = _select_appointment.join(AppointmentModel.work_schedule).where(
-                and_(
-                    WorkScheduleModel.work_date >= from_date,
-                    WorkScheduleModel.work_date <= to_date,
-                )
+        if from_date:
+            _select_appointment = _select_appointment.where(
+                work_schedule.work_date >= from_date
+            )
+        if to_date:
+            _select_appointment = _select_appointment.where(
+                work_schedule.work_date <= to_date
             )
-        else:
-            if from_date:
-                _select_appointment = _select_appointment.join(AppointmentModel.work_schedule).where(
-                    WorkScheduleModel.work_date >= from_date
-                )
-            if to_date:
-                _select_appointment = _select_appointment.join(AppointmentModel.work_schedule).where(
-                    WorkScheduleModel.work_date <= to_date
-                )
 
         if doctor_name:
             _doctor_name = doctor_name.strip().lower()
-            _select_appointment = _select_appointment.join(AppointmentModel.doctor).where(
-                func.lower(DoctorModel.last_name + " "+ DoctorModel.first_name).ilike(
+            _select_appointment = _select_appointment.where(
+                func.lower(doctor.last_name + " " + doctor.first_name).ilike(
                     f"%{_doctor_name}%"
                 )
             )
         if doctor_phone:
             _doctor_phone = doctor_phone.strip()
-            _select_appointment = _select_appointment.join(AppointmentModel.doctor).where(
-                DoctorModel.phone_number.ilike(f"%{_doctor_phone}%")
+            _select_appointment = _select_appointment.where(
+                doctor.phone_number.ilike(f"%{_doctor_phone}%")
             )
 
         if patient_name:
             _patient_name = patient_name.strip().lower()
-            _select_appointment = _select_appointment.join(
-                AppointmentModel.patient
-            ).where(
-                func.lower(PatientModel.last_name + " " + PatientModel.first_name).ilike(
+            _select_appointment = _select_appointment.where(
+                func.lower(patient.last_name + " " + patient.first_name).ilike(
                     f"%{_patient_name}%"
                 )
             )
 
         if patient_phone:
             _patient_phone = patient_phone.strip()
-            _select_appointment = _select_appointment.join(AppointmentModel.patient).where(
-                PatientModel.phone_number.ilike(f"%{_patient_phone}%")
+            _select_appointment = _select_appointment.where(
+                patient.phone_number.ilike(f"%{_patient_phone}%")
             )
         _select_appointment=_select_appointment.order_by(AppointmentModel.created_at.desc())
-        _result_appointment = await self.session.execute(_select_appointment)
-        _data_appointment = _result_appointment.scalars().all()
+        _data_appointment = await self._fetch_projection(projection, _select_appointment)
 
-        _staff_create = select(StaffModel)
-        _result_staff = await self.session.execute(_staff_create)
-        _staff = _result_staff.scalar_one()
+        _staff = await self._get_staff_create()
 
         _data = []
         for item in _data_appointment:
@@ -1038,53 +947,23 @@ class AppointmentRepository(PostgresRepository[AppointmentModel]):
 
         return _data
 
-    def _refactor_data_bill(self, appointment: AppointmentModel,staff:StaffModel):
-        _data_appointment = appointment
-        _staff = staff
-        _include_field = [
-            "first_name",
-            "last_name",
-            "phone_number",
-            "date_of_birth",
-            "email",
-            "work_date",
-            "start_time",
-            "end_time",
-            "examination_type",
-            "pre_examination_notes",
-            "id",
-        ]
-        _staff_create = {k: v for k, v in _staff.as_dict.items() if k in _include_field}
+    async def _get_staff_create(self) -> dict:
+        _staff_create = select(StaffModel)
+        _result_staff = await self.session.execute(_staff_create)
+        return _result_staff.scalar_one().to_dict(include=BILL_PERSON_FIELDS)
 
-        _payment_data = (
-            _data_appointment.payment.as_dict if _data_appointment.payment else {}
-        )
-        _doctor_data = {
-            k: v
-            for k, v in _data_appointment.doctor.as_dict.items()
-            if k in _include_field
-        }
-        _patient_data = {
-            k: v
-            for k, v in _data_appointment.patient.as_dict.items()
-            if k in _include_field
-        }
-        _work_schedule_data = {
-            k: v
-            for k, v in _data_appointment.work_schedule.as_dict.items()
-            if k in _include_field
-        }
-        _appointment = {
-            "id": _data_appointment.id,
-            "pre_examination_notes": _data_appointment.pre_examination_notes,
-            "name": _data_appointment.name,
-        }
+    def _refactor_data_bill(self, appointment: dict, staff: dict):
+        """shape one row of APPOINTMENT_BILL_PROJECTION as a bill"""
         _appointment = {
-            "appointment": _appointment,
-            "doctor": _doctor_data,
-            "patient": _patient_data,
-            "work_schedule": _work_schedule_data,
-            "payment": _payment_data,
-            "staff_create": _staff_create,
+            "appointment": {
+                "id": appointment["id"],
+                "pre_examination_notes": appointment["pre_examination_notes"],
+                "name": appointment["name"],
+            },
+            "doctor": appointment["doctor"],
+            "patient": appointment["patient"],
+            "work_schedule": appointment["work_schedule"],
+            "payment": appointment["payment"] or {},
+            "staff_create": staff,
         }
         return _appointment
@@ -46,7 +46,8 @@ class ConversationRepoitory(PostgresRepository[ConversationModel]):
             select(ConversationModel)
             .where(ConversationModel.appointment_id == appointment_id)
             .options(
-                joinedload(ConversationModel.appointment),
+                joinedload(ConversationModel.appointment).joinedload(AppointmentModel.doctor),
+                joinedload(ConversationModel.appointment).joinedload(AppointmentModel.patient),
                 joinedload(ConversationModel.messages),
             )
         )
@@ -64,7 +65,11 @@ class ConversationRepoitory(PostgresRepository[ConversationModel]):
         query_appointment = (
             select(AppointmentModel)
             .where(AppointmentModel.id == appointment_id)
-            .options(joinedload(AppointmentModel.work_schedule))
+            .options(
+                joinedload(AppointmentModel.work_schedule),
+                joinedload(AppointmentModel.doctor),
+                joinedload(AppointmentModel.patient),
+            )
         )
         result_query_appointment = await self.session.execute(query_appointment)
         data_query_appointment = result_query_appointment.unique().scalar_one()
@@ -210,7 +215,9 @@ class ConversationRepoitory(PostgresRepository[ConversationModel]):
             .options(
                 joinedload(AppointmentModel.conversation).joinedload(
                     ConversationModel.messages
-                )
+                ),
+                joinedload(AppointmentModel.doctor),
+                joinedload(AppointmentModel.patient),
             )
             .order_by(AppointmentModel.created_at.desc())
         )
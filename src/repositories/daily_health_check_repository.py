@@ -175,6 +175,19 @@ class DailyHealthCheckRepository(PostgresRepository[DailyHealCheckModel]):
                 daily_query = daily_query.where(
                     DailyHealCheckModel.date_create <= query_params.end_date
                 )
+            if query_params.pagination == "cursor":
+                items, next_cursor = await self._paginate_keyset(
+                    daily_query,
+                    DailyHealCheckModel.id,
+                    query_params.page_size,
+                    query_params.cursor,
+                    descending=False,
+                )
+                return {
+                    "items": DailyHealCheckModel.serialize_many(items),
+                    "next_cursor": next_cursor,
+                    "page_size": query_params.page_size,
+                }
             total_count_query = select(func.count()).select_from(daily_query)
 
             # pagination
@@ -189,7 +202,7 @@ class DailyHealthCheckRepository(PostgresRepository[DailyHealCheckModel]):
                 result_total_count_query.scalar_one() + query_params.page_size - 1
             ) // query_params.page_size
             return {
-                "items": [item.as_dict for item in data_result_patient_query],
+                "items": DailyHealCheckModel.serialize_many(data_result_patient_query),
                 "current_page": query_params.current_page,
                 "page_size": query_params.page_size,
                 "total_pages": total_pages,
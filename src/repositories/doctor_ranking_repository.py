@@ -0,0 +1,55 @@
+import logging
+import time
+
+from sqlalchemy import text
+
+from src.config import config
+from src.core.database.postgresql.session import engines
+from src.repositories.global_helper_repository import (
+    mark_doctor_ranking_stale,
+    take_doctor_ranking_stale,
+)
+
+# pg advisory lock id, only one worker refreshes the view at a time
+DOCTOR_RANKING_LOCK_ID = 815001
+
+_last_refresh_at: float = 0.0
+
+
+async def refresh_doctor_ranking() -> bool:
+    """refresh the doctor_ranking view on the writer, readers keep reading the old rows meanwhile
+
+    Returns:
+        bool: False when another worker is already refreshing it
+    """
+    async with engines["writer"].begin() as connection:
+        locked = await connection.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+            {"lock_id": DOCTOR_RANKING_LOCK_ID},
+        )
+        if not locked.scalar_one():
+            return False
+        await connection.execute(
+            text("REFRESH MATERIALIZED VIEW CONCURRENTLY doctor_ranking")
+        )
+    return True
+
+
+async def refresh_doctor_ranking_job() -> None:
+    """refresh the view when a write marked it stale, or when it is too old
+    (the free work schedule window moves with the clock)"""
+    global _last_refresh_at
+    stale = await take_doctor_ranking_stale()
+    expired = time.monotonic() - _last_refresh_at >= config.DOCTOR_RANKING_MAX_AGE_SECONDS
+    if not stale and not expired:
+        return
+    try:
+        refreshed = await refresh_doctor_ranking()
+    except Exception as e:
+        logging.error(f"Error in refresh_doctor_ranking: {e}")
+        refreshed = False
+    if refreshed:
+        _last_refresh_at = time.monotonic()
+    elif stale:
+        # keep the flag for the next run
+        await mark_doctor_ranking_stale()
@@ -4,25 +4,31 @@ from datetime import date, datetime, time, timedelta
 from typing import Any, Dict, List, Literal, Optional, Tuple
 
 from sqlalchemy import (
+    Date,
+    Integer,
     Result,
     Row,
+    String,
+    Time,
+    all_,
     and_,
     asc,
     case,
+    cast,
     delete,
     desc,
     exists,
     func,
-    not_,
     or_,
     select,
     update,
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import joinedload
 from starlette.background import BackgroundTask
 
-from src.core.database.postgresql import PostgresRepository
+from src.core.database.postgresql import PostgresRepository, Projection
 from src.core.decorator.exception_decorator import catch_error_repository
 from src.core.exception import BadRequest, InternalServer
 from src.core.security.password import PasswordHandler
@@ -34,21 +40,65 @@ from src.helper.email_helper import (
 )
 from src.models.appointment_model import AppointmentModel
 from src.models.doctor_model import DoctorExaminationPriceModel, DoctorModel
+from src.models.doctor_ranking_model import doctor_ranking
 from src.models.patient_model import PatientModel
 from src.models.rating_model import RatingModel
 from src.models.staff_model import StaffModel
+from src.models.statistics_rollup_model import WorkScheduleDailyStatModel
 from src.models.user_model import Role, UserModel
 from src.models.work_schedule_model import WorkScheduleModel
-from src.repositories.global_func import destruct_where, process_orderby
-from src.repositories.global_helper_repository import redis_working
+from src.repositories.global_func import (
+    destruct_where,
+    destruct_where_compiled,
+    process_orderby,
+)
+from src.repositories.global_helper_repository import (
+    get_reserved_work_schedule_ids,
+    mark_doctor_ranking_stale,
+    mark_statistics_dirty,
+)
 from src.schema.doctor_schema import RequestDoctorWorkScheduleNextWeek
 
+DOCTOR_COMMENT_PROJECTION = Projection(
+    RatingModel,
+    related={"patient": ("id", "avatar", "first_name", "last_name")},
+)
+DOCTOR_PATIENT_APPOINTMENT_PROJECTION = Projection(
+    AppointmentModel,
+    related={
+        "patient": None,
+        "work_schedule": (
+            "work_date",
+            "start_time",
+            "end_time",
+            "examination_type",
+            "medical_examination_fee",
+        ),
+    },
+)
+
+# columns a doctor list can be paged by with a cursor
+DOCTOR_CURSOR_SORT_COLUMNS = (
+    "id",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "date_of_birth",
+    "gender",
+    "specialization",
+    "verify_status",
+    "type_of_disease",
+    "address",
+    "license_number",
+    "created_at",
+)
+
 
 class DoctorRepository(PostgresRepository[DoctorModel]):
 
 
     @catch_error_repository(None)
-    async def get_all_doctor_repository(self,current_page: int =1 ,page_size: int = 10,text_search: str | None = None,filter_data: dict[str, Any]={},order_by:str | None = None,is_desc:bool = False):
+    async def get_all_doctor_repository(self,current_page: int =1 ,page_size: int = 10,text_search: str | None = None,filter_data: dict[str, Any]={},order_by:str | None = None,is_desc:bool = False,pagination: str = "offset",cursor: str | None = None):
         conditions = [getattr(DoctorModel, key) == value for key, value in filter_data.items()]
         _select = select(DoctorModel).filter(*conditions)
         _select_count = select(func.count(DoctorModel.id)).filter(*conditions)
@@ -70,6 +120,17 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
                 )
             )
 
+        if pagination == "cursor":
+            _sort_column = self._keyset_sort_column(order_by, DOCTOR_CURSOR_SORT_COLUMNS)
+            _doctors_data, _next_cursor = await self._paginate_keyset(
+                _select, _sort_column, page_size, cursor, descending=order_by is not None and is_desc
+            )
+            return {
+                "data": DoctorModel.serialize_many(_doctors_data),
+                "next_cursor": _next_cursor,
+                "page_size": page_size,
+            }
+
         _result_total_doctor = await self.session.execute(_select_count)
         _total_doctor = _result_total_doctor.scalar_one_or_none() or 0
         # skip data
@@ -87,7 +148,7 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
         _result_doctor_data = await self.session.execute(_select)
         _doctors_data = _result_doctor_data.unique().scalars().all()
         return {
-            "data": [ _doctor.as_dict for _doctor in _doctors_data],
+            "data": DoctorModel.serialize_many(_doctors_data),
             "total_page": math.ceil(_total_doctor / page_size),
             "current_page":current_page,
             "page_size": page_size,
@@ -107,124 +168,42 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
         **kwargs: Any,
     ):
         try:
-            condition = destruct_where(self.model_class, where or {})
-            # subquery to get avg_rating and rating_count
-            subquery = (
-                select(
-                    RatingModel.doctor_id,
-                    func.avg(RatingModel.rating).label("avg_rating"),
-                    func.count(RatingModel.id).label("rating_count"),
-                )
-                .group_by(RatingModel.doctor_id)
-                .subquery()
-            )
-            # subquery to get latest examination price
-            latest_price_subquery = (
-                select(
-                    DoctorExaminationPriceModel.id,
-                    DoctorExaminationPriceModel.doctor_id,
-                    DoctorExaminationPriceModel.online_price,
-                    DoctorExaminationPriceModel.offline_price,
-                    DoctorExaminationPriceModel.created_at,
-                )
-                .distinct(DoctorExaminationPriceModel.doctor_id)
-                .order_by(
-                    DoctorExaminationPriceModel.doctor_id,
-                    desc(DoctorExaminationPriceModel.created_at),
-                )
-                .subquery()
-            )
-
-            current_date = datetime.now().date()
-            current_time = datetime.now().time()
-            start_date = current_date
-            end_date = start_date + timedelta(days=(6 - start_date.weekday()))
-            # if current_date.weekday() < 1:
-            #     start_date = current_date + \
-            #         timedelta(days=(1 - current_date.weekday()) % 7)
-            # end_date = start_date + \
-            #     timedelta(days=(6 - start_date.weekday()) % 7)
-            # key in redis
-            ids: list[int]= []
-            key: List[str] = await redis_working.get_all_keys()
-            if key:
-                ids = [int(k) for k in key if k.isdigit()]
-            work_schedule_subquery = (
-                select(
-                    WorkScheduleModel.doctor_id,
-                    func.json_agg(
-                        func.json_build_object(
-                            "id",
-                            WorkScheduleModel.id,
-                            "work_date",
-                            WorkScheduleModel.work_date,
-                            "start_time",
-                            WorkScheduleModel.start_time,
-                            "end_time",
-                            WorkScheduleModel.end_time,
-                            "examination_type",
-                            WorkScheduleModel.examination_type,
-                            "medical_examination_fee",
-                            WorkScheduleModel.medical_examination_fee,
-                            "ordered",
-                            WorkScheduleModel.ordered,
-                        )
-                    ).label("work_schedules"),
-                )
-                .where(
-                    WorkScheduleModel.id.notin_(ids),
-                    WorkScheduleModel.ordered == False,
-                    WorkScheduleModel.work_date.between(start_date, end_date),
-                    # FIXME for redis
-                    # WorkScheduleModel.id.not_in(ids),
-                    # FIXMEL: if tesst post men comemnt this code to test
-                    not_(
-                        and_(
-                            WorkScheduleModel.work_date == current_date,
-                            WorkScheduleModel.start_time < current_time,
-                        )
-                    ),
-                )
-                .group_by(WorkScheduleModel.doctor_id)
-                .subquery()
-            )
+            condition, params = destruct_where_compiled(self.model_class, where or {})
+            # avg_rating, rating_count, latest price and free work schedules are read
+            # from the doctor_ranking materialized view instead of being aggregated here
+            ranking = doctor_ranking
             query = (
                 select(
                     self.model_class,
-                    case(
-                        (subquery.c.avg_rating != None, subquery.c.avg_rating),
-                        else_=0.0,
-                    ).label("avg_rating"),
-                    case(
-                        (subquery.c.rating_count != None, subquery.c.rating_count),
-                        else_=0,
-                    ).label("rating_count"),
-                    latest_price_subquery,
-                    work_schedule_subquery.c.work_schedules,
-                )
-                .outerjoin(subquery, self.model_class.id == subquery.c.doctor_id)
-                .outerjoin(
-                    latest_price_subquery,
-                    self.model_class.id == latest_price_subquery.c.doctor_id,
-                )
-                .outerjoin(
-                    work_schedule_subquery,
-                    self.model_class.id == work_schedule_subquery.c.doctor_id,
+                    ranking.c.avg_rating,
+                    ranking.c.rating_count,
+                    ranking.c.price_id,
+                    ranking.c.online_price,
+                    ranking.c.offline_price,
+                    ranking.c.price_created_at,
+                    ranking.c.work_schedules,
                 )
+                .select_from(ranking)
+                .join(self.model_class, self.model_class.id == ranking.c.doctor_id)
             )
-
+            query_count = (
+                select(func.count())
+                .select_from(ranking)
+                .join(self.model_class, self.model_class.id == ranking.c.doctor_id)
+            )
+            conditions = []
             if condition is not None:
-                query = query.where(condition)
+                conditions.append(condition)
 
             if min_avg_rating is not None:
-                query = query.where(subquery.c.avg_rating >= min_avg_rating)
+                conditions.append(ranking.c.avg_rating >= min_avg_rating)
 
             if min_rating_count is not None:
-                query = query.where(subquery.c.rating_count >= min_rating_count)
+                conditions.append(ranking.c.rating_count >= min_rating_count)
 
             if kwargs.get("text_search") is not None:
                 text_search = kwargs.get("text_search","").strip().lower()
-                query = query.where(
+                conditions.append(
                     or_(
                         (
                             self.model_class.last_name
@@ -236,18 +215,30 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
                         self.model_class.license_number.ilike(f"%{text_search}%"),
                     )
                 )
-            where_conditions = query._where_criteria #type: ignore
-            query_funccount = select(func.count(self.model_class.id)).where(
-                *where_conditions
+            query = query.where(*conditions)
+            result_count = await self.session.execute(
+                query_count.where(*conditions), params
             )
-            result_count = await self.session.execute(query_funccount)
             total_pages = math.ceil(result_count.scalar_one() / limit)
             current_page: int = skip // limit + 1
-            query = query.offset(skip).limit(limit)
 
-            query = query.order_by(desc("avg_rating"), desc("rating_count"))
-            result = await self.session.execute(query)
+            # same order as idx_doctor_ranking_rank
+            query = query.order_by(
+                desc(ranking.c.avg_rating),
+                desc(ranking.c.rating_count),
+                ranking.c.doctor_id,
+            ).offset(skip).limit(limit)
+            result = await self.session.execute(query, params)
             doctors = result.all()
+
+            # the view is refreshed in the background, the parts of the free schedules
+            # that change with the clock or with a reservation are filtered here
+            now = datetime.now()
+            current_date = now.date()
+            current_time = now.time()
+            end_date = current_date + timedelta(days=(6 - current_date.weekday()))
+            # work schedules waiting for payment
+            reserved_ids = set(await get_reserved_work_schedule_ids())
             _doctors = [
                 {
                     **doctor[0].as_dict,
@@ -256,14 +247,16 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
                     "latest_examination_price": (
                         {
                             "id": doctor[3],
-                            "online_price": doctor[5],
-                            "offline_price": doctor[6],
-                            "created_at": doctor[7],
+                            "online_price": doctor[4],
+                            "offline_price": doctor[5],
+                            "created_at": doctor[6],
                         }
                         if doctor[3]
                         else None
                     ),
-                    "work_schedules": doctor[8] if doctor[8] else [],
+                    "work_schedules": self._free_work_schedules(
+                        doctor[7], reserved_ids, current_date, current_time, end_date
+                    ),
                 }
                 for doctor in doctors
             ]
@@ -278,6 +271,30 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
             logging.error(f"Error in get_all: {e}")
             raise
 
+    @staticmethod
+    def _free_work_schedules(
+        work_schedules: list[dict[str, Any]] | None,
+        reserved_ids: set[int],
+        current_date: date,
+        current_time: time,
+        end_date: date,
+    ) -> list[dict[str, Any]]:
+        """keep the schedules of the current week that are not reserved and not started yet"""
+        items = []
+        for work_schedule in work_schedules or []:
+            work_date = date.fromisoformat(work_schedule["work_date"])
+            if work_date < current_date or work_date > end_date:
+                continue
+            if work_schedule["id"] in reserved_ids:
+                continue
+            if (
+                work_date == current_date
+                and time.fromisoformat(work_schedule["start_time"]) < current_time
+            ):
+                continue
+            items.append(work_schedule)
+        return items
+
     async def get_one(self, where: Dict[str, Any], join_: Optional[set[str]] = None):
         try:
             condition = destruct_where(self.model_class, where)
@@ -305,6 +322,7 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
         examination_price = self._create_examination_price(data, doctor_model.id)
         self.session.add(examination_price)
         await self.session.commit()
+        await mark_doctor_ranking_stale()
 
         task = None
         if data["is_local_person"]:
@@ -386,11 +404,11 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
 
     async def count_record(self, where: Optional[Dict[str, Any]] = None):
         try:
-            where_condition = destruct_where(self.model_class, where or {})
+            where_condition, params = destruct_where_compiled(self.model_class, where or {})
             query = select(self.model_class)
             if where_condition is not None:
                 query = query.where(where_condition)
-            return await self._count(query)
+            return await self._count(query, params)
         except SQLAlchemyError as e:
             logging.error(f"Error in count_record: {e}")
             raise
@@ -475,15 +493,24 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
         }
 
     @catch_error_repository(None)
-    async def get_doctor_with_ratings(self, doctor_id: int) -> Optional[Dict[str, Any]]:
+    async def get_doctor_with_ratings(
+        self,
+        doctor_id: int,
+        comment_page_size: int = 10,
+        comment_cursor: str | None = None,
+    ) -> Optional[Dict[str, Any]]:
+        """doctor detail with the rating totals and one page of comments
+
+        Args:
+            doctor_id (int): id of doctor
+            comment_page_size (int): number of comments returned, newest first
+            comment_cursor (str | None): comments_next_cursor of the previous page
+
+        Returns:
+            Optional[Dict[str, Any]]: None when the doctor does not exist or is not verified
+        """
         query = (
-            select(
-                self.model_class,
-                func.avg(RatingModel.rating).label("avg_rating"),
-                func.array_agg(RatingModel.comment).label("comments"),
-                DoctorExaminationPriceModel,
-            )
-            .outerjoin(RatingModel)
+            select(self.model_class, DoctorExaminationPriceModel)
             .outerjoin(DoctorExaminationPriceModel)
             .where(
                 and_(
@@ -491,44 +518,28 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
                     self.model_class.verify_status != 0,
                 )
             )
-            .group_by(self.model_class.id, DoctorExaminationPriceModel.id)
             .order_by(desc(DoctorExaminationPriceModel.id))
             .limit(1)
         )
 
-        result: Result[Tuple[DoctorModel, Any, Any, DoctorExaminationPriceModel]] = (
+        result: Result[Tuple[DoctorModel, DoctorExaminationPriceModel]] = (
             await self.session.execute(query)
         )
-        row: Row[Tuple[DoctorModel, Any, Any, DoctorExaminationPriceModel]] | None = (
+        row: Row[Tuple[DoctorModel, DoctorExaminationPriceModel]] | None = (
             result.first()
         )
 
         if row is None:
             return None
 
-        doctor, avg_rating, comments, latest_price = row
+        doctor, latest_price = row
         doctor_dict = doctor.as_dict
-        doctor_dict["avg_rating"] = float(avg_rating) if avg_rating is not None else 0
-        query_rating_model = (
-            select(RatingModel)
-            .where(RatingModel.doctor_id == doctor_id)
-            .options(joinedload(RatingModel.patient))
+        doctor_dict["avg_rating"] = doctor.avg_rating
+        comments, next_cursor = await self._get_doctor_comments(
+            doctor_id, comment_page_size, comment_cursor
         )
-        result_rating = await self.session.execute(query_rating_model)
-        rating_model = result_rating.scalars().all()
-        doctor_dict["comments"] = [
-            {
-                **comment.as_dict,
-                "user": {
-                    "id": comment.patient.id,
-                    "avatar": comment.patient.avatar,
-                    "first_name": comment.patient.first_name,
-                    "last_name": comment.patient.last_name,
-                },
-            }
-            for comment in rating_model
-            if comment is not None
-        ]
+        doctor_dict["comments"] = comments
+        doctor_dict["comments_next_cursor"] = next_cursor
 
         if latest_price:
             doctor_dict["latest_examination_price"] = {
@@ -542,14 +553,37 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
 
         return doctor_dict
 
+    async def _get_doctor_comments(
+        self, doctor_id: int, page_size: int, cursor: str | None
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """one page of ratings of the doctor with the patient, newest first (ix_rating_doctor_id_id)"""
+        query = DOCTOR_COMMENT_PROJECTION.select().where(RatingModel.doctor_id == doctor_id)
+        if cursor:
+            _, last_id = self._decode_cursor(cursor, RatingModel.id)
+            query = query.where(RatingModel.id < last_id)
+        query = query.order_by(desc(RatingModel.id)).limit(page_size + 1)
+        comments = await self._fetch_projection(DOCTOR_COMMENT_PROJECTION, query)
+        next_cursor = None
+        if len(comments) > page_size:
+            comments = comments[:page_size]
+            next_cursor = self._encode_cursor(comments[-1]["id"], comments[-1]["id"])
+        for comment in comments:
+            comment["user"] = comment.pop("patient")
+        return comments, next_cursor
+
     async def add_workingschedule(
         self, doctor_id: int, data: RequestDoctorWorkScheduleNextWeek
     ) -> Dict[str, Any]:
         try:
-            doctor_check = select(DoctorModel).where(DoctorModel.id == doctor_id)
+            # examination prices are needed by the fee hook of WorkScheduleModel
+            doctor_check = (
+                select(DoctorModel)
+                .where(DoctorModel.id == doctor_id)
+                .options(joinedload(DoctorModel.examination_prices))
+            )
 
             data_check = await self.session.execute(doctor_check)
-            data_check_model = data_check.scalar_one_or_none()
+            data_check_model = data_check.unique().scalar_one_or_none()
             if data_check_model is None:
                 raise BadRequest(
                     error_code=ErrorCode.DOCTOR_NOT_FOUND.name,
@@ -610,67 +644,35 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
                         },
                     )
 
-            new_schedules = []
-            conflicts = []
-            for daily_schedule in data.work_schedule:
-                for time_slot in daily_schedule.time_slots:
-                    existing_schedules = await self.session.execute(
-                        select(WorkScheduleModel)
-                        .where(
-                            and_(
-                                WorkScheduleModel.doctor_id == doctor_id,
-                                WorkScheduleModel.work_date == daily_schedule.work_date,
-                                WorkScheduleModel.examination_type
-                                == data.examination_type,
-                            )
-                        )
-                        .options(
-                            joinedload(WorkScheduleModel.appointment),
-                        )
-                    )
-                    existing_schedules = existing_schedules.scalars().all()
-
-                    for existing_schedule in existing_schedules:
-                        # if existing_schedule.appointment:
-                        #     raise BadRequest(
-                        #         error_code=ErrorCode.SCHEDULE_CONFLICT.name,
-                        #         errors={
-                        #             "message": ErrorCode.msg_conflict_working_schedule_with_appointment.value,
-                        #             "conflicts": [
-                        #                 {
-                        #                     "work_date": existing_schedule.work_date.isoformat(),
-                        #                     "start_time": existing_schedule.start_time.isoformat(),
-                        #                     "end_time": existing_schedule.end_time.isoformat(),
-                        #                     "examination_type": existing_schedule.examination_type,
-                        #                 }
-                        #             ],
-                        #             "appointment_ids": existing_schedule.appointment.as_dict,
-                        #         },
-                        #     )
-                        if not existing_schedule.ordered:
-                            await self.session.delete(existing_schedule)
-
-                    query_doctor_model = (
-                        select(DoctorModel)
-                        .where(DoctorModel.id == doctor_id)
-                        .options(joinedload(DoctorModel.examination_prices))
-                    )
-                    doctor_model = await self.session.execute(query_doctor_model)
-                    doctor_model = doctor_model.unique().scalar_one_or_none()
-                    if doctor_model is None:
-                        raise BadRequest(
-                            error_code=ErrorCode.DOCTOR_NOT_FOUND.name,
-                            msg="Doctor not found",
-                        )
-                    new_schedule = WorkScheduleModel(
-                        doctor_id=doctor_id,
-                        work_date=daily_schedule.work_date,
-                        start_time=time_slot.start_time,
-                        end_time=time_slot.end_time,
-                        examination_type=data.examination_type,
-                        doctor=doctor_model,
+            # days that still have slots to publish, the free slots of those days are replaced
+            work_dates = {
+                daily_schedule.work_date
+                for daily_schedule in data.work_schedule
+                if daily_schedule.time_slots
+            }
+            new_schedules = [
+                WorkScheduleModel(
+                    doctor_id=doctor_id,
+                    work_date=daily_schedule.work_date,
+                    start_time=time_slot.start_time,
+                    end_time=time_slot.end_time,
+                    examination_type=data.examination_type,
+                    doctor=data_check_model,
+                )
+                for daily_schedule in data.work_schedule
+                for time_slot in daily_schedule.time_slots
+            ]
+            if work_dates:
+                await self.session.execute(
+                    delete(WorkScheduleModel)
+                    .where(
+                        WorkScheduleModel.doctor_id == doctor_id,
+                        WorkScheduleModel.work_date.in_(work_dates),
+                        WorkScheduleModel.examination_type == data.examination_type,
+                        WorkScheduleModel.ordered == False,
                     )
-                    new_schedules.append(new_schedule)
+                    .execution_options(synchronize_session=False)
+                )
 
             conflicts = await self._check_schedule_conflicts(doctor_id, new_schedules)
 
@@ -682,8 +684,13 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
                         "conflicts": conflicts,
                     },
                 )
+            # one INSERT for all rows (insertmanyvalues)
             self.session.add_all(new_schedules)
             await self.session.commit()
+            await mark_doctor_ranking_stale()
+            await mark_statistics_dirty(
+                work_dates=[daily_schedule.work_date for daily_schedule in data.work_schedule]
+            )
             return {"message": MsgEnumBase.MSG_CREATE_WORK_SCHEDULE_SUCCESSFULLY.value}
         except BadRequest as e:
             logging.error("Error in add_workingschedule: %s", e)
@@ -700,40 +707,62 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
     async def _check_schedule_conflicts(
         self, doctor_id: int, new_schedules: List[WorkScheduleModel]
     ) -> List[Dict[str, Any]]:
-        conflicts = []
-        for schedule in new_schedules:
-            query = select(WorkScheduleModel).where(
+        """find the existing schedules of another examination type overlapping the new ones
+
+        All proposed slots are sent as arrays and unnested, so the check is a single query
+        whatever the number of slots.
+
+        Args:
+            doctor_id (int): id of doctor
+            new_schedules (List[WorkScheduleModel]): the schedules about to be inserted
+
+        Returns:
+            List[Dict[str, Any]]: the conflicting schedules, empty if none
+        """
+        if not new_schedules:
+            return []
+        proposed = (
+            func.unnest(
+                cast([s.work_date for s in new_schedules], ARRAY(Date)),
+                cast([s.start_time for s in new_schedules], ARRAY(Time)),
+                cast([s.end_time for s in new_schedules], ARRAY(Time)),
+                cast([s.examination_type for s in new_schedules], ARRAY(String)),
+            )
+            .table_valued("work_date", "start_time", "end_time", "examination_type")
+            .render_derived(name="proposed")
+        )
+        query = (
+            select(WorkScheduleModel)
+            .join(
+                proposed,
                 and_(
-                    WorkScheduleModel.doctor_id == doctor_id,
-                    WorkScheduleModel.work_date == schedule.work_date,
-                    WorkScheduleModel.examination_type != schedule.examination_type,
+                    WorkScheduleModel.work_date == proposed.c.work_date,
+                    WorkScheduleModel.examination_type != proposed.c.examination_type,
                     or_(
                         and_(
-                            WorkScheduleModel.start_time <= schedule.start_time,
-                            WorkScheduleModel.end_time > schedule.start_time,
+                            WorkScheduleModel.start_time <= proposed.c.start_time,
+                            WorkScheduleModel.end_time > proposed.c.start_time,
                         ),
                         and_(
-                            WorkScheduleModel.start_time < schedule.end_time,
-                            WorkScheduleModel.end_time >= schedule.end_time,
+                            WorkScheduleModel.start_time < proposed.c.end_time,
+                            WorkScheduleModel.end_time >= proposed.c.end_time,
                         ),
                     ),
-                )
+                ),
             )
-            result = await self.session.execute(query)
-            conflicting_schedules = result.scalars().all()
-            if conflicting_schedules:
-                conflicts.extend(
-                    [
-                        {
-                            "work_date": cs.work_date.isoformat(),
-                            "start_time": cs.start_time.isoformat(),
-                            "end_time": cs.end_time.isoformat(),
-                            "examination_type": cs.examination_type,
-                        }
-                        for cs in conflicting_schedules
-                    ]
-                )
-        return conflicts
+            .where(WorkScheduleModel.doctor_id == doctor_id)
+            .distinct()
+        )
+        result = await self.session.execute(query)
+        return [
+            {
+                "work_date": cs.work_date.isoformat(),
+                "start_time": cs.start_time.isoformat(),
+                "end_time": cs.end_time.isoformat(),
+                "examination_type": cs.examination_type,
+            }
+            for cs in result.scalars().all()
+        ]
 
     async def get_working_schedules_by_id(self, *, id: int):
 
@@ -770,11 +799,9 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
         try:
             query = select(WorkScheduleModel)
             conditions = []
-            key: List[str] = await redis_working.get_all_keys()
-            if key:
-                for k in key:
-                    if k.isdigit():
-                        conditions.append(WorkScheduleModel.id != int(k))
+            ids: list[int] = await get_reserved_work_schedule_ids()
+            if ids:
+                conditions.append(WorkScheduleModel.id != all_(cast(ids, ARRAY(Integer))))
             if doctor_id is not None:
                 conditions.append(WorkScheduleModel.doctor_id == doctor_id)
             if start_date is not None and end_date is not None:
@@ -796,7 +823,7 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
 
             result = await self.session.execute(query)
             schedules = result.scalars().all()
-            return [schedule.as_dict for schedule in schedules]
+            return WorkScheduleModel.serialize_many(schedules)
         except SQLAlchemyError as e:
             logging.error(f"Error in get_working_schedules: {e}")
             raise
@@ -858,68 +885,59 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
             _examination_type = (
                 [examination_type] if examination_type else ["offline", "online"]
             )
-            _select_appointment = (
-                select(AppointmentModel)
-                .join(WorkScheduleModel)
-                .where(
-                    AppointmentModel.doctor_id == doctor_id,
-                    WorkScheduleModel.examination_type.in_(_examination_type),
-                )
-            )
+            projection = DOCTOR_PATIENT_APPOINTMENT_PROJECTION
+            # the projection joins work_schedule through its own alias
+            work_schedule = projection.entity("work_schedule")
+            _filters = [
+                AppointmentModel.doctor_id == doctor_id,
+                work_schedule.examination_type.in_(_examination_type),
+            ]
             if status_order:
-                _select_appointment = _select_appointment.where(
-                    AppointmentModel.appointment_status.in_(status_order)
-                )
-            _select_appointment=_select_appointment.options(
-                joinedload(AppointmentModel.patient),
+                _filters.append(AppointmentModel.appointment_status.in_(status_order))
+            _count_appointment = (
+                select(AppointmentModel.id)
+                .join(AppointmentModel.work_schedule.of_type(work_schedule))
+                .where(*_filters)
             )
-            result = await self.session.execute(_select_appointment)
+            total = await self._count(_count_appointment)
 
-            appointment_list = result.unique().scalars().all()
             now = datetime.now()
-
-            def time_to_seconds(t: time) -> int:
-                """Chuyển đổi thời gian thành số giây kể từ đầu ngày."""
-                return t.hour * 3600 + t.minute * 60 + t.second
-
-            sorted_appointments: list[AppointmentModel] = sorted(
-                appointment_list,
-                key=lambda a: (
-                    (
-                        status_order.index(a.appointment_status)
-                        if a.appointment_status in status_order
-                        else len(status_order)
-                    ),
-                    abs((a.work_schedule.work_date - now.date()).days),
-                    abs(
-                        time_to_seconds(a.work_schedule.start_time)
-                        - time_to_seconds(now.time())
-                    ),
-                ),
+            # status in the order given, then the closest day and start time to now
+            _order_by = []
+            if status_order:
+                _order_by.append(
+                    case(
+                        {status: index for index, status in enumerate(status_order)},
+                        value=AppointmentModel.appointment_status,
+                        else_=len(status_order),
+                    )
+                )
+            _seconds_now = now.hour * 3600 + now.minute * 60 + now.second
+            _order_by += [
+                func.abs(work_schedule.work_date - cast(now.date(), Date)),
+                func.abs(func.extract("epoch", work_schedule.start_time) - _seconds_now),
+                AppointmentModel.id,
+            ]
+            _select_appointment = (
+                projection.select()
+                .where(*_filters)
+                .order_by(*_order_by)
+                .offset((current_page - 1) * page_size)
+                .limit(page_size)
             )
-            start_index = math.ceil((current_page - 1) * page_size)
-            end_index = start_index + page_size +1
-            # paging
-            sorted_appointments_limit = sorted_appointments[start_index:end_index]
             # destruct object
             custom_data_reponse = []
-            for appointments in sorted_appointments_limit:
-                # if  examination_type and appointments.work_schedule.examination_type != examination_type:
-                #     continue
-                item = {}
-                item["patient"] = appointments.patient.as_dict
-                item["work_schedule"] = {
-                    "work_date": appointments.work_schedule.work_date.isoformat(),
-                    "start_time": appointments.work_schedule.start_time.isoformat(),
-                    "end_time": appointments.work_schedule.end_time.isoformat(),
-                    "examination_type": appointments.work_schedule.examination_type,
-                    "medical_examination_fee": appointments.work_schedule.medical_examination_fee,
-                }
-                item["appointment"] = appointments.as_dict
-                custom_data_reponse.append(item)
+            for item in await self._fetch_projection(projection, _select_appointment):
+                custom_data_reponse.append(
+                    {
+                        "patient": item.pop("patient"),
+                        "work_schedule": item.pop("work_schedule"),
+                        "appointment": item,
+                    }
+                )
             return {
                 "items": custom_data_reponse,
-                "total_page": math.ceil(len(sorted_appointments) / page_size),
+                "total_page": math.ceil(total / page_size),
                 "current_page": current_page,
                 "page_size": page_size,
             }
@@ -973,6 +991,7 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
         if examination_price:
             self.session.add(examination_price)
         await self.session.commit()
+        await mark_doctor_ranking_stale()
         return doctor_model
 
     @catch_error_repository(None)
@@ -1000,6 +1019,7 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
                 errors={"message": ErrorCode.msg_doctor_not_found_or_reject.value},
             )
         await self.session.commit()
+        await mark_doctor_ranking_stale()
 
         return {"message": MsgEnumBase.REJECT_DOCTOR_SUCCESSFULLY.value}, task
 
@@ -1011,19 +1031,33 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
         doctor_id: int | None,
         examination_type: Literal["online", "offline"] | None
     ):
-        # Khởi tạo truy vấn cơ bản
-        query_work_schedule = select(WorkScheduleModel)
+        stat = WorkScheduleDailyStatModel
+        total = func.sum(stat.schedule_count).label("total")
+        ordered = func.sum(stat.ordered_count).label("ordered")
+        query_work_schedule = (
+            select(
+                stat.doctor_id,
+                DoctorModel.avatar,
+                DoctorModel.first_name,
+                DoctorModel.last_name,
+                total,
+                ordered,
+            )
+            .join(DoctorModel, DoctorModel.id == stat.doctor_id)
+            .group_by(stat.doctor_id, DoctorModel.id)
+            .order_by(stat.doctor_id)
+        )
         if from_date:
-            query_work_schedule = query_work_schedule.where(WorkScheduleModel.work_date >= from_date)
+            query_work_schedule = query_work_schedule.where(stat.work_date >= from_date)
         if to_date:
-            query_work_schedule = query_work_schedule.where(WorkScheduleModel.work_date <= to_date)
+            query_work_schedule = query_work_schedule.where(stat.work_date <= to_date)
         if doctor_id:
-            query_work_schedule = query_work_schedule.where(WorkScheduleModel.doctor_id == doctor_id)
+            query_work_schedule = query_work_schedule.where(stat.doctor_id == doctor_id)
         if examination_type:
-            query_work_schedule = query_work_schedule.where(WorkScheduleModel.examination_type == examination_type)
+            query_work_schedule = query_work_schedule.where(stat.examination_type == examination_type)
 
         result_work_schedule = await self.session.execute(query_work_schedule)
-        work_schedules = result_work_schedule.unique().scalars().all()
+        rows = result_work_schedule.all()
 
         response = {
             "percentage": 0.0,
@@ -1033,42 +1067,25 @@ class DoctorRepository(PostgresRepository[DoctorModel]):
             "doctors": []
         }
 
-        if not work_schedules:
+        if not rows:
             return response
 
-        response["total"] = len(work_schedules)
-        doctor_stats = {}
-
-        for work_schedule in work_schedules:
-            if work_schedule.ordered:
-                response["ordered"] += 1
-            else:
-                response["not_ordered"] += 1
-            doctor_id = work_schedule.doctor_id
-            if doctor_id not in doctor_stats:
-                doctor_model = work_schedule.doctor
-                doctor_stats[doctor_id] = {
-
-                    "doctor_id": doctor_id,
-                    "avatar": doctor_model.avatar,
-                    "first_name": doctor_model.first_name,
-                    "last_name": doctor_model.last_name,
-                    "total": 0,
-                    "ordered": 0,
-                    "not_ordered": 0,
-                    "percentage": 0.0
+        for row in rows:
+            response["total"] += row.total
+            response["ordered"] += row.ordered
+            response["doctors"].append(
+                {
+                    "doctor_id": row.doctor_id,
+                    "avatar": row.avatar,
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "total": row.total,
+                    "ordered": row.ordered,
+                    "not_ordered": row.total - row.ordered,
+                    "percentage": (row.ordered / row.total) * 100 if row.total else 0.0,
                 }
-
-            doctor_stats[doctor_id]["total"] += 1
-            if work_schedule.ordered:
-                doctor_stats[doctor_id]["ordered"] += 1
-            else:
-                doctor_stats[doctor_id]["not_ordered"] += 1
-
-        response["percentage"] = (response["ordered"] / response["total"]) * 100
-
-        for doctor in doctor_stats.values():
-            if doctor["total"] > 0:
-                doctor["percentage"] = (doctor["ordered"] / doctor["total"]) * 100
-            response["doctors"].append(doctor)
+            )
+        response["not_ordered"] = response["total"] - response["ordered"]
+        if response["total"]:
+            response["percentage"] = (response["ordered"] / response["total"]) * 100
         return response
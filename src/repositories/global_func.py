@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
-from typing import Any, Dict, Union
+from typing import Any, Dict, Tuple, Union
 
 from sqlalchemy import and_, asc, desc, func, not_, or_, text
 from sqlalchemy.sql.expression import between
 
-from src.core.database.postgresql import Model
+from src.core.database.postgresql import Model, compile_where
 
 
 def destruct_where(model_class: Model, where: Dict[str, Any]) -> Union[Any, None]:
@@ -22,6 +22,24 @@ def destruct_where(model_class: Model, where: Dict[str, Any]) -> Union[Any, None
     return None
 
 
+def destruct_where_compiled(
+    model_class: Model, where: Dict[str, Any] | None
+) -> Tuple[Union[Any, None], Dict[str, Any]]:
+    """Same as destruct_where but the clause is cached by the filter shape
+
+    Args:
+        model_class (_type_): is has type of ModelType
+        where (dict): this is a dict: code like mongodb query
+
+    Returns:
+        _type_: (condition, params), params must be passed to session.execute
+    """
+    compiled = compile_where(model_class, where)
+    if compiled is None:
+        return destruct_where(model_class, where), {}
+    return compiled.clause, compiled.params
+
+
 def process_condition(model_class: Model, condition):
     """_summary_
 
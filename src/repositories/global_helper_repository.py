@@ -1,4 +1,94 @@
+import time
+from datetime import date
+from typing import Iterable
+
 from src.config import config
+from src.core.cache import Cache, CacheTag
 from src.core.cache.redis_backend import RedisBackend
 
 redis_working = RedisBackend(config.REDIS_URL_WORKING_TIME)
+
+# sorted set of the work schedules waiting for payment, score = expiry timestamp
+RESERVED_WORK_SCHEDULE_KEY = "reserved_work_schedule"
+
+
+async def reserve_work_schedule(work_schedule_id: int | str, ttl: int) -> None:
+    """add the work schedule to the reserved index until now + ttl seconds"""
+    now = time.time()
+    await redis_working.zadd(RESERVED_WORK_SCHEDULE_KEY, {str(work_schedule_id): now + ttl})
+    # expired reservations are trimmed on write, reads filter them by score
+    await redis_working.zremrangebyscore(RESERVED_WORK_SCHEDULE_KEY, "-inf", now)
+
+
+async def release_work_schedule(work_schedule_id: int | str) -> None:
+    await redis_working.zrem(RESERVED_WORK_SCHEDULE_KEY, str(work_schedule_id))
+
+
+async def get_reserved_work_schedule_ids() -> list[int]:
+    """ids of the work schedules reserved and not expired yet (one ZRANGEBYSCORE)"""
+    members = await redis_working.zrangebyscore(
+        RESERVED_WORK_SCHEDULE_KEY, time.time(), "+inf"
+    )
+    return [int(member) for member in members if member.isdigit()]
+
+
+# set by rating, price, schedule and doctor writes, consumed by the refresh_doctor_ranking job
+DOCTOR_RANKING_STALE_KEY = "doctor_ranking:stale"
+
+
+async def mark_doctor_ranking_stale() -> None:
+    await redis_working.redis.set(DOCTOR_RANKING_STALE_KEY, 1)
+
+
+async def take_doctor_ranking_stale() -> bool:
+    """True when the view was marked stale since the last call (the flag is cleared)"""
+    return bool(await redis_working.redis.delete(DOCTOR_RANKING_STALE_KEY))
+
+
+async def invalidate_statistical_price() -> None:
+    """drop the cached revenue statistics, called by the statistics rollup job when it
+    recomputed work schedule days"""
+    await Cache.remove_by_tag(CacheTag.GET_STATISTICAL_PRICE)
+
+
+# days whose statistics rollup rows must be recomputed, one set of iso dates per
+# axis of the rollup tables, consumed by the refresh_statistics_rollup job
+STATISTICS_DIRTY_KEYS = {
+    "work_dates": "statistics_rollup:dirty:work_date",
+    "created_dates": "statistics_rollup:dirty:created_date",
+    "payment_dates": "statistics_rollup:dirty:payment_date",
+}
+
+
+async def mark_statistics_dirty(
+    work_dates: Iterable[date] = (),
+    created_dates: Iterable[date] = (),
+    payment_dates: Iterable[date] = (),
+) -> None:
+    """
+    :param work_dates: work_date of the work schedules written (or of their appointment)
+    :param created_dates: days the written appointments were created on
+    :param payment_dates: days of the written payments
+    """
+    axes = {
+        "work_dates": work_dates,
+        "created_dates": created_dates,
+        "payment_dates": payment_dates,
+    }
+    for axis, days in axes.items():
+        members = {day.isoformat() for day in days if day is not None}
+        if members:
+            await redis_working.redis.sadd(STATISTICS_DIRTY_KEYS[axis], *members)
+
+
+async def take_statistics_dirty() -> dict[str, set[date]]:
+    """the dirty days of every axis, the sets are read and cleared in one MULTI"""
+    async with redis_working.redis.pipeline(transaction=True) as pipe:
+        for key in STATISTICS_DIRTY_KEYS.values():
+            pipe.smembers(key)
+            pipe.delete(key)
+        replies = await pipe.execute()
+    return {
+        axis: {date.fromisoformat(member.decode("utf-8")) for member in members}
+        for axis, members in zip(STATISTICS_DIRTY_KEYS, replies[::2])
+    }
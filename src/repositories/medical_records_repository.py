@@ -1,19 +1,33 @@
 import logging
 import math
+from datetime import datetime, timezone
 from typing import Any
 
 from sqlalchemy import and_, insert, select, update
 from sqlalchemy.orm import joinedload
 
-from src.core.database.postgresql import PostgresRepository
+from src.core.database.postgresql import PostgresRepository, Projection
 from src.core.exception import BadRequest, InternalServer
 from src.enum import ErrorCode, Role
 from src.helper.socket_api_helper import SocketServiceHelper
 from src.models.appointment_model import AppointmentModel, AppointmentModelStatus
 from src.models.medical_records_model import MedicalRecordModel
-from src.repositories.global_func import destruct_where, process_orderby
+from src.repositories.global_func import destruct_where_compiled, process_orderby
+from src.repositories.global_helper_repository import mark_statistics_dirty
 from src.repositories.notification_repository import NotificationRepository
 
+DOCTOR_CONTACT_FIELDS = ("first_name", "last_name", "phone_number", "email", "address")
+MEDICAL_RECORD_LIST_PROJECTION = Projection(
+    MedicalRecordModel,
+    related={
+        "doctor_create": DOCTOR_CONTACT_FIELDS,
+        "doctor_read": DOCTOR_CONTACT_FIELDS,
+    },
+)
+
+# columns the medical records can be paged by with a cursor
+MEDICAL_RECORD_CURSOR_SORT_COLUMNS = ("id", "created_at", "end_date_treatment")
+
 
 class MedicalRecordsRepository(PostgresRepository[MedicalRecordModel]):
 
@@ -24,53 +38,55 @@ class MedicalRecordsRepository(PostgresRepository[MedicalRecordModel]):
         join_: set[str] | None = None,
         where: dict[str, Any] = {},
         order_by: dict[str, Any] = {},
+        cursor: str | None = None,
+        pagination: str = "offset",
     ):
         try:
-            where_condition = destruct_where(MedicalRecordModel, where)
-            order_by_process = process_orderby(MedicalRecordModel, order_by)
-            query = (
-                select(MedicalRecordModel)
-                .where(where_condition)
-                .order_by(*order_by_process)
-                .offset(skip)
-                .limit(limit)
-            )  # type: ignore
-            result_select = await self.session.execute(query)
-
-            result_select = result_select.scalars().all()
+            where_condition, params = destruct_where_compiled(MedicalRecordModel, where)
+            query = MEDICAL_RECORD_LIST_PROJECTION.select()
+            if where_condition is not None:
+                query = query.where(where_condition)
+            next_cursor = None
+            if pagination == "cursor":
+                # only the first order_by key is used as the seek key, id is the tie breaker
+                sort_key, direction = next(iter(order_by.items()), ("id", "desc"))
+                rows, next_cursor = await self._paginate_keyset(
+                    query,
+                    self._keyset_sort_column(sort_key, MEDICAL_RECORD_CURSOR_SORT_COLUMNS),
+                    limit,
+                    cursor,
+                    descending=direction.lower() == "desc",
+                    params=params,
+                    scalars=False,
+                )
+                result_select = MEDICAL_RECORD_LIST_PROJECTION.nest_many(rows)
+            else:
+                order_by_process = process_orderby(MedicalRecordModel, order_by)
+                query = (
+                    query.order_by(*order_by_process)
+                    .offset(skip)
+                    .limit(limit)
+                )  # type: ignore
+                result_select = await self._fetch_projection(
+                    MEDICAL_RECORD_LIST_PROJECTION, query, params
+                )
 
             total_page = math.ceil(len(result_select) / limit)
             items = []
-            for item in result_select:
-                dict_item = item.as_dict
-                dict_item.update(
-                    {
-                        "doctor_create": {
-                            "first_name": item.doctor_create.first_name,
-                            "last_name": item.doctor_create.last_name,
-                            "phone_number": item.doctor_create.phone_number,
-                            "email": item.doctor_create.email,
-                            "address": item.doctor_create.address,
-                        }
-                    }
-                )
+            for dict_item in result_select:
                 if (
-                    where.get("patient_id", None) is None
-                    and where.get("doctor_read_id", None) is None
+                    where.get("patient_id", None) is not None
+                    or where.get("doctor_read_id", None) is not None
                 ):
-                    dict_item.update(
-                        {
-                            "doctor_read": {
-                                "first_name": item.doctor_read.first_name,
-                                "last_name": item.doctor_read.last_name,
-                                "phone_number": item.doctor_read.phone_number,
-                                "email": item.doctor_read.email,
-                                "address": item.doctor_read.address,
-                            }
-                        }
-                    )
+                    dict_item.pop("doctor_read")
                 items.append(dict_item)
 
+            if pagination == "cursor":
+                return {
+                    "items": items,
+                    "next_cursor": next_cursor,
+                    "page_size": limit,
+                }
             return {
                 "items": items,
                 "current_page": skip,
@@ -147,6 +163,11 @@ class MedicalRecordsRepository(PostgresRepository[MedicalRecordModel]):
                 message=_message,
             )
             await self.session.commit()
+            # a completed appointment is counted in the statistics
+            await mark_statistics_dirty(
+                work_dates=[appointment.work_schedule.work_date],
+                created_dates=[datetime.fromtimestamp(appointment.created_at, timezone.utc).date()],
+            )
             _total_unread = await NotificationRepository.get_total_message_unread(session=self.session, user_id=appointment.patient_id)
             _socket_api_helper = SocketServiceHelper()
             _socket_api_helper.send_notify_helper(notifyModel=_notification_model, total_unread=_total_unread)
@@ -173,6 +194,7 @@ class MedicalRecordsRepository(PostgresRepository[MedicalRecordModel]):
                 MedicalRecordModel.id == value["id"],
             ).options(
                 joinedload(MedicalRecordModel.appointment).joinedload(AppointmentModel.work_schedule),
+                joinedload(MedicalRecordModel.appointment).joinedload(AppointmentModel.doctor),
             )
             result_medical_record = await self.session.execute(query_medical_record)
             medical_record = result_medical_record.scalar_one_or_none()
@@ -242,10 +264,10 @@ class MedicalRecordsRepository(PostgresRepository[MedicalRecordModel]):
                 select(MedicalRecordModel).where(
                     MedicalRecordModel.appointment_id == appointment_id,
                 )
-                # .options(
-                #     joinedload(MedicalRecordModel.doctor_create),
-                #     joinedload(MedicalRecordModel.patient_id),
-                # )
+                .options(
+                    joinedload(MedicalRecordModel.doctor_create),
+                    joinedload(MedicalRecordModel.patient),
+                )
             )
 
             result_query = await self.session.execute(query_data)
@@ -1,9 +1,8 @@
 import logging
-from collections import defaultdict
 from typing import Any
 
-from sqlalchemy import exists, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import desc, exists, select
+from sqlalchemy.orm import joinedload, raiseload
 
 from src.core.database.postgresql import PostgresRepository
 from src.core.decorator.exception_decorator import (
@@ -13,7 +12,9 @@ from src.core.exception import BadRequest, InternalServer
 from src.enum import ErrorCode, MessageContentSchema
 from src.helper.socket_api_helper import SocketServiceHelper
 from src.models.conversation_model import ConversationModel
+from src.models.doctor_model import DoctorModel
 from src.models.message_model import MessageModel
+from src.models.patient_model import PatientModel
 from src.models.user_model import UserModel
 from src.repositories.notification_repository import NotificationRepository
 
@@ -21,61 +22,84 @@ img_admin = "https://png.pngtree.com/png-clipart/20230409/original/pngtree-admin
 
 
 class MessageRepository(PostgresRepository[MessageModel]):
-    async def get_messages_from_conversation(self, conversation_id: int):
+    async def get_messages_from_conversation(
+        self,
+        conversation_id: int,
+        before_id: int | None = None,
+        limit: int | None = None,
+    ):
+        """get messages of a conversation with the sender profile in one query
+
+        Args:
+            conversation_id (int): id of conversation
+            before_id (int | None): only get messages older than this message (infinite scroll)
+            limit (int | None): max number of messages, the newest ones are kept
+
+        Returns:
+            list: messages ordered from oldest to newest
+        """
         try:
             query_message = (
-                select(MessageModel)
-                .options(
-                    joinedload(MessageModel.sender),
+                select(
+                    MessageModel,
+                    UserModel.phone_number.label("user_phone_number"),
+                    DoctorModel.id.label("doctor_id"),
+                    DoctorModel.first_name.label("doctor_first_name"),
+                    DoctorModel.last_name.label("doctor_last_name"),
+                    DoctorModel.avatar.label("doctor_avatar"),
+                    DoctorModel.phone_number.label("doctor_phone_number"),
+                    PatientModel.id.label("patient_id"),
+                    PatientModel.first_name.label("patient_first_name"),
+                    PatientModel.last_name.label("patient_last_name"),
+                    PatientModel.avatar.label("patient_avatar"),
                 )
+                .join(UserModel, UserModel.id == MessageModel.sender_id)
+                .outerjoin(DoctorModel, DoctorModel.id == MessageModel.sender_id)
+                .outerjoin(PatientModel, PatientModel.id == MessageModel.sender_id)
+                .options(raiseload(MessageModel.sender))
                 .where(MessageModel.conversation_id == conversation_id)
             )
+            if before_id is not None:
+                query_message = query_message.where(MessageModel.id < before_id)
+            if limit is not None:
+                query_message = query_message.order_by(desc(MessageModel.id)).limit(limit)
+            else:
+                query_message = query_message.order_by(MessageModel.id)
             result_query_message = await self.session.execute(query_message)
-            data_result_query_message = result_query_message.scalars().all()
+            rows = result_query_message.all()
+            if limit is not None:
+                rows.reverse()
             items: list[dict[str, Any]] = []
-            items_users = defaultdict()
-            for message in data_result_query_message:
-                sender_id_str = str(message.sender_id)
-                if items_users.get(sender_id_str, None) is None:
-                    query_get_user = (
-                        select(UserModel)
-                        .where(UserModel.id == message.sender_id)
-                        .options(
-                            joinedload(UserModel.doctor),
-                            joinedload(UserModel.patient),
-                        )
-                    )
-                    result_query_message = await self.session.execute(query_get_user)
-                    data_result_query_message = result_query_message.scalar_one()
-                    sender_dict = {}
-                    if data_result_query_message.doctor:
-                        sender_dict = {
-                            "first_name": data_result_query_message.doctor.first_name,
-                            "last_name": data_result_query_message.doctor.last_name,
-                            "avatar": data_result_query_message.doctor.avatar,
-                            "phone_number": data_result_query_message.doctor.phone_number,
-                        }
-                    elif data_result_query_message.patient:
-                        sender_dict = {
-                            "first_name": data_result_query_message.patient.first_name,
-                            "last_name": data_result_query_message.patient.last_name,
-                            "avatar": data_result_query_message.patient.avatar,
-                            "phone_number": data_result_query_message.phone_number,
-                        }
-                    # for role admin
-                    # else:
-                    #     sender_dict = {
-                    #         "first_name": "Quan Tri",
-                    #         "last_name": "Vien",
-                    #         "avatar": img_admin,
-                    #         "phone_number": data_result_query_message.phone_number,
-                    #     }
-                    items_users[sender_id_str] = sender_dict
-                item = {
-                    "sender": items_users.get(sender_id_str),
-                    **message.as_dict,
-                }
-                items.append(item)
+            for row in rows:
+                sender_dict = {}
+                if row.doctor_id is not None:
+                    sender_dict = {
+                        "first_name": row.doctor_first_name,
+                        "last_name": row.doctor_last_name,
+                        "avatar": row.doctor_avatar,
+                        "phone_number": row.doctor_phone_number,
+                    }
+                elif row.patient_id is not None:
+                    sender_dict = {
+                        "first_name": row.patient_first_name,
+                        "last_name": row.patient_last_name,
+                        "avatar": row.patient_avatar,
+                        "phone_number": row.user_phone_number,
+                    }
+                # for role admin
+                # else:
+                #     sender_dict = {
+                #         "first_name": "Quan Tri",
+                #         "last_name": "Vien",
+                #         "avatar": img_admin,
+                #         "phone_number": row.user_phone_number,
+                #     }
+                items.append(
+                    {
+                        "sender": sender_dict,
+                        **row.MessageModel.as_dict,
+                    }
+                )
             return items
         except (BadRequest, InternalServer) as e:
             logging.error(e)
@@ -1,10 +1,13 @@
 from _decimal import Decimal
 from typing import Any, Sequence, Tuple
 
-from sqlalchemy import exists, func, select
+from sqlalchemy import Integer, cast, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine.row import Row
 from sqlalchemy.orm import joinedload
 
+from src.config import config
+from src.core.cache import Cache, CacheTag
 from src.core.database.postgresql import PostgresRepository
 from src.core.decorator.exception_decorator import catch_error_repository
 from src.core.exception import BadRequest
@@ -15,9 +18,18 @@ from src.models.doctor_model import DoctorModel
 from src.models.patient_model import PatientModel
 from src.models.rating_model import RatingModel
 from src.models.user_model import Role, UserModel
+from src.repositories.global_helper_repository import mark_doctor_ranking_stale
 from src.schema.rating_schema import RequestCreateRatingSchema
 from src.schema.register import RequestRegisterPatientSchema
 
+# age groups of the age distribution, AGE_GROUP_THRESHOLDS are the lower bounds
+# of all of them but the first one
+AGE_GROUPS = (
+    "0-2", "3-12", "13-19", "20-29", "30-39", "40-49",
+    "50-59", "60-69", "70-79", "80-89", "90-99", "100+",
+)
+AGE_GROUP_THRESHOLDS = (3, 13, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+
 
 class PatientRepository(PostgresRepository[PatientModel]):
 
@@ -73,107 +85,87 @@ class PatientRepository(PostgresRepository[PatientModel]):
 
     @catch_error_repository("Failed to create rating, please try again later")
     async def create_rating_repository(self, user_id, data: RequestCreateRatingSchema):
-        # check if patient hava rating
-        query_rating_statment = select(RatingModel).where(
-            RatingModel.patient_id == user_id, RatingModel.doctor_id == data.doctor_id
-        )
-        result_rating = await self.session.execute(query_rating_statment)
-        data_rating = result_rating.scalar_one_or_none()
-        if data_rating:
-            data_rating.rating = data.rating
-            data_rating.comment = data.comment
-            self.session.add(data_rating)
-            await self.session.commit()
-            return data_rating.as_dict
-        # check patient have permission to rating
-        query_exist_appointment = select(
-            exists(AppointmentModel).where(
-                AppointmentModel.patient_id == user_id,
-                AppointmentModel.doctor_id == data.doctor_id,
-                AppointmentModel.appointment_status
-                == AppointmentModelStatus.COMPLETED.value,
+        # check if patient hava rating, the row stays locked until the commit
+        data_rating = await self._get_rating_for_update(user_id, data.doctor_id)
+        if data_rating is None:
+            # check patient have permission to rating
+            query_exist_appointment = select(
+                exists(AppointmentModel).where(
+                    AppointmentModel.patient_id == user_id,
+                    AppointmentModel.doctor_id == data.doctor_id,
+                    AppointmentModel.appointment_status
+                    == AppointmentModelStatus.COMPLETED.value,
+                )
+            )
+            result_exists_appointment = await self.session.execute(query_exist_appointment)
+            if not result_exists_appointment.scalar_one():
+                raise BadRequest(
+                    error_code=ErrorCode.BAD_REQUEST.name,
+                    errors={"message": ErrorCode.msg_permission_rating.value},
+                )
+            # ux_rating_doctor_patient: of two concurrent first ratings only one is inserted
+            insert_rating = (
+                insert(RatingModel)
+                .values(**data.model_dump(), patient_id=user_id)
+                .on_conflict_do_nothing(index_elements=["doctor_id", "patient_id"])
+                .returning(RatingModel)
             )
+            rating_model = (await self.session.scalars(insert_rating)).one_or_none()
+            if rating_model is not None:
+                await self._add_doctor_rating(data.doctor_id, data.rating, 1)
+                await self.session.commit()
+                await mark_doctor_ranking_stale()
+                return rating_model.as_dict
+            # the other rating was committed first, this one replaces it
+            data_rating = await self._get_rating_for_update(user_id, data.doctor_id)
+        await self._add_doctor_rating(data.doctor_id, data.rating - data_rating.rating, 0)
+        data_rating.rating = data.rating
+        data_rating.comment = data.comment
+        self.session.add(data_rating)
+        await self.session.commit()
+        await mark_doctor_ranking_stale()
+        return data_rating.as_dict
+
+    async def _get_rating_for_update(self, user_id: int, doctor_id: int):
+        """the rating of the patient for the doctor, locked (FOR UPDATE runs on the writer)"""
+        query_rating_statment = (
+            select(RatingModel)
+            .where(RatingModel.patient_id == user_id, RatingModel.doctor_id == doctor_id)
+            .with_for_update()
         )
-        result_exists_appointment = await self.session.execute(query_exist_appointment)
-        if not result_exists_appointment.scalar_one():
-            raise BadRequest(
-                error_code=ErrorCode.BAD_REQUEST.name,
-                errors={"message": ErrorCode.msg_permission_rating.value},
+        result_rating = await self.session.execute(query_rating_statment)
+        return result_rating.scalar_one_or_none()
+
+    async def _add_doctor_rating(self, doctor_id: int, rating_delta: float, count_delta: int):
+        """update the running rating totals of the doctor, the increment is done by postgres
+        so concurrent ratings do not overwrite each other"""
+        await self.session.execute(
+            update(DoctorModel)
+            .where(DoctorModel.id == doctor_id)
+            .values(
+                rating_sum=DoctorModel.rating_sum + rating_delta,
+                rating_count=DoctorModel.rating_count + count_delta,
             )
-
-        rating_model = RatingModel(
-            **data.model_dump(),
-            patient_id=user_id,
         )
-        self.session.add(rating_model)
-        await self.session.commit()
-        return rating_model.as_dict
 
     async def count_patient(self):
         query = select(func.count(PatientModel.id))
         result = await self.session.execute(query)
         return result.scalar_one()
 
+    @Cache.cached(tag=CacheTag.GET_AGE_DISTRIBUTION, ttl=config.AGE_DISTRIBUTION_CACHE_TTL_SECONDS)
     @catch_error_repository(message=None)
     async def age_distribution_patient_repository(self):
-        query = (
-            select(
-                (func.extract('year', func.age(PatientModel.date_of_birth))).label("age"),
-                func.count(PatientModel.id).label("total"),
-            )
-            .group_by(func.extract('year', func.age(PatientModel.date_of_birth)),"id")
-            .order_by(func.extract('year', func.age(PatientModel.date_of_birth)))
-        )
-        result = await self.session.execute(query)
-        data = result.all()
-
-        group_age = {
-            "0-2": {"total": 0, "percentage": 0},
-            "3-12": {"total": 0, "percentage": 0},
-            "13-19": {"total": 0, "percentage": 0},
-            "20-29": {"total": 0, "percentage": 0},
-            "30-39": {"total": 0, "percentage": 0},
-            "40-49": {"total": 0, "percentage": 0},
-            "50-59": {"total": 0, "percentage": 0},
-            "60-69": {"total": 0, "percentage": 0},
-            "70-79": {"total": 0, "percentage": 0},
-            "80-89": {"total": 0, "percentage": 0},
-            "90-99": {"total": 0, "percentage": 0},
-            "100+": {"total": 0, "percentage": 0},
-        }
-
-        total_patients = sum(total for _, total in data)
-        for age, total in data:
-            if age < 3:
-                group_age["0-2"]["total"] += total
-            elif age < 13:
-                group_age["3-12"]["total"] += total
-            elif age < 20:
-                group_age["13-19"]["total"] += total
-            elif age < 30:
-                group_age["20-29"]["total"] += total
-            elif age < 40:
-                group_age["30-39"]["total"] += total
-            elif age < 50:
-                group_age["40-49"]["total"] += total
-            elif age < 60:
-                group_age["50-59"]["total"] += total
-            elif age < 70:
-                group_age["60-69"]["total"] += total
-            elif age < 80:
-                group_age["70-79"]["total"] += total
-            elif age < 90:
-                group_age["80-89"]["total"] += total
-            elif age < 100:
-                group_age["90-99"]["total"] += total
-            else:
-                group_age["100+"]["total"] += total
-
-        # Tính tỷ lệ phần trăm cho mỗi nhóm tuổi
-        for age_group, values in group_age.items():
-            if total_patients > 0:  # Đảm bảo tổng số bệnh nhân không bằng 0
-                values["percentage"] = (values["total"] / total_patients) * 100
-            else:
-                values["percentage"] = 0  # Nếu không có bệnh nhân
-
+        # whole years, width_bucket wants the same type as the integer thresholds
+        age = cast(func.extract("year", func.age(PatientModel.date_of_birth)), Integer)
+        counts = await self._histogram(age, AGE_GROUP_THRESHOLDS)
+
+        total_patients = sum(counts)
+        group_age = {}
+        for age_group, total in zip(AGE_GROUPS, counts):
+            group_age[age_group] = {
+                "total": total,
+                # Tính tỷ lệ phần trăm cho mỗi nhóm tuổi
+                "percentage": (total / total_patients) * 100 if total_patients > 0 else 0,
+            }
         return group_age
@@ -4,9 +4,8 @@ from typing import Any, Dict, Literal
 
 from sqlalchemy import asc, desc, exists, func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
 
-from src.core.database.postgresql.repository import PostgresRepository
+from src.core.database.postgresql import Projection, PostgresRepository, loader_options
 from src.core.decorator.exception_decorator import (
     catch_error_repository,
 )
@@ -15,6 +14,23 @@ from src.enum import ErrorCode, MessageContentSchema
 from src.models.post_model import CommentModel, PostModel
 from src.models.user_model import UserModel
 
+# columns of the patient/doctor/staff profile shown as the author of a post or comment
+AUTHOR_FIELDS = ("id", "email", "first_name", "last_name", "avatar")
+
+# post list: post columns, the author profile and the number of comments, no entity is loaded
+POST_LIST_PROJECTION = Projection(
+    PostModel,
+    related={
+        "author.patient": AUTHOR_FIELDS,
+        "author.doctor": AUTHOR_FIELDS,
+        "author.staff": AUTHOR_FIELDS,
+    },
+    extra={
+        "comment": select(func.count(CommentModel.id))
+        .where(CommentModel.post_id == PostModel.id)
+        .scalar_subquery()
+    },
+)
 
 class PostRepository(PostgresRepository[PostModel]):
 
@@ -77,7 +93,9 @@ class PostRepository(PostgresRepository[PostModel]):
         await self.session.commit()
 
         result_user_comment = await self.session.execute(
-            select(UserModel).where(UserModel.id == auth_id)
+            select(UserModel)
+            .where(UserModel.id == auth_id)
+            .options(*loader_options(UserModel, "detail"))
         )
         data_user_comment = result_user_comment.scalar_one_or_none()
         if data_user_comment is None:
@@ -90,7 +108,6 @@ class PostRepository(PostgresRepository[PostModel]):
             or data_user_comment.doctor
             or data_user_comment.staff
         )
-        include_fields = ["id", "email", "first_name", "last_name", "avatar"]
         data = {
             **data.as_dict,
             "created_at": datetime.fromtimestamp(
@@ -99,11 +116,7 @@ class PostRepository(PostgresRepository[PostModel]):
             "updated_at": datetime.fromtimestamp(
                 data.updated_at, timezone.utc
             ).strftime("%Y-%m-%d %H:%M:%S"),
-            "user": {
-                key: value
-                for key, value in user_comment.as_dict.items()
-                if key in include_fields
-            },
+            "user": user_comment.to_dict(include=AUTHOR_FIELDS),
         }
         return data
 
@@ -111,7 +124,11 @@ class PostRepository(PostgresRepository[PostModel]):
     async def update_comment_repository(
         self, auth_id: int, comment_id: int, content_schema: MessageContentSchema
     ):
-        comment_statment = select(CommentModel).where(CommentModel.id == comment_id)
+        comment_statment = (
+            select(CommentModel)
+            .where(CommentModel.id == comment_id)
+            .options(*loader_options(CommentModel, "list"))
+        )
         result_comment_statment = await self.session.execute(comment_statment)
         comment = result_comment_statment.unique().scalars().first()
         if not comment:
@@ -127,7 +144,6 @@ class PostRepository(PostgresRepository[PostModel]):
         comment.content = content_schema.model_dump()
         await self.session.commit()
         user_comment = comment.user.patient or comment.user.doctor or comment.user.staff
-        include_fields = ["id", "email", "first_name", "last_name", "avatar"]
         data = {
             **comment.as_dict,
             "created_at": datetime.fromtimestamp(
@@ -136,11 +152,7 @@ class PostRepository(PostgresRepository[PostModel]):
             "updated_at": datetime.fromtimestamp(
                 comment.updated_at, timezone.utc
             ).strftime("%Y-%m-%d %H:%M:%S"),
-            "user": {
-                key: value
-                for key, value in user_comment.as_dict.items()
-                if key in include_fields
-            },
+            "user": user_comment.to_dict(include=AUTHOR_FIELDS),
         }
         return data
 
@@ -186,12 +198,34 @@ class PostRepository(PostgresRepository[PostModel]):
         offset_value = (current_page - 1) * page_size
         sort_by: Literal["created_at", "viewed"] = query.get("sort_by", "created_at")
         sort_order: str = query.get("sort_order", "desc")
+        pagination: str = query.get("pagination", "offset")
+        cursor: str | None = query.get("cursor", None)
 
-        query_statement = select(PostModel).where(PostModel.is_deleted == False)
+        query_statement = POST_LIST_PROJECTION.select().where(PostModel.is_deleted == False)
 
         if title:
             query_statement = query_statement.where(PostModel.title.ilike(f"%{title}%"))
 
+        if pagination == "cursor":
+            rows, next_cursor = await self._paginate_keyset(
+                query_statement,
+                getattr(PostModel, sort_by),
+                page_size,
+                cursor,
+                descending=sort_order != "asc",
+                scalars=False,
+            )
+            return {
+                "items": [
+                    self._post_list_item(item)
+                    for item in POST_LIST_PROJECTION.nest_many(rows)
+                ],
+                "next_cursor": next_cursor,
+                "page_size": page_size,
+                # without search the list is the whole table, the planner estimate is enough
+                "total_estimate": None if title else await self._estimate_count(),
+            }
+
         total_posts_statement = (
             select(func.count(PostModel.id))
             .select_from(PostModel)
@@ -212,49 +246,36 @@ class PostRepository(PostgresRepository[PostModel]):
                 desc(getattr(PostModel, sort_by))
             )
 
-        query_statement = (
-            query_statement.options(joinedload(PostModel.comments))
-            .offset(offset_value)
-            .limit(page_size)
-        )
-
-        result = await self.session.execute(query_statement)
-        posts = result.unique().scalars().all()
-
-        items = []
-        for post in posts:
-            include_fields = ["id", "email", "first_name", "last_name", "avatar"]
-            auth_post = post.author
-            user = auth_post.patient or auth_post.doctor or auth_post.staff
-            user = {
-                key: value
-                for key, value in user.as_dict.items()
-                if key in include_fields
-            }
-            item = {
-                "user": user,
-                **post.as_dict,
-                "comment": post.get_size_comments,
-                "created_at": datetime.fromtimestamp(
-                    post.created_at, timezone.utc
-                ).strftime("%Y-%m-%d %H:%M:%S"),
-                "updated_at": datetime.fromtimestamp(
-                    post.updated_at, timezone.utc
-                ).strftime("%Y-%m-%d %H:%M:%S"),
-            }
-
-            items.append(item)
+        query_statement = query_statement.offset(offset_value).limit(page_size)
+        items = await self._fetch_projection(POST_LIST_PROJECTION, query_statement)
 
         return {
-            "items": items,
+            "items": [self._post_list_item(item) for item in items],
             "current_page": current_page,
             "page_size": page_size,
             "total_page": math.ceil(total_posts / page_size),
         }
 
+    def _post_list_item(self, item: dict[str, Any]) -> dict[str, Any]:
+        author = item.pop("author")
+        return {
+            "user": author["patient"] or author["doctor"] or author["staff"],
+            **item,
+            "created_at": datetime.fromtimestamp(
+                item["created_at"], timezone.utc
+            ).strftime("%Y-%m-%d %H:%M:%S"),
+            "updated_at": datetime.fromtimestamp(
+                item["updated_at"], timezone.utc
+            ).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
     @catch_error_repository(message=None)
     async def get_post_repository_by_id(self, post_id: int):
-        query_statment = select(PostModel).where(PostModel.id == post_id, PostModel.is_deleted == False)
+        query_statment = (
+            select(PostModel)
+            .where(PostModel.id == post_id, PostModel.is_deleted == False)
+            .options(*loader_options(PostModel, "detail"))
+        )
         result = await self.session.execute(query_statment)
         post = result.unique().scalars().first()
         if post is None:
@@ -268,22 +289,17 @@ class PostRepository(PostgresRepository[PostModel]):
         comment_select = (
             select(CommentModel)
             .where(CommentModel.post_id == post_id)
-            .options(joinedload(CommentModel.user))
+            .options(*loader_options(CommentModel, "list"))
             .order_by(desc(CommentModel.created_at))
         )
         result_commnet = await self.session.execute(comment_select)
         data_comment = result_commnet.unique().scalars().all()
         comments = []
-        include_fields = ["id", "email", "first_name", "last_name", "avatar"]
         for comment in data_comment:
             user_comment = (
                 comment.user.patient or comment.user.doctor or comment.user.staff
             )
-            user_comment = {
-                key: value
-                for key, value in user_comment.as_dict.items()
-                if key in include_fields
-            }
+            user_comment = user_comment.to_dict(include=AUTHOR_FIELDS)
             comments.append(
                 {
                     **comment.as_dict,
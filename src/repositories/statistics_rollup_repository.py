@@ -0,0 +1,216 @@
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import Date, and_, cast, delete, func, insert, literal_column, or_, select, text
+
+from src.core.database.postgresql.session import engines
+from src.models.appointment_model import AppointmentModel
+from src.models.payment_model import PaymentModel
+from src.models.statistics_rollup_model import (
+    NO_APPOINTMENT,
+    AppointmentDailyStatModel,
+    PaymentDailyStatModel,
+    WorkScheduleDailyStatModel,
+)
+from src.models.work_schedule_model import WorkScheduleModel
+from src.repositories.global_helper_repository import (
+    invalidate_statistical_price,
+    mark_statistics_dirty,
+    take_statistics_dirty,
+)
+
+# pg advisory lock id, only one worker rewrites the rollup rows at a time
+STATISTICS_ROLLUP_LOCK_ID = 815002
+
+# created_at is an epoch of the UTC+7 wall clock, its UTC date is the local day.
+# Grouped expressions take literals, a bound parameter would not match the GROUP BY
+APPOINTMENT_CREATED_DATE = cast(
+    func.timezone(literal_column("'UTC'"), func.to_timestamp(AppointmentModel.created_at)),
+    Date,
+)
+
+
+def _epoch(day: date) -> int:
+    return int(datetime.combine(day, time.min, tzinfo=timezone.utc).timestamp())
+
+
+def _work_schedule_rollup(days: list[date]):
+    status = func.coalesce(
+        AppointmentModel.appointment_status, literal_column(f"'{NO_APPOINTMENT}'")
+    )
+    rows = (
+        select(
+            WorkScheduleModel.work_date,
+            WorkScheduleModel.doctor_id,
+            WorkScheduleModel.examination_type,
+            status,
+            func.count(),
+            func.count().filter(WorkScheduleModel.ordered.is_(True)),
+            func.coalesce(func.sum(WorkScheduleModel.medical_examination_fee), 0),
+        )
+        .select_from(WorkScheduleModel)
+        .outerjoin(AppointmentModel, AppointmentModel.work_schedule_id == WorkScheduleModel.id)
+        .where(WorkScheduleModel.work_date.in_(days))
+        .group_by(
+            WorkScheduleModel.work_date,
+            WorkScheduleModel.doctor_id,
+            WorkScheduleModel.examination_type,
+            status,
+        )
+    )
+    model = WorkScheduleDailyStatModel
+    return (
+        delete(model).where(model.work_date.in_(days)),
+        insert(model).from_select(
+            [
+                "work_date",
+                "doctor_id",
+                "examination_type",
+                "appointment_status",
+                "schedule_count",
+                "ordered_count",
+                "fee_total",
+            ],
+            rows,
+        ),
+    )
+
+
+def _appointment_rollup(days: list[date]):
+    rows = (
+        select(
+            APPOINTMENT_CREATED_DATE,
+            AppointmentModel.doctor_id,
+            WorkScheduleModel.examination_type,
+            AppointmentModel.appointment_status,
+            func.count(),
+        )
+        .join(WorkScheduleModel, WorkScheduleModel.id == AppointmentModel.work_schedule_id)
+        # epoch ranges, so the lookup is on idx_appointment_created_at
+        .where(
+            or_(
+                *(
+                    and_(
+                        AppointmentModel.created_at >= _epoch(day),
+                        AppointmentModel.created_at < _epoch(day + timedelta(days=1)),
+                    )
+                    for day in days
+                )
+            )
+        )
+        .group_by(
+            APPOINTMENT_CREATED_DATE,
+            AppointmentModel.doctor_id,
+            WorkScheduleModel.examination_type,
+            AppointmentModel.appointment_status,
+        )
+    )
+    model = AppointmentDailyStatModel
+    return (
+        delete(model).where(model.created_date.in_(days)),
+        insert(model).from_select(
+            [
+                "created_date",
+                "doctor_id",
+                "examination_type",
+                "appointment_status",
+                "appointment_count",
+            ],
+            rows,
+        ),
+    )
+
+
+def _payment_rollup(days: list[date]):
+    payment_date = cast(PaymentModel.payment_time, Date)
+    rows = (
+        select(
+            payment_date,
+            AppointmentModel.doctor_id,
+            AppointmentModel.patient_id,
+            func.count(),
+            func.coalesce(func.sum(PaymentModel.amount), 0),
+        )
+        .join(AppointmentModel, AppointmentModel.id == PaymentModel.appointment_id)
+        .where(
+            or_(
+                *(
+                    and_(
+                        PaymentModel.payment_time >= day,
+                        PaymentModel.payment_time < day + timedelta(days=1),
+                    )
+                    for day in days
+                )
+            )
+        )
+        .group_by(payment_date, AppointmentModel.doctor_id, AppointmentModel.patient_id)
+    )
+    model = PaymentDailyStatModel
+    return (
+        delete(model).where(model.payment_date.in_(days)),
+        insert(model).from_select(
+            ["payment_date", "doctor_id", "patient_id", "payment_count", "amount_total"],
+            rows,
+        ),
+    )
+
+
+async def refresh_statistics_rollup(
+    work_dates: Iterable[date] = (),
+    created_dates: Iterable[date] = (),
+    payment_dates: Iterable[date] = (),
+) -> bool:
+    """recompute the rollup rows of the given days in one transaction on the writer
+
+    The rows of a day are deleted and inserted again from the source tables, so
+    the cost depends on the number of days refreshed, not on the history.
+
+    Returns:
+        bool: False when another worker is already refreshing the rollups
+    """
+    statements = []
+    for days, rollup in (
+        (work_dates, _work_schedule_rollup),
+        (created_dates, _appointment_rollup),
+        (payment_dates, _payment_rollup),
+    ):
+        days = sorted(set(days))
+        if days:
+            statements.extend(rollup(days))
+    if not statements:
+        return True
+    async with engines["writer"].begin() as connection:
+        locked = await connection.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+            {"lock_id": STATISTICS_ROLLUP_LOCK_ID},
+        )
+        if not locked.scalar_one():
+            return False
+        for statement in statements:
+            await connection.execute(statement)
+    return True
+
+
+async def refresh_statistics_rollup_job() -> None:
+    """refresh the days marked dirty by the writes, and the last days of the created
+    and payment axes where new appointments and payments land"""
+    dirty = await take_statistics_dirty()
+    today = date.today()
+    # created_at is written in UTC+7, the server day can be one off
+    recent = {today - timedelta(days=1), today, today + timedelta(days=1)}
+    work_dates = dirty["work_dates"]
+    created_dates = dirty["created_dates"] | recent
+    payment_dates = dirty["payment_dates"] | recent
+    try:
+        refreshed = await refresh_statistics_rollup(work_dates, created_dates, payment_dates)
+    except Exception as e:
+        logging.error(f"Error in refresh_statistics_rollup: {e}")
+        refreshed = False
+    if not refreshed:
+        # keep the days for the next run
+        await mark_statistics_dirty(**dirty)
+        return
+    if work_dates:
+        # the revenue statistics are read from the work schedule rollup
+        await invalidate_statistical_price()
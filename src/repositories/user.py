@@ -5,7 +5,7 @@ from typing import Any, Dict, Optional
 from sqlalchemy import and_, exists, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.database.postgresql import PostgresRepository
+from src.core.database.postgresql import PostgresRepository, loader_options
 from src.core.database.postgresql.session import get_session
 from src.core.decorator.exception_decorator import (
     catch_error_repository,
@@ -18,6 +18,7 @@ from src.models.patient_model import PatientModel
 from src.models.staff_model import StaffModel
 from src.models.user_model import Role, UserModel
 from src.repositories.global_func import destruct_where
+from src.repositories.global_helper_repository import mark_doctor_ranking_stale
 from src.schema.register import RequestAdminRegisterSchema, RequestRegisterPatientSchema
 
 
@@ -82,12 +83,14 @@ class UserRepository(PostgresRepository[UserModel]):
 
     @catch_error_repository(message=None)
     async def get_by_id(self, user_id: int):
-        return await self.get_by("id", user_id)
+        return await self.get_by("id", user_id, profile="detail")
 
     @catch_error_repository(message=None)
-    async def get_one(self, where: Dict[str, Any]):
+    async def get_one(self, where: Dict[str, Any], profile: str = "detail"):
         conditions = destruct_where(self.model_class, where)
-        query = select(self.model_class)
+        query = select(self.model_class).options(
+            *loader_options(self.model_class, profile)
+        )
         if conditions is not None:
             query = query.where(conditions)
         result = await self.session.execute(query)
@@ -142,7 +145,10 @@ class UserRepository(PostgresRepository[UserModel]):
                 if hasattr(model, key):
                     setattr(model, key, value)
 
-        if data.get("offline_price") is not None or data.get("online_price") is not None:
+        examination_price_changed = (
+            data.get("offline_price") is not None or data.get("online_price") is not None
+        )
+        if examination_price_changed:
             examination_price = DoctorExaminationPriceModel()
             examination_price.doctor_id = user_id
             examination_price.offline_price = data.get("offline_price",0)
@@ -150,6 +156,8 @@ class UserRepository(PostgresRepository[UserModel]):
             self.session.add(examination_price)
         self.session.add(model)
         await self.session.commit()
+        if examination_price_changed:
+            await mark_doctor_ranking_stale()
         return model.as_dict
 
     async def _is_phone_exist(
@@ -1,4 +1,33 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
-__all__ = ["AsyncIOScheduler", "CronTrigger"]
+from src.config import config
+from src.repositories.doctor_ranking_repository import refresh_doctor_ranking_job
+from src.repositories.statistics_rollup_repository import refresh_statistics_rollup_job
+
+scheduler = AsyncIOScheduler()
+
+
+def register_jobs(_scheduler: AsyncIOScheduler = scheduler) -> AsyncIOScheduler:
+    """add the periodic jobs of the api process, started and stopped by the app lifespan"""
+    _scheduler.add_job(
+        refresh_doctor_ranking_job,
+        IntervalTrigger(seconds=config.DOCTOR_RANKING_REFRESH_INTERVAL_SECONDS),
+        id="refresh_doctor_ranking",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    _scheduler.add_job(
+        refresh_statistics_rollup_job,
+        IntervalTrigger(seconds=config.STATISTICS_ROLLUP_INTERVAL_SECONDS),
+        id="refresh_statistics_rollup",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    return _scheduler
+
+
+__all__ = ["AsyncIOScheduler", "CronTrigger", "IntervalTrigger", "scheduler", "register_jobs"]
@@ -69,6 +69,16 @@ class RequestGetAllAppointmentSchema(BaseModel):
         description="query appointment by patient name,if not assign will ignore, if you is role patient must be assign this value",
         examples=["None", "Nguyen Van Hieu"],
     )
+    pagination: Literal["offset", "cursor"] = Field(
+        default="offset",
+        description="offset: paginate by current_page, cursor: paginate by cursor (next_cursor of the previous page), faster for deep pages",
+        examples=["offset", "cursor"],
+    )
+    cursor: str | None = Field(
+        default=None,
+        description="next_cursor of the previous page, only used when pagination is cursor, not assign for the first page",
+        examples=[None],
+    )
 
     class Config:
         json_encoders = {date: lambda v: v.isoformat()}
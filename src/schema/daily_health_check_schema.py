@@ -1,5 +1,5 @@
 from datetime import date
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field, validator
 
@@ -86,6 +86,16 @@ class RequestGetAllDailyHealthSchema(BaseModel):
     page_size: int = Field(
         default=20, description="Number of items per page, default = 10", examples=[10]
     )
+    pagination: Literal["offset", "cursor"] = Field(
+        default="offset",
+        description="offset: paginate by current_page, cursor: paginate by cursor (next_cursor of the previous page), faster for deep pages",
+        examples=["offset", "cursor"],
+    )
+    cursor: str | None = Field(
+        default=None,
+        description="next_cursor of the previous page, only used when pagination is cursor, not assign for the first page",
+        examples=[None],
+    )
 
     class Config:
         json_encoders = {date: lambda v: v.isoformat()}
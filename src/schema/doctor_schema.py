@@ -81,6 +81,16 @@ class RequestGetAllDoctorsRootSchema(BaseModel):
         False,
         description="Order by field",
         examples=[True, False],)
+    pagination: Literal["offset", "cursor"] = Field(
+        default="offset",
+        description="offset: paginate by current_page, cursor: paginate by cursor (next_cursor of the previous page), faster for deep pages",
+        examples=["offset", "cursor"],
+    )
+    cursor: str | None = Field(
+        default=None,
+        description="next_cursor of the previous page, only used when pagination is cursor, not assign for the first page",
+        examples=[None],
+    )
 
 
 
@@ -97,6 +107,22 @@ class RequestDetailDoctorSchema(BaseModel):
     doctor_id: int
 
 
+class RequestDetailDoctorQuerySchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
+    comment_page_size: int = Field(
+        default=10,
+        ge=1,
+        le=100,
+        description="Number of comments returned with the doctor, newest first",
+        examples=[10],
+    )
+    comment_cursor: str | None = Field(
+        default=None,
+        description="comments_next_cursor of the previous response, not assign for the first page",
+        examples=[None],
+    )
+
+
 class RequestUpdatePathParamsSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True, use_enum_values=True)
     doctor_id: int
@@ -27,6 +27,16 @@ class RequestGetAllMedicalRecordsSchema(BaseModel):
     end_date: Optional[date]
     current_page: int = Field(default=1)
     page_size: int = Field(default=10)
+    pagination: Literal["offset", "cursor"] = Field(
+        default="offset",
+        description="offset: paginate by current_page, cursor: paginate by cursor (next_cursor of the previous page), faster for deep pages",
+        examples=["offset", "cursor"],
+    )
+    cursor: str | None = Field(
+        default=None,
+        description="next_cursor of the previous page, only used when pagination is cursor, not assign for the first page",
+        examples=[None],
+    )
 
     class Config:
         json_encoders = {date: lambda v: v.isoformat()}
@@ -30,6 +30,18 @@ class RequestGetMessageSchema(BaseModel):
     conversation_id: str = Field(
         ..., description="Conversation ID", examples=["data uuid"]
     )
+    before_id: int | None = Field(
+        None,
+        description="only get messages older than this message id, use the oldest id of the previous page to scroll",
+        examples=[None, 100],
+    )
+    limit: int | None = Field(
+        None,
+        ge=1,
+        le=200,
+        description="max number of newest messages to get, if not assign will get all",
+        examples=[None, 50],
+    )
 
     class Config:
         from_attributes = True
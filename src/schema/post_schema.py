@@ -34,6 +34,16 @@ class RequestGetAllPostSchema(BaseModel):
         description="Order of sorting, default is descending",
         examples=["asc", "desc"],
     )
+    pagination: Literal["offset", "cursor"] = Field(
+        default="offset",
+        description="offset: paginate by current_page, cursor: paginate by cursor (next_cursor of the previous page), faster for deep pages",
+        examples=["offset", "cursor"],
+    )
+    cursor: str | None = Field(
+        default=None,
+        description="next_cursor of the previous page, only used when pagination is cursor, not assign for the first page",
+        examples=[None],
+    )
 
     class Config:
         from_attributes = True
@@ -0,0 +1,149 @@
+"""A local stand-in for the PayOS API, the SDK is pointed at it by the ``fake_payos`` fixture.
+
+Every request takes the next scripted fault, once the script is used up the
+server answers normally:
+
+    ok         signed answer, like PayOS
+    timeout    signed answer after ``delay`` seconds, longer than the client timeout
+    error      http 500, the SDK raises PayOSError with the "20" code
+    not_found  http 200 with a business error code, PayOS is up
+
+    fake_payos.script("error", "timeout")  # the third request succeeds
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, List, Tuple
+
+from payos.utils import createSignatureFromObj
+
+OK = "ok"
+TIMEOUT = "timeout"
+ERROR = "error"
+NOT_FOUND = "not_found"
+
+
+class FakePayOS:
+    def __init__(self, checksum_key: str, delay: float = 1.0) -> None:
+        self.checksum_key = checksum_key
+        self.delay = delay
+        self.requests: List[Tuple[str, str]] = []
+        self.order_codes: List[int] = []
+        self._faults: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        # a sleeping "timeout" answer must not hold the shutdown
+        self._server.daemon_threads = True
+        self._server.block_on_close = False
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakePayOS":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def script(self, *faults: str) -> None:
+        with self._lock:
+            self._faults.extend(faults)
+
+    def clear_script(self) -> None:
+        with self._lock:
+            self._faults.clear()
+
+    def _next_fault(self, method: str, path: str) -> str:
+        with self._lock:
+            self.requests.append((method, path))
+            return self._faults.popleft() if self._faults else OK
+
+    def _answer(self, data: dict) -> dict:
+        return {
+            "code": "00",
+            "desc": "success",
+            "data": data,
+            "signature": createSignatureFromObj(data, self.checksum_key),
+        }
+
+    def _payment_link(self, body: dict) -> dict:
+        return self._answer(
+            {
+                "bin": "970422",
+                "accountNumber": "0000000000",
+                "accountName": "HEALTH CARE",
+                "amount": body["amount"],
+                "description": body["description"],
+                "orderCode": body["orderCode"],
+                "currency": "VND",
+                "paymentLinkId": f"link-{body['orderCode']}",
+                "status": "PENDING",
+                "checkoutUrl": f"{self.base_url}/web/{body['orderCode']}",
+                "qrCode": "qr",
+                "expiredAt": body.get("expiredAt"),
+            }
+        )
+
+    def _payment_info(self, order_id: str) -> dict:
+        return self._answer(
+            {
+                "id": f"link-{order_id}",
+                "orderCode": int(order_id),
+                "amount": 100000,
+                "amountPaid": 100000,
+                "amountRemaining": 0,
+                "status": "PAID",
+                "createdAt": "2026-10-18T10:00:00+07:00",
+                "transactions": [],
+                "cancellationReason": None,
+                "canceledAt": None,
+            }
+        )
+
+    def _handler_class(self) -> type:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                fake.order_codes.append(body["orderCode"])
+                self._reply(lambda: fake._payment_link(body))
+
+            def do_GET(self) -> None:
+                order_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+                self._reply(lambda: fake._payment_info(order_id))
+
+            def _reply(self, answer) -> None:
+                fault = fake._next_fault(self.command, self.path)
+                if fault == TIMEOUT:
+                    time.sleep(fake.delay)
+                if fault == ERROR:
+                    self._send(500, {"code": "500", "desc": "Internal Server Error"})
+                elif fault == NOT_FOUND:
+                    self._send(200, {"code": "101", "desc": "Order not found", "data": None})
+                else:
+                    self._send(200, answer())
+
+            def _send(self, status: int, payload: dict) -> None:
+                content = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        return Handler
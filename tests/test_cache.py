@@ -0,0 +1,63 @@
+import asyncio
+import fnmatch
+from datetime import date
+
+import pytest
+
+from src.core.cache import Cache, CacheTag, CustomKeyMaker
+from src.core.cache.redis_backend import RedisBackend
+from src.repositories.appointment_repository import StatisticalPricePeriod
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, name, value, ex=None):
+        self.values[name] = value.encode() if isinstance(value, str) else value
+
+    async def scan_iter(self, match="*"):
+        for key in list(self.values):
+            if fnmatch.fnmatchcase(key, match):
+                yield key.encode()
+
+    async def delete(self, key):
+        self.values.pop(key.decode() if isinstance(key, bytes) else key, None)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    backend = RedisBackend()
+    backend.redis = FakeRedis()
+    monkeypatch.setattr(Cache, "backend", backend)
+    monkeypatch.setattr(Cache, "key_maker", CustomKeyMaker())
+    return backend.redis
+
+
+def test_remove_by_tag_drops_the_cached_entries(cache):
+    calls = []
+
+    @Cache.cached(tag=CacheTag.GET_STATISTICAL_PRICE, identify={"period": ["year", "day"]})
+    async def statistics(period: StatisticalPricePeriod):
+        calls.append(period)
+        return {"year": period.year}
+
+    @Cache.cached(tag=CacheTag.GET_AGE_DISTRIBUTION)
+    async def ages():
+        return {"0-18": 1}
+
+    async def run():
+        period = StatisticalPricePeriod(year=2026, day=date(2026, 10, 18))
+        await statistics(period=period)
+        await statistics(period=period)
+        await ages()
+        await Cache.remove_by_tag(CacheTag.GET_STATISTICAL_PRICE)
+        return await statistics(period=period)
+
+    assert asyncio.run(run()) == {"year": 2026}
+    assert len(calls) == 2
+    # the other tags are kept
+    assert [key.split(":")[0] for key in cache.values] == ["get_age_distribution", "get_statistical_price"]
@@ -0,0 +1,97 @@
+"""Load test of HttpClientPool against a slow stub server (httpx.MockTransport).
+
+A request handler that notifies the socket service in the background must answer
+in the same time whatever the latency of the service, and the event loop must
+keep serving other coroutines while the calls wait on the network.
+"""
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+
+import httpx
+
+from src.core.http import HttpClientPool
+
+CALLS = 200
+CONCURRENCY = 50
+FAST_STUB = 0.02
+SLOW_STUB = 0.2
+
+
+def _p99(samples: List[float]) -> float:
+    return statistics.quantiles(samples, n=100)[98]
+
+
+async def _probe_loop_lag(stop: asyncio.Event, lags: List[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - started - 0.001)
+
+
+async def _load(latency: float) -> Tuple[float, float, float]:
+    async def slow_stub(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={"status": "ok"})
+
+    HttpClientPool.start(concurrency=CONCURRENCY, transport=httpx.MockTransport(slow_stub))
+    stop = asyncio.Event()
+    lags: List[float] = []
+    probe = asyncio.create_task(_probe_loop_lag(stop, lags))
+    try:
+        # request path: notify in the background then answer, like SocketServiceHelper
+        handler_seconds = []
+        for _ in range(CALLS):
+            started = time.perf_counter()
+            HttpClientPool.fire_and_forget(
+                HttpClientPool.request("POST", "http://socket.local/notify", json={})
+            )
+            await asyncio.sleep(0)
+            handler_seconds.append(time.perf_counter() - started)
+            await asyncio.sleep(0.001)
+
+        await asyncio.wait(set(HttpClientPool._tasks))
+
+        # awaited calls: run side by side, bounded by the semaphore
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(HttpClientPool.request("GET", "http://bot.local/") for _ in range(CALLS))
+        )
+        awaited_seconds = time.perf_counter() - started
+        assert all(response.status_code == 200 for response in responses)
+    finally:
+        stop.set()
+        await probe
+        await HttpClientPool.close(timeout=10.0)
+    return _p99(handler_seconds), _p99(lags), awaited_seconds
+
+
+def test_p99_does_not_follow_the_stub_latency():
+    for latency in (FAST_STUB, SLOW_STUB):
+        handler_p99, lag_p99, awaited_seconds = asyncio.run(_load(latency))
+        # a blocking client would hold the loop for the whole latency of each call,
+        # the p99 would be at least SLOW_STUB with the slow stub
+        assert handler_p99 < SLOW_STUB / 4, (latency, handler_p99)
+        assert lag_p99 < SLOW_STUB / 4, (latency, lag_p99)
+        # CALLS / CONCURRENCY waves of requests, one after the other would take CALLS * latency
+        assert awaited_seconds < CALLS * latency / 10, (latency, awaited_seconds)
+
+
+def test_background_request_error_is_logged(caplog):
+    async def failing_stub(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("socket service is down", request=request)
+
+    async def run() -> None:
+        HttpClientPool.start(transport=httpx.MockTransport(failing_stub))
+        try:
+            task = HttpClientPool.fire_and_forget(
+                HttpClientPool.request("POST", "http://socket.local/notify", json={})
+            )
+            await asyncio.wait([task])
+        finally:
+            await HttpClientPool.close()
+
+    asyncio.run(run())
+    assert "socket service is down" in caplog.text
+    assert not HttpClientPool._tasks
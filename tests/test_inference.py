@@ -0,0 +1,101 @@
+"""Micro-batching of InferenceService with a stand-in predictor.
+
+The stand-in replaces predict_images and runs in a thread pool instead of the
+spawned TensorFlow processes: it answers every image with its own bytes, so each
+caller can check it got its result, and records the size of the batches.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from src.ai import inference
+from src.ai.inference import InferenceService, InferenceStats, render_inference_metrics
+
+FORWARD_SECONDS = 0.02
+
+
+class StandInPredictor:
+    def __init__(self) -> None:
+        self.batches: List[int] = []
+        self.broken = False
+
+    def __call__(self, model_path: str, contents: List[bytes]) -> list:
+        self.batches.append(len(contents))
+        time.sleep(FORWARD_SECONDS)
+        if self.broken:
+            raise RuntimeError("worker died")
+        return [
+            ValueError("not an image") if content == b"bad" else {"predict_final": content.decode()}
+            for content in contents
+        ]
+
+
+@pytest.fixture
+def predictor(monkeypatch):
+    predictor = StandInPredictor()
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(inference, "predict_images", predictor)
+    monkeypatch.setattr(InferenceService, "_get_executor", classmethod(lambda cls: executor))
+    monkeypatch.setattr(InferenceService, "stats", InferenceStats())
+    yield predictor
+    executor.shutdown(wait=True)
+
+
+def _serve(contents: List[bytes], max_batch: int = 8, max_wait: float = 0.01, workers: int = 1):
+    async def run():
+        InferenceService.start(
+            "model.keras", workers=workers, queue_size=64, max_batch=max_batch, max_wait=max_wait
+        )
+        try:
+            return await asyncio.gather(
+                *(InferenceService.predict(content) for content in contents),
+                return_exceptions=True,
+            )
+        finally:
+            await InferenceService.close()
+
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_are_batched(predictor):
+    contents = [f"image-{index}".encode() for index in range(32)]
+    results = _serve(contents, max_batch=8)
+    assert [result["predict_final"] for result in results] == [c.decode() for c in contents]
+    assert sum(predictor.batches) == 32
+    assert max(predictor.batches) == 8
+    assert len(predictor.batches) <= 5
+    assert InferenceService.stats.batch_size.count == len(predictor.batches)
+
+
+def test_single_request_does_not_wait_for_a_full_batch(predictor):
+    started = time.monotonic()
+    results = _serve([b"alone"], max_batch=8, max_wait=0.05)
+    elapsed = time.monotonic() - started
+    assert results == [{"predict_final": "alone"}]
+    assert predictor.batches == [1]
+    assert elapsed < 0.05 + FORWARD_SECONDS + 0.5
+
+
+def test_image_error_goes_to_its_caller_only(predictor):
+    results = _serve([b"a", b"bad", b"c"])
+    assert results[0] == {"predict_final": "a"}
+    assert isinstance(results[1], ValueError)
+    assert results[2] == {"predict_final": "c"}
+    assert InferenceService.stats.errors == 1
+
+
+def test_batch_failure_reaches_every_caller(predictor):
+    predictor.broken = True
+    results = _serve([b"a", b"b", b"c"])
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert InferenceService.stats.errors == 3
+
+
+def test_metrics(predictor):
+    _serve([b"a", b"b"])
+    metrics = render_inference_metrics()
+    assert "predict_batch_size_count" in metrics
+    assert "predict_errors_total 0" in metrics
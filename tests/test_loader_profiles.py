@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import InvalidRequestError
+
+from src.core.database.postgresql import loader_options
+from src.models import (
+    AppointmentModel,
+    CommentModel,
+    MedicalRecordModel,
+    PostModel,
+    UserModel,
+)
+
+AUTHOR_JOINS = ["user", "patient", "doctor", "staff"]
+
+
+@pytest.fixture
+def post(session):
+    session.execute(insert(UserModel).values(id=1, phone_number="0900000001", password_hash="x"))
+    session.execute(
+        insert(PostModel).values(id=1, title="post", content={"content": "post"}, author_id=1)
+    )
+    session.execute(
+        insert(CommentModel).values(id=1, content={"content": "comment"}, user_id=1, post_id=1)
+    )
+    return 1
+
+
+def test_count_has_no_join(session, query_counter):
+    session.execute(select(func.count()).select_from(AppointmentModel))
+    query_counter.assert_joins([])
+
+
+def test_bare_profile_has_no_join(session, query_counter):
+    session.execute(select(AppointmentModel).options(*loader_options(AppointmentModel)))
+    query_counter.assert_joins([])
+
+
+@pytest.mark.parametrize(
+    "model_class, profile, joins",
+    [
+        (AppointmentModel, "list", ["patient", "doctor", "payment", "work_schedule"]),
+        (
+            AppointmentModel,
+            "detail",
+            ["patient", "doctor", "payment", "work_schedule", "medical_record"],
+        ),
+        (MedicalRecordModel, "list", ["doctor", "doctor"]),
+        (UserModel, "detail", ["doctor", "patient", "staff"]),
+        (CommentModel, "list", AUTHOR_JOINS),
+    ],
+)
+def test_profile_joins(session, query_counter, model_class, profile, joins):
+    session.execute(select(model_class).options(*loader_options(model_class, profile)))
+    query_counter.assert_joins(joins)
+
+
+def test_collection_is_loaded_in_a_second_query(session, post, query_counter):
+    posts = session.execute(
+        select(PostModel).options(*loader_options(PostModel, "list"))
+    ).unique().scalars().all()
+    # the comments do not multiply the rows of the post query
+    query_counter.assert_joins(AUTHOR_JOINS, [])
+    assert posts[0].get_size_comments == 1
+
+
+def test_relationship_outside_of_the_profile_raises(session, post):
+    loaded = session.execute(
+        select(PostModel).options(*loader_options(PostModel))
+    ).scalar_one()
+    with pytest.raises(InvalidRequestError):
+        loaded.author
+
+
+def test_unknown_profile():
+    with pytest.raises(KeyError):
+        loader_options(PostModel, "summary")
@@ -0,0 +1,59 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from src.apis.metrics_api import MetricsApi, is_allowed_client
+from src.core.route import RouteSwagger
+from src.core.security import JsonWebToken, authentication
+from src.enum import Role
+
+
+class NoLogout:
+    async def get(self, key):
+        return None
+
+
+def _client_from(host: str) -> TestClient:
+    app = Starlette(routes=[RouteSwagger("/metrics", MetricsApi, methods=["GET"])])
+
+    async def from_host(scope, receive, send):
+        scope["client"] = (host, 40000)
+        await app(scope, receive, send)
+
+    return TestClient(from_host)
+
+
+def _token(role: str) -> dict:
+    token = JsonWebToken().create_token({"id": 1, "role": role, "username": "0900000001"})
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+
+@pytest.fixture(autouse=True)
+def no_logout(monkeypatch):
+    monkeypatch.setattr(authentication, "redis", NoLogout())
+
+
+def test_scrape_network_needs_no_token():
+    response = _client_from("127.0.0.1").get("/metrics")
+    assert response.status_code == 200
+    assert "predict_batch_size_count" in response.text
+
+
+def test_outside_without_token_is_forbidden():
+    response = _client_from("203.0.113.7").get("/metrics")
+    assert response.status_code == 403
+    assert "predict_batch_size" not in response.text
+
+
+def test_outside_needs_an_admin():
+    client = _client_from("203.0.113.7")
+    assert client.get("/metrics", headers=_token(Role.PATIENT.value)).status_code == 403
+    assert client.get("/metrics", headers=_token(Role.ADMIN.value)).status_code == 200
+
+
+@pytest.mark.parametrize(
+    "host, allowed",
+    [("127.0.0.1", True), ("::1", True), ("10.0.0.1", False), ("testclient", False), (None, False)],
+)
+def test_is_allowed_client(host, allowed):
+    assert is_allowed_client(host) is allowed
@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+from fake_payos import ERROR, NOT_FOUND, TIMEOUT
+from src.config import config
+from src.helper import payos_helper
+from src.helper.payos_helper import PaymentHelper, backoff_delay
+
+
+def _create_payment():
+    return asyncio.run(
+        PaymentHelper().create_payment(
+            amount=100000, description="appointment", returnUrl="http://app.local/return"
+        )
+    )
+
+
+def _get_payment_info(order_id: str = "1234"):
+    return asyncio.run(PaymentHelper().get_payment_info(orderId=order_id))
+
+
+def test_create_payment(fake_payos):
+    result = _create_payment()
+    assert result["checkoutUrl"].startswith(fake_payos.base_url)
+    assert len(fake_payos.requests) == 1
+
+
+def test_transient_errors_are_retried(fake_payos):
+    fake_payos.script(ERROR, ERROR)
+    result = _create_payment()
+    assert result is not None
+    assert len(fake_payos.requests) == 3
+    # the retries send the same order, PayOS never holds two links for it
+    assert len(set(fake_payos.order_codes)) == 1
+    assert payos_helper.payos_create_breaker.failure_count == 0
+
+    fake_payos.script(TIMEOUT, ERROR)
+    assert _get_payment_info()["status"] == "PAID"
+    assert len(fake_payos.requests) == 6
+
+
+def test_create_is_not_sent_again_after_a_timeout(fake_payos):
+    fake_payos.script(TIMEOUT)
+    started = time.perf_counter()
+    assert _create_payment() is None
+    # the http timeout of the SDK call, the worker thread is not left waiting
+    assert time.perf_counter() - started < fake_payos.delay
+    assert len(fake_payos.requests) == 1
+    assert payos_helper.payos_create_breaker.failure_count == 1
+
+
+def test_lookup_retries_wait_like_the_webhook_needs():
+    for _ in range(100):
+        waited = sum(
+            backoff_delay(
+                attempt, config.PAYOS_LOOKUP_RETRY_DELAY, config.PAYOS_LOOKUP_RETRY_DELAY
+            )
+            for attempt in range(3)
+        )
+        assert 6 <= waited <= 10
+
+
+def test_one_failure_per_call_not_per_retry(fake_payos):
+    fake_payos.script(*[ERROR] * 5)
+    assert _create_payment() is None
+    assert len(fake_payos.requests) == 5
+    assert payos_helper.payos_create_breaker.failure_count == 1
+    assert not payos_helper.payos_create_breaker.is_open
+
+
+def test_open_circuit_skips_the_call(fake_payos):
+    fake_payos.script(*[ERROR] * 10)
+    assert _create_payment() is None
+    assert _create_payment() is None
+    assert payos_helper.payos_create_breaker.is_open
+
+    requests = len(fake_payos.requests)
+    assert _create_payment() is None
+    assert len(fake_payos.requests) == requests
+
+
+def test_circuits_are_split(fake_payos):
+    fake_payos.script(*[TIMEOUT] * 10)
+    assert _create_payment() is None
+    assert _create_payment() is None
+    assert payos_helper.payos_create_breaker.is_open
+
+    # the timed out answers are drained, lookups still reach PayOS
+    time.sleep(fake_payos.delay)
+    fake_payos.clear_script()
+    assert _get_payment_info()["status"] == "PAID"
+    assert not payos_helper.payos_lookup_breaker.is_open
+
+
+def test_business_error_does_not_count(fake_payos):
+    fake_payos.script(*[NOT_FOUND] * 4)
+    assert _get_payment_info() is None
+    assert len(fake_payos.requests) == 4
+    assert payos_helper.payos_lookup_breaker.failure_count == 0
+
+
+def test_half_open_call_closes_the_circuit(fake_payos):
+    fake_payos.script(*[ERROR] * 10)
+    _create_payment()
+    _create_payment()
+    assert payos_helper.payos_create_breaker.is_open
+
+    fake_payos.clear_script()
+    time.sleep(payos_helper.payos_create_breaker.reset_timeout)
+    assert _create_payment() is not None
+    assert not payos_helper.payos_create_breaker.is_open
+
+
+def test_cancelled_half_open_call_releases_the_circuit(fake_payos):
+    fake_payos.script(*[ERROR] * 10)
+    _create_payment()
+    _create_payment()
+    assert payos_helper.payos_create_breaker.is_open
+
+    fake_payos.clear_script()
+    fake_payos.script(TIMEOUT)
+    time.sleep(payos_helper.payos_create_breaker.reset_timeout)
+
+    async def cancel_probe():
+        probe = asyncio.create_task(
+            PaymentHelper().create_payment(
+                amount=100000, description="appointment", returnUrl="http://app.local/return"
+            )
+        )
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    asyncio.run(cancel_probe())
+    # the timed out answer is drained, the next call probes the circuit again
+    time.sleep(fake_payos.delay)
+    assert _create_payment() is not None
+    assert not payos_helper.payos_create_breaker.is_open
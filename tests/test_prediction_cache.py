@@ -0,0 +1,148 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.ai.inference import InferenceService
+from src.ai.prediction_cache import PredictionCache, PredictionCacheStats, _LRU
+from src.core.cache.redis_backend import RedisBackend
+from src.core.http import HttpClientPool
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.values = {}
+        self.down = False
+
+    async def get(self, key):
+        if self.down:
+            raise ConnectionError("redis is down")
+        return self.values.get(key)
+
+    async def set(self, name, value, ex=None):
+        if self.down:
+            raise ConnectionError("redis is down")
+        self.values[name] = value.encode() if isinstance(value, str) else value
+
+
+class FakeInference:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def predict(self, content: bytes) -> dict:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if content == b"bad":
+            raise ValueError("not an image")
+        label = content.decode()
+        return {"predict_final": label, "sorted_probabilities": [[label, 100.0]]}
+
+
+@pytest.fixture
+def inference(monkeypatch):
+    inference = FakeInference()
+    backend = RedisBackend()
+    backend.redis = FakeRedis()
+    monkeypatch.setattr(InferenceService, "predict", inference.predict)
+    monkeypatch.setattr(PredictionCache, "_backend", backend)
+    monkeypatch.setattr(PredictionCache, "_results", _LRU(16))
+    monkeypatch.setattr(PredictionCache, "_urls", _LRU(16))
+    monkeypatch.setattr(PredictionCache, "_inflight", {})
+    monkeypatch.setattr(PredictionCache, "stats", PredictionCacheStats())
+    return inference
+
+
+def test_concurrent_requests_share_one_prediction(inference):
+    async def run():
+        return await asyncio.gather(
+            *(PredictionCache.predict_content(b"acne") for _ in range(5))
+        )
+
+    results = asyncio.run(run())
+    assert all(result["predict_final"] == "acne" for result in results)
+    assert inference.calls == 1
+    assert PredictionCache.stats.misses == 1
+    assert not PredictionCache._inflight
+
+
+def test_cancelled_caller_does_not_cancel_the_others(inference):
+    async def run():
+        first = asyncio.create_task(PredictionCache.predict_content(b"acne"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(PredictionCache.predict_content(b"acne"))
+        await asyncio.sleep(0.01)
+        # the caller that started the prediction gives up
+        first.cancel()
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return result
+
+    result = asyncio.run(run())
+    assert result["predict_final"] == "acne"
+    assert inference.calls == 1
+
+
+def test_prediction_is_cached_when_every_caller_gave_up(inference):
+    async def run():
+        caller = asyncio.create_task(PredictionCache.predict_content(b"acne"))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.1)
+        return await PredictionCache.predict_content(b"acne")
+
+    result = asyncio.run(run())
+    assert result["predict_final"] == "acne"
+    assert inference.calls == 1
+    assert PredictionCache.stats.hits["memory"] == 1
+
+
+def test_error_reaches_every_caller_and_is_not_cached(inference):
+    async def run():
+        return await asyncio.gather(
+            *(PredictionCache.predict_content(b"bad") for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert inference.calls == 1
+    assert not PredictionCache._inflight
+    with pytest.raises(ValueError):
+        asyncio.run(PredictionCache.predict_content(b"bad"))
+    assert inference.calls == 2
+
+
+def test_known_url_is_not_downloaded(inference):
+    downloads = []
+
+    def image_server(request: httpx.Request) -> httpx.Response:
+        downloads.append(str(request.url))
+        return httpx.Response(200, content=b"eczema")
+
+    async def run():
+        HttpClientPool.start(transport=httpx.MockTransport(image_server))
+        try:
+            first = await PredictionCache.predict_url("http://s3.local/a.jpg")
+            # the redis map is shared by the workers, the LRU of this one is lost
+            PredictionCache._urls = _LRU(16)
+            PredictionCache._results = _LRU(16)
+            second = await PredictionCache.predict_url("http://s3.local/a.jpg")
+            await PredictionCache.remember_url("http://s3.local/b.jpg", b"eczema")
+            third = await PredictionCache.predict_url("http://s3.local/b.jpg")
+        finally:
+            await HttpClientPool.close()
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first == second == third
+    assert downloads == ["http://s3.local/a.jpg"]
+    assert inference.calls == 1
+    assert PredictionCache.stats.hits == {"memory": 1, "redis": 1}
+
+
+def test_redis_errors_do_not_fail_the_prediction(inference):
+    PredictionCache.backend().redis.down = True
+    assert asyncio.run(PredictionCache.predict_content(b"acne"))["predict_final"] == "acne"
+    assert asyncio.run(PredictionCache.predict_content(b"acne"))["predict_final"] == "acne"
+    assert inference.calls == 1